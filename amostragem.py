@@ -0,0 +1,211 @@
+"""
+    Simulação por amostragem: avanço rápido, aquecimento e intervalos detalhados.
+
+    Em vez de passar cada ciclo pelo pipeline, a execução alterna três modos
+    em períodos:
+
+        avanço rápido   N instruções no modo funcional direto na memória
+                        (só o estado arquitetural anda; caches e preditor não)
+        aquecimento     W instruções no modo funcional passando pelas caches,
+                        com as buscas na I-cache e os desvios ensinando o
+                        preditor e a BTB, tudo sem tempo
+        detalhado       alguns ciclos para encher o pipeline e depois M ciclos
+                        medidos no Processador; no fim o pipeline é drenado
+
+    O CPI de cada intervalo detalhado é uma amostra. O CPI do programa é a
+    média delas, com intervalo de confiança pela distribuição normal, e os
+    ciclos do programa inteiro são estimados por CPI x instruções.
+
+    Limitação: as caches são esvaziadas depois do avanço rápido (a memória
+    mudou por baixo delas), então sem aquecimento cada intervalo começa frio.
+"""
+
+from statistics import NormalDist, fmean, stdev
+
+from cpu import Processador
+from funcional import ProcessadorFuncional
+from tradutor import TradutorBlocos
+
+
+def simular_amostrado(cache, avanco=100_000, aquecimento=10_000, ciclos_detalhados=10_000,
+                      ciclos_enchimento=100, cache_instrucoes=None, niveis=(), preditor=None,
+                      btb=None, max_instrucoes=None, confianca=0.95, traduzir_blocos=True):
+    """
+        Roda o programa carregado na memória da cache por amostragem.
+
+        avanco: instruções do avanço rápido em cada período
+        aquecimento: instruções de aquecimento antes de cada intervalo detalhado
+        ciclos_detalhados: ciclos medidos em cada intervalo detalhado
+        ciclos_enchimento: ciclos do pipeline antes de começar a medir
+        niveis: caches compartilhadas abaixo das L1 (L2, L3...)
+        traduzir_blocos: avanço rápido com blocos básicos traduzidos
+
+        Retorna um dicionário com as amostras e a estimativa do CPI.
+    """
+
+    memoria = cache.ram
+    instrucoes_cache = cache_instrucoes if cache_instrucoes is not None else cache
+    caches = [cache] + ([cache_instrucoes] if cache_instrucoes is not None else []) + list(niveis)
+
+    cpu = Processador(cache, cache_instrucoes, preditor, btb)
+    registradores = cpu.registradores
+
+    # Os dois funcionais dividem o banco de registradores com o pipeline
+    rapido = ProcessadorFuncional(memoria, registradores, traduzir_blocos)
+    aquecedor = ProcessadorFuncional(cache, registradores)
+
+    pc = memoria.entrada
+    total = 0
+    amostras = []
+    ciclos_medidos = instrucoes_medidas = 0
+    texto = None
+
+    def restante(limite):
+        return limite if max_instrucoes is None else min(limite, max_instrucoes - total)
+
+    while max_instrucoes is None or total < max_instrucoes:
+
+        # Avanço rápido: a memória principal tem que estar em dia
+        n = restante(avanco)
+        if n > 0:
+            cache.descarregar()
+            texto = _conferir_texto(rapido, memoria, texto)
+
+            rapido.PC = pc
+            total += rapido.executar(n)
+            pc = rapido.PC
+            if not rapido.rodando:
+                break
+
+            texto = bytes(memoria.dados[memoria.text_inicio:memoria.fim_programa])
+            for nivel in caches:
+                nivel.esvaziar()
+
+        # Aquecimento funcional
+        n = restante(aquecimento)
+        if n > 0:
+            aquecedor.cache_decodificacao.clear()
+            aquecedor.PC = pc
+            total += _aquecer(aquecedor, instrucoes_cache, cpu.preditor, cpu.btb, n)
+            pc = aquecedor.PC
+            if not aquecedor.rodando:
+                break
+
+        if max_instrucoes is not None and total >= max_instrucoes:
+            break
+
+        # Intervalo detalhado
+        cpu.PC = pc
+        inicio = cpu.instrucoes_executadas
+
+        _rodar_ciclos(cpu, ciclos_enchimento)
+        antes = cpu.contadores.instantaneo()
+        _rodar_ciclos(cpu, ciclos_detalhados)
+        intervalo = cpu.contadores.instantaneo() - antes
+        cpu.drenar()
+
+        total += cpu.instrucoes_executadas - inicio
+        pc = cpu.PC
+
+        if intervalo.instrucoes:
+            amostras.append(intervalo.cpi())
+            ciclos_medidos += intervalo.ciclos
+            instrucoes_medidas += intervalo.instrucoes
+
+        if not cpu.rodando:
+            break
+
+    cache.descarregar()
+
+    return _estimar(amostras, total, ciclos_medidos, instrucoes_medidas, confianca,
+                    terminou=not (rapido.rodando and aquecedor.rodando and cpu.rodando),
+                    registradores=list(registradores), PC=pc)
+
+
+def _rodar_ciclos(cpu, ciclos):
+    cpu.executar_ate(cpu.ciclo + ciclos)
+
+
+def _conferir_texto(rapido, memoria, texto):
+    """
+        Se a seção text mudou desde o último avanço rápido (código que se
+        modifica nos outros modos), o que o avanço rápido decodificou e
+        traduziu não vale mais.
+    """
+
+    if texto is not None and texto != memoria.dados[memoria.text_inicio:memoria.fim_programa]:
+        rapido.cache_decodificacao.clear()
+        if rapido.tradutor is not None:
+            rapido.tradutor = TradutorBlocos(memoria, invalidar=rapido._invalidar_decodificacao)
+    return texto
+
+
+def _aquecer(funcional, cache_instrucoes, preditor, btb, max_instrucoes):
+    """
+        Roda instruções no modo funcional (que já passa os loads e stores pela
+        D-cache) lendo cada PC da I-cache e ensinando o preditor e a BTB,
+        como o EX faria. Retorna quantas instruções rodou.
+    """
+
+    inicio = funcional.instrucoes_executadas
+    limite = inicio + max_instrucoes
+    decodificadas = funcional.cache_decodificacao
+
+    while funcional.rodando and funcional.instrucoes_executadas < limite:
+        pc = funcional.PC
+        try:
+            cache_instrucoes.ler_palavra(pc)
+        except Exception:
+            pass
+
+        funcional.passo()
+
+        if btb is None or pc not in decodificadas:
+            continue
+
+        subtipo = decodificadas[pc][1].subtipo
+        if subtipo in ('j', 'jal'):
+            btb.atualizar(pc, funcional.PC, True)
+        elif subtipo in ('beq', 'bne'):
+            tomado = funcional.PC != pc + 4
+            if tomado:
+                btb.atualizar(pc, funcional.PC, False)
+            preditor.atualizar(pc, tomado)
+
+    return funcional.instrucoes_executadas - inicio
+
+
+def _estimar(amostras, instrucoes, ciclos_medidos, instrucoes_medidas, confianca, **extras):
+    """ CPI médio das amostras, intervalo de confiança e ciclos estimados """
+
+    resultado = {
+        'amostras': len(amostras),
+        'instrucoes': instrucoes,
+        'ciclos_medidos': ciclos_medidos,
+        'instrucoes_medidas': instrucoes_medidas,
+        'cpi': None,
+        'cpi_desvio': None,
+        'confianca': confianca,
+        'cpi_minimo': None,
+        'cpi_maximo': None,
+        'ciclos_estimados': None,
+        'cpi_por_amostra': amostras,
+    }
+    resultado.update(extras)
+
+    if not amostras:
+        return resultado
+
+    cpi = fmean(amostras)
+    resultado['cpi'] = cpi
+    resultado['ciclos_estimados'] = round(cpi * instrucoes)
+
+    # Com uma amostra só não dá para falar de dispersão
+    if len(amostras) > 1:
+        desvio = stdev(amostras)
+        margem = NormalDist().inv_cdf(0.5 + confianca / 2) * desvio / len(amostras) ** 0.5
+        resultado['cpi_desvio'] = desvio
+        resultado['cpi_minimo'] = cpi - margem
+        resultado['cpi_maximo'] = cpi + margem
+
+    return resultado
@@ -0,0 +1,241 @@
+"""
+    Suíte de programas de referência (programas/*.s) com resultado conhecido.
+
+    Cada programa é montado, rodado no simulador e conferido (registradores
+    e/ou palavras da memória). O relatório mostra a velocidade do simulador
+    (instruções simuladas por segundo de host), o CPI e as taxas de miss, e
+    compara com uma base gravada antes:
+
+        modelo   ciclos, instruções e misses têm que bater exatamente (o
+                 simulador é determinístico; se mudou, o modelo mudou)
+        host     instruções por segundo abaixo da base menos a tolerância
+                 é lentidão do simulador
+
+    A base depende da máquina para a parte de host; grave a sua com
+    --salvar-base antes de otimizar.
+
+    Uso:
+        python benchmarks.py                         # compara com a base
+        python benchmarks.py --salvar-base           # grava a base nova
+        python benchmarks.py --modo blocos matriz    # só um programa
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from cpu import Processador
+from funcional import ProcessadorFuncional
+from main import criar_parser, montar_maquina
+from montador import REGISTRADORES, carregar_montado, montar
+
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programas')
+BASE = os.path.join(PASTA, 'base.json')
+
+
+def _gerador(semente, quantidade):
+    """ x = (5x + 3) & 255, igual ao dos programas """
+    valores = []
+    x = semente
+    for _ in range(quantidade):
+        x = (5 * x + 3) & 255
+        valores.append(x)
+    return valores
+
+
+# Programa -> resultado esperado: 'registradores' {nome: valor} e/ou
+# 'memoria' {rótulo: [palavras a partir dele]}
+SUITE = {
+    'soma_vetores': {'memoria': {'v3': [1, 5, 9, 13, 17, 21]}},
+    'memcpy': {'registradores': {'$v0': 98176}},
+    'matriz': {'registradores': {'$v0': 40320}},
+    'ordenacao': {'memoria': {'vetor': sorted(_gerador(7, 64))}},
+    'lista': {'registradores': {'$v0': 195072}},
+    'passos': {'registradores': {'$v0': 1571328}},
+    'estados': {'registradores': {'$v0': 95}, 'memoria': {'visitas': [763, 400, 603, 234]}},
+}
+
+# O que tem que bater exatamente com a base
+CAMPOS_MODELO = ('instrucoes', 'ciclos', 'misses_instrucao', 'misses_dados')
+
+
+def rodar_programa(nome, opcoes, max_ciclos=10_000_000):
+    """
+        Monta, roda e confere um programa da suíte.
+        Retorna um dicionário com as medidas e 'erros' (lista de divergências).
+    """
+
+    with open(os.path.join(PASTA, nome + '.s')) as f:
+        programa = montar(f.read())
+
+    memoria, cache, cache_instrucoes, niveis = montar_maquina(opcoes)
+    carregar_montado(memoria, programa)
+
+    inicio = time.perf_counter()
+    if opcoes.modo == 'pipeline':
+        cpu = Processador(cache, cache_instrucoes)
+        cpu.PC = memoria.entrada
+        cpu.executar_ate(max_ciclos)
+    else:
+        cpu = ProcessadorFuncional(cache, traduzir_blocos=(opcoes.modo == 'blocos'))
+        cpu.PC = memoria.entrada
+        cpu.executar(max_ciclos)
+    segundos = time.perf_counter() - inicio
+
+    cache.descarregar()
+
+    # Conferência
+    erros = []
+    if cpu.rodando:
+        erros.append("não terminou")
+
+    esperado = SUITE[nome]
+    for registrador, valor in esperado.get('registradores', {}).items():
+        obtido = cpu.registradores[REGISTRADORES[registrador]]
+        if obtido != valor:
+            erros.append(f"{registrador} = {obtido}, esperado {valor}")
+    for rotulo, palavras in esperado.get('memoria', {}).items():
+        endereco = programa['rotulos'][rotulo]
+        obtidas = [memoria.ler_palavra(endereco + 4 * i) for i in range(len(palavras))]
+        if obtidas != palavras:
+            erros.append(f"{rotulo} diferente do esperado")
+
+    resultado = {
+        'instrucoes': cpu.instrucoes_executadas,
+        'segundos': segundos,
+        'instrucoes_por_segundo': cpu.instrucoes_executadas / segundos if segundos else 0.0,
+        'erros': erros,
+    }
+
+    contadores = getattr(cpu, 'contadores', None)
+    if contadores is not None:
+        leituras = contadores.leituras_dados + contadores.escritas_dados
+        misses_dados = contadores.misses_leitura_dados + contadores.misses_escrita_dados
+        resultado.update({
+            'ciclos': cpu.ciclo,
+            'cpi': contadores.cpi(),
+            'misses_instrucao': contadores.misses_instrucao,
+            'misses_dados': misses_dados,
+            'taxa_miss_instrucao': (contadores.misses_instrucao / contadores.acessos_instrucao
+                                    if contadores.acessos_instrucao else 0.0),
+            'taxa_miss_dados': misses_dados / leituras if leituras else 0.0,
+        })
+    else:
+        resultado.update(_misses_das_caches(cache, cache_instrucoes))
+
+    return resultado
+
+
+def _misses_das_caches(cache, cache_instrucoes):
+    """
+        Misses tirados das próprias caches (modos sem contadores de desempenho).
+        Dados: leituras e escritas. A I-cache só entra se foi acessada; o modo
+        funcional não modela a busca, então nele ela fica de fora.
+    """
+
+    acessos = cache.hits + cache.misses + cache.hits_escrita + cache.misses_escrita
+    misses = cache.misses + cache.misses_escrita
+    medidas = {
+        'misses_dados': misses,
+        'taxa_miss_dados': misses / acessos if acessos else 0.0,
+    }
+
+    if cache_instrucoes is not None and cache_instrucoes.hits + cache_instrucoes.misses:
+        medidas['misses_instrucao'] = cache_instrucoes.misses
+        medidas['taxa_miss_instrucao'] = (cache_instrucoes.misses /
+                                          (cache_instrucoes.hits + cache_instrucoes.misses))
+
+    return medidas
+
+
+def comparar(resultado, base, tolerancia):
+    """ Lista de regressões de um programa em relação à base """
+
+    regressoes = []
+    for campo in CAMPOS_MODELO:
+        if campo in base and resultado.get(campo) != base[campo]:
+            regressoes.append(f"modelo: {campo} {base[campo]} -> {resultado.get(campo)}")
+
+    referencia = base.get('instrucoes_por_segundo')
+    if referencia and resultado['instrucoes_por_segundo'] < referencia * (1 - tolerancia):
+        queda = 1 - resultado['instrucoes_por_segundo'] / referencia
+        regressoes.append(f"host: {queda * 100:.0f}% mais lento")
+
+    return regressoes
+
+
+def imprimir_relatorio(resultados, regressoes):
+    print(f"{'Programa':<14} {'Instr.':>8} {'Ciclos':>8} {'CPI':>6} {'Miss I':>7} {'Miss D':>7} "
+          f"{'Instr/s':>9}  Situação")
+    for nome, r in resultados.items():
+        ciclos = r.get('ciclos', '-')
+        cpi = f"{r['cpi']:.3f}" if r.get('cpi') else '-'
+        miss_i = f"{r['taxa_miss_instrucao'] * 100:.1f}%" if 'taxa_miss_instrucao' in r else '-'
+        miss_d = f"{r['taxa_miss_dados'] * 100:.1f}%" if 'taxa_miss_dados' in r else '-'
+        situacao = "; ".join(r['erros'] + regressoes.get(nome, [])) or "ok"
+        print(f"{nome:<14} {r['instrucoes']:>8} {ciclos:>8} {cpi:>6} {miss_i:>7} {miss_d:>7} "
+              f"{r['instrucoes_por_segundo']:>9.0f}  {situacao}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de programas de referência do simulador")
+    parser.add_argument('programas', nargs='*', help="programas da suíte (padrão: todos)")
+    parser.add_argument('--modo', choices=['pipeline', 'funcional', 'blocos'], default='pipeline')
+    parser.add_argument('--repeticoes', type=int, default=1,
+                        help="roda cada programa N vezes e fica com a mais rápida (padrão: 1)")
+    parser.add_argument('--base', default=BASE, help="arquivo da base (padrão: programas/base.json)")
+    parser.add_argument('--salvar-base', action='store_true', help="grava os resultados como base nova")
+    parser.add_argument('--tolerancia', type=float, default=0.20,
+                        help="queda de instruções/s aceita antes de acusar lentidão (padrão: 0.20)")
+    parser.add_argument('--json', action='store_true', help="imprime os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    nomes = args.programas or list(SUITE)
+    desconhecidos = [nome for nome in nomes if nome not in SUITE]
+    if desconhecidos:
+        print(f"Programas desconhecidos: {', '.join(desconhecidos)}", file=sys.stderr)
+        return 1
+
+    # Máquina com as opções padrão do main.py
+    opcoes = criar_parser().parse_args([])
+    opcoes.modo = args.modo
+
+    resultados = {}
+    for nome in nomes:
+        rodadas = [rodar_programa(nome, opcoes) for _ in range(max(args.repeticoes, 1))]
+        resultados[nome] = max(rodadas, key=lambda r: r['instrucoes_por_segundo'])
+
+    bases = {}
+    if os.path.exists(args.base):
+        with open(args.base) as f:
+            bases = json.load(f)
+
+    if args.salvar_base:
+        bases[args.modo] = {
+            nome: {campo: valor for campo, valor in r.items() if campo not in ('erros', 'segundos')}
+            for nome, r in resultados.items()
+        }
+        with open(args.base, 'w') as f:
+            json.dump(bases, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    base = bases.get(args.modo, {})
+    regressoes = {nome: comparar(r, base[nome], args.tolerancia)
+                  for nome, r in resultados.items() if nome in base}
+
+    if args.json:
+        print(json.dumps({'modo': args.modo, 'resultados': resultados, 'regressoes': regressoes}, indent=2))
+    else:
+        imprimir_relatorio(resultados, regressoes)
+        if args.salvar_base:
+            print(f"\nBase gravada em {args.base}")
+
+    falhou = any(r['erros'] for r in resultados.values()) or any(regressoes.values())
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
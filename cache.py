@@ -1,127 +1,570 @@
+import struct
+from array import array
+
+from rastro import DADO, ESCRITA, LEITURA
+from substituicao import criar_politica
+
+
+WRITE_THROUGH = 'write-through'
+WRITE_BACK = 'write-back'
+
+_PALAVRA = struct.Struct('<I')
+
+
 class Cache:
-    def __init__(self, memoria_principal):
-        
+    def __init__(self, memoria_principal, tamanho_bloco=16, num_linhas=8,
+                 associatividade=1, substituicao='LRU', escrita=WRITE_THROUGH,
+                 alocar_na_escrita=None, semente=None, latencia=1, proximo_nivel=None):
+        """
+            tamanho_bloco: bytes por bloco
+            num_linhas: total de linhas (slots) da cache
+            associatividade: vias por conjunto (1 = mapeamento direto,
+                             num_linhas = totalmente associativa)
+            substituicao: 'LRU', 'FIFO', 'aleatoria', 'PLRU' ou um objeto com a
+                          mesma interface (ver substituicao.py)
+            escrita: 'write-through' ou 'write-back' (com bit de sujo)
+            alocar_na_escrita: traz o bloco para a cache num miss de escrita?
+                               Padrão: sim no write-back, não no write-through.
+            semente: semente da política aleatória
+            latencia: ciclos de um hit neste nível
+            proximo_nivel: de onde vêm os blocos num miss (outra Cache, ex: L2).
+                           Padrão: a memória principal.
+
+            O padrão é a cache original: mapeamento direto, 8 linhas de 16 bytes,
+            write-through sem alocação na escrita.
+        """
+
         # A Cache precisa acessar a RAM quando der Miss
         self.ram = memoria_principal
 
-        #Configuração da Cache
-        self.tamanho_bloco = 16 # Cada bloco tem 16 bytes (4 palavras)
-        self.num_linhas = 8     # A cache tem 8 linhas (slots)
+        # Nível de baixo na hierarquia (L2, L3 ou a própria RAM).
+        # self.ram continua sendo a memória principal (seções, fim do programa).
+        self.proximo = proximo_nivel if proximo_nivel is not None else memoria_principal
+
+        # Latência: ciclos de um hit e ciclos do último acesso por palavra
+        # (hit + o que os níveis de baixo gastaram num miss)
+        self.latencia = latencia
+        self.latencia_acesso = latencia
 
-        # Estrutura da Cache (lista de dicionários)
-        # Cada linha tem: 'valid' (bit de validade), 'tab' (etiqueta) e dados (o bloco de bytes)
-        self.linhas = [{
-                'valid': False,
-                'tag': 0,
-                'dados': [0] * self.tamanho_bloco
-            } for _ in range(self.num_linhas)]
+        if num_linhas % associatividade != 0:
+            raise ValueError("num_linhas precisa ser múltiplo da associatividade")
+        if escrita not in (WRITE_THROUGH, WRITE_BACK):
+            raise ValueError(f"Política de escrita desconhecida: {escrita}")
+
+        #Configuração da Cache
+        self.tamanho_bloco = tamanho_bloco  # Bytes por bloco (16 = 4 palavras)
+        self.num_linhas = num_linhas        # Total de linhas (slots)
+        self.associatividade = associatividade
+        self.num_conjuntos = num_linhas // associatividade
+
+        # Com bloco e número de conjuntos potências de dois, o endereço se
+        # divide com deslocamentos e máscaras em vez de % e //
+        bits_offset = tamanho_bloco.bit_length() - 1
+        bits_conjunto = self.num_conjuntos.bit_length() - 1
+        self.potencia_de_dois = (tamanho_bloco == 1 << bits_offset
+                                 and self.num_conjuntos == 1 << bits_conjunto)
+        self.bits_offset = bits_offset
+        self.bits_tag = bits_offset + bits_conjunto
+        self.mascara_offset = tamanho_bloco - 1
+        self.mascara_conjunto = self.num_conjuntos - 1
+
+        # Palavra alinhada nunca cruza bloco (bloco com palavras inteiras):
+        # um acesso por palavra. Senão a palavra vai byte a byte.
+        self.palavra_no_bloco = tamanho_bloco % 4 == 0
+
+        self.escrita = escrita
+        if alocar_na_escrita is None:
+            alocar_na_escrita = (escrita == WRITE_BACK)
+        self.alocar_na_escrita = alocar_na_escrita
+
+        if isinstance(substituicao, str):
+            substituicao = criar_politica(substituicao, self.num_conjuntos, associatividade, semente)
+        self.substituicao = substituicao
+
+        # Estrutura da Cache em vetores planos (um elemento por linha).
+        # A linha da via v do conjunto c é c * associatividade + v.
+        # Os dados de todas as linhas ficam num bytearray só, bloco atrás de bloco.
+        self.tags = array('q', bytes(8 * num_linhas))
+        self.validos = bytearray(num_linhas)
+        self.sujos = bytearray(num_linhas)
+        self.dados = bytearray(num_linhas * tamanho_bloco)
 
 
         # Estatisticas para mostrar no final
         self.hits = 0
         self.misses = 0
+        self.hits_escrita = 0
+        self.misses_escrita = 0
+        self.writebacks = 0
+
+        # Rastro de acessos (rastro.RastroAcessos) para quem usa a cache direto
+        # pelos métodos de byte. Os acessos por palavra da CPU são gravados
+        # pelos próprios estágios IF/MEM, que sabem o tipo e o ciclo.
+        self.rastro = None
+
+
+    def __getstate__(self):
+        """ Estado para o checkpoint: o rastro é um arquivo aberto e fica de fora """
+
+        estado = self.__dict__.copy()
+        estado['rastro'] = None
+        return estado
 
 
     def _parse_endereco(self, endereco):
-        """ 
-            Divide o endereço em Tag, Index e Offset 
-            
+        """
+            Divide o endereço em Tag, Index e Offset
+
             Offset: Posição dentro do bloco (bits menos significativos)
-             Index: Qual linha da cache usar
+             Index: Qual conjunto da cache usar
                Tag: Identificador do bloco na memória
         """
 
+        if self.potencia_de_dois:
+            return (endereco >> self.bits_tag,
+                    (endereco >> self.bits_offset) & self.mascara_conjunto,
+                    endereco & self.mascara_offset)
+
         offset = endereco % self.tamanho_bloco
-        index = (endereco // self.tamanho_bloco) % self.num_linhas
-        tag = endereco // (self.tamanho_bloco * self.num_linhas)
+        index = (endereco // self.tamanho_bloco) % self.num_conjuntos
+        tag = endereco // (self.tamanho_bloco * self.num_conjuntos)
 
         return tag, index, offset
 
 
+    def _procurar(self, conjunto, tag):
+        """
+            Retorna a linha que tem o bloco (valid e tag batem) ou -1
+        """
+
+        inicio = conjunto * self.associatividade
+        for linha in range(inicio, inicio + self.associatividade):
+            if self.validos[linha] and self.tags[linha] == tag:
+                return linha
+        return -1
+
+
+    def _alocar(self, conjunto, tag):
+        """
+            Traz o bloco (tag, conjunto) da RAM para uma via do conjunto.
+            Usa uma via vazia se tiver, senão pergunta à política quem sai.
+            Retorna a linha usada.
+        """
+
+        inicio = conjunto * self.associatividade
+        tamanho_bloco = self.tamanho_bloco
+
+        for via in range(self.associatividade):
+            if not self.validos[inicio + via]:
+                break
+        else:
+            via = self.substituicao.vitima(conjunto)
+
+        linha = inicio + via
+        base_dados = linha * tamanho_bloco
+
+        # Write-back: o bloco que sai está sujo, então volta para a RAM antes
+        if self.validos[linha] and self.sujos[linha]:
+            endereco_antigo = (self.tags[linha] * self.num_conjuntos + conjunto) * tamanho_bloco
+            self.proximo.escrever_bloco(endereco_antigo, self.dados[base_dados:base_dados + tamanho_bloco])
+            self.latencia_acesso += self.proximo.latencia_acesso
+            self.writebacks += 1
+
+        # Trazendo o bloco do nível de baixo para a Cache
+        # Calcula onde começa o bloco na RAM (alinha o endereço)
+        endereco_base = (tag * self.num_conjuntos + conjunto) * tamanho_bloco
+        self.dados[base_dados:base_dados + tamanho_bloco] = self.proximo.ler_bloco(endereco_base, tamanho_bloco)
+        self.latencia_acesso += self.proximo.latencia_acesso
+
+        self.tags[linha] = tag
+        self.validos[linha] = 1
+        self.sujos[linha] = 0
+        self.substituicao.inseriu(conjunto, via)
+
+        return linha
+
+
 
     def ler_byte(self, endereco):
         "Le um byte (para acessos de dados)"
 
+        if self.rastro is not None:
+            self.rastro.registrar(self.rastro.ciclo, endereco, LEITURA | DADO)
+
+        return self._ler_byte(endereco)
+
+    def escrever_byte(self, endereco, valor):
+        """ Escreve um byte (ver _escrever_byte para as políticas) """
+
+        if self.rastro is not None:
+            self.rastro.registrar(self.rastro.ciclo, endereco, ESCRITA | DADO)
+
+        self._escrever_byte(endereco, valor)
+
+
+    def _ler_byte(self, endereco):
+        """ Leitura de um byte pela cache (sem rastro) """
+
         tag, index, offset = self._parse_endereco(endereco)
-        linha = self.linhas[index]
+        linha = self._procurar(index, tag)
 
         # Verifica se é HIT (Válido E Tag bate)
-        if linha['valid'] and linha['tag'] == tag:
+        if linha >= 0:
             self.hits += 1
             # print(f"CACHE: HIT no endereço {endereco}") # Comentei para não poluir muito
-            return linha['dados'][offset]
+            self.substituicao.acessou(index, linha - index * self.associatividade)
 
         # Se for MISS
         else:
             self.misses += 1
 
             # print(f"CACHE: MISS @ {hex(endereco)}")
+            linha = self._alocar(index, tag)
 
+        return self.dados[linha * self.tamanho_bloco + offset]
 
-            # Trazendo o bloco da RAM para a Cache
-            # Calcula onde começa o bloco na RAM (alinha o endereço)
-            endereco_base = endereco - offset
+    def _escrever_byte(self, endereco, valor):
+        """
+            Write-through: escreve na Cache (se o bloco estiver nela) E na RAM.
+            Write-back: escreve só na Cache e marca a linha como suja.
+        """
+        tag, index, offset = self._parse_endereco(endereco)
+        linha = self._procurar(index, tag)
 
-            # Copia byte a byte da RAM para o array 'dados' da linha
-            # Precisamos usar self.memoria.ler_byte, mas cuidado para não cair em loop infinito
-            # Acessamos direto o array da RAM se possível, ou usamos o método ler da RAM
-            for i in range(self.tamanho_bloco):
-                linha['dados'][i] = self.ram.ler_byte(endereco_base + i)
-           
-            linha['tag'] = tag
-            linha['valid'] = True
-            return linha['dados'][offset]
+        if linha >= 0:
+            self.hits_escrita += 1
+            self.substituicao.acessou(index, linha - index * self.associatividade)
 
-    def escrever_byte(self, endereco, valor):
-        """ Política Write-Through: Escreve na Cache E na RAM imediatamente """
-        tag, index, offset = self._parse_endereco(endereco)
-        linha = self.linhas[index]
+        else:
+            self.misses_escrita += 1
+
+            if self.alocar_na_escrita:
+                linha = self._alocar(index, tag)
+            else:
+                # Sem alocação: vai direto para o nível de baixo
+                self.proximo.escrever_byte(endereco, valor)
+                return
 
-        # 1. Escreve na RAM (Sempre, pois é Write-Through)
-        self.ram.escrever_byte(endereco, valor)
+        self.dados[linha * self.tamanho_bloco + offset] = valor & 0xFF
 
-        # 2. Se o bloco estiver na cache, atualizamos ele também
-        if linha['valid'] and linha['tag'] == tag:
-            linha['dados'][offset] = valor
+        # As escritas do write-through vão por um buffer de escrita,
+        # então não entram na latência do acesso
+        if self.escrita == WRITE_THROUGH:
+            self.proximo.escrever_byte(endereco, valor)
+        else:
+            self.sujos[linha] = 1
 
 
     def ler_palavra(self, endereco):
         """
             Lê palavra de 32 bits - LITTLE-ENDIAN (MIPS)
+
+            Uma consulta à cache por palavra (conta um hit ou um miss). É o
+            caminho da busca e dos loads, então a consulta vem escrita aqui
+            mesmo em vez de chamar _parse_endereco/_procurar.
         """
-        
-        if endereco % 4 != 0:
+
+        if endereco & 3:
             raise Exception(f"Endereço não alinhado: {hex(endereco)}")
 
-        palavra = 0
-        for i in range(4):
-            byte = self.ler_byte(endereco + i)
-            palavra |= (byte << (8 * i))  # Little-endian: byte[i] na posição 8*i
+        self.latencia_acesso = self.latencia
+
+        if not self.palavra_no_bloco:
+            # Bloco menor que a palavra: um acesso por byte
+            palavra = 0
+            for i in range(4):
+                palavra |= self._ler_byte(endereco + i) << (8 * i)  # Little-endian
+            return palavra
 
+        if self.potencia_de_dois:
+            tag = endereco >> self.bits_tag
+            conjunto = (endereco >> self.bits_offset) & self.mascara_conjunto
+            offset = endereco & self.mascara_offset
+        else:
+            tag, conjunto, offset = self._parse_endereco(endereco)
+
+        associatividade = self.associatividade
+        inicio = conjunto * associatividade
+        validos = self.validos
+        tags = self.tags
+        for linha in range(inicio, inicio + associatividade):
+            if validos[linha] and tags[linha] == tag:
+                self.hits += 1
+                self.substituicao.acessou(conjunto, linha - inicio)
+                break
+        else:
+            self.misses += 1
+            linha = self._alocar(conjunto, tag)
 
-        return palavra
+        return _PALAVRA.unpack_from(self.dados, linha * self.tamanho_bloco + offset)[0]
 
 
     def escrever_palavra(self, endereco, valor):
         """
             Escreve palavra de 32 bits - LITTLE-ENDIAN (MIPS)
+            Uma consulta por palavra, com as políticas de _escrever_byte.
         """
 
-        if endereco % 4 != 0:
+        if endereco & 3:
             raise Exception(f"Endereço não alinhado: {hex(endereco)}")
 
-        for i in range(4):
-            byte = (valor >> (8 * i)) & 0xFF  # Little-endian: pega byte[i]
-            self.escrever_byte(endereco + i, byte)
+        self.latencia_acesso = self.latencia
+
+        if not self.palavra_no_bloco:
+            for i in range(4):
+                self._escrever_byte(endereco + i, (valor >> (8 * i)) & 0xFF)  # Little-endian
+            return
+
+        tag, conjunto, offset = self._parse_endereco(endereco)
+        linha = self._procurar(conjunto, tag)
+
+        if linha >= 0:
+            self.hits_escrita += 1
+            self.substituicao.acessou(conjunto, linha - conjunto * self.associatividade)
+        else:
+            self.misses_escrita += 1
+
+            if self.alocar_na_escrita:
+                linha = self._alocar(conjunto, tag)
+            else:
+                # Sem alocação: vai direto para o nível de baixo
+                self.proximo.escrever_palavra(endereco, valor)
+                return
+
+        _PALAVRA.pack_into(self.dados, linha * self.tamanho_bloco + offset, valor & 0xFFFFFFFF)
+
+        # Buffer de escrita do write-through: fora da latência do acesso
+        if self.escrita == WRITE_THROUGH:
+            self.proximo.escrever_palavra(endereco, valor)
+        else:
+            self.sujos[linha] = 1
+
 
+    def espiar_palavra(self, endereco):
+        """
+            Lê a palavra como o programa enxerga (da cache se o bloco estiver
+            nela, senão da RAM) sem mexer em estatísticas nem na substituição.
+            Usado para buscar instruções fora do pipeline (modo funcional).
+        """
+
+        tag, index, offset = self._parse_endereco(endereco)
+        linha = self._procurar(index, tag)
 
-    def imprimir_estatisticas(self):
+        if linha >= 0 and offset + 4 <= self.tamanho_bloco:
+            inicio = linha * self.tamanho_bloco + offset
+            return int.from_bytes(self.dados[inicio:inicio + 4], 'little')
+
+        if isinstance(self.proximo, Cache):
+            return self.proximo.espiar_palavra(endereco)
+        return self.proximo.ler_palavra(endereco)
+
+
+    # Interface de nível de baixo: o nível de cima (L1 sobre L2, por exemplo)
+    # usa a Cache como se fosse a Memoria, lendo e gravando blocos inteiros.
+    # Cada bloco conta como um acesso.
+
+    def ler_bloco(self, endereco, tamanho):
+        """
+            Lê um bloco do nível de cima (que precisa caber num bloco deste nível)
+        """
+
+        tag, index, offset = self._parse_endereco(endereco)
+        linha = self._procurar(index, tag)
+        self.latencia_acesso = self.latencia
+
+        if linha >= 0:
+            self.hits += 1
+            self.substituicao.acessou(index, linha - index * self.associatividade)
+        else:
+            self.misses += 1
+            linha = self._alocar(index, tag)
+
+        inicio = linha * self.tamanho_bloco + offset
+        return self.dados[inicio:inicio + tamanho]
+
+    def escrever_bloco(self, endereco, dados):
+        """
+            Recebe um bloco do nível de cima (write-back de uma linha suja)
+        """
+
+        tag, index, offset = self._parse_endereco(endereco)
+        linha = self._procurar(index, tag)
+        self.latencia_acesso = self.latencia
+
+        if linha >= 0:
+            self.hits_escrita += 1
+            self.substituicao.acessou(index, linha - index * self.associatividade)
+        else:
+            self.misses_escrita += 1
+
+            if self.alocar_na_escrita:
+                linha = self._alocar(index, tag)
+            else:
+                self.proximo.escrever_bloco(endereco, dados)
+                self.latencia_acesso += self.proximo.latencia_acesso
+                return
+
+        inicio = linha * self.tamanho_bloco + offset
+        self.dados[inicio:inicio + len(dados)] = dados
+
+        if self.escrita == WRITE_THROUGH:
+            self.proximo.escrever_bloco(endereco, dados)
+            self.latencia_acesso += self.proximo.latencia_acesso
+        else:
+            self.sujos[linha] = 1
+
+
+    def descarregar(self):
+        """
+            Write-back: grava no nível de baixo todas as linhas sujas (a cache
+            continua válida). Depois descarrega os níveis de baixo também.
+        """
+
+        tamanho_bloco = self.tamanho_bloco
+        for linha in range(self.num_linhas):
+            if self.validos[linha] and self.sujos[linha]:
+                conjunto = linha // self.associatividade
+                endereco = (self.tags[linha] * self.num_conjuntos + conjunto) * tamanho_bloco
+                base_dados = linha * tamanho_bloco
+                self.proximo.escrever_bloco(endereco, self.dados[base_dados:base_dados + tamanho_bloco])
+                self.sujos[linha] = 0
+                self.writebacks += 1
+
+        if isinstance(self.proximo, Cache):
+            self.proximo.descarregar()
+
+
+    def limpar(self, endereco):
+        """
+            Write-back de um bloco só: se o bloco que contém o endereço estiver
+            sujo na cache, ele volta para o nível de baixo e a linha continua
+            válida. Retorna a linha (-1 se o bloco não está na cache).
+        """
+
+        tag, index, _ = self._parse_endereco(endereco)
+        linha = self._procurar(index, tag)
+        if linha < 0 or not self.sujos[linha]:
+            return linha
+
+        tamanho_bloco = self.tamanho_bloco
+        base_dados = linha * tamanho_bloco
+        self.proximo.escrever_bloco(endereco - endereco % tamanho_bloco,
+                                    self.dados[base_dados:base_dados + tamanho_bloco])
+        self.sujos[linha] = 0
+        self.writebacks += 1
+        return linha
+
+
+    def invalidar(self, endereco):
+        """
+            Tira da cache o bloco que contém o endereço (se estiver nela).
+            Se a linha estiver suja, ela volta para a RAM antes.
+        """
+
+        linha = self.limpar(endereco)
+        if linha >= 0:
+            self.validos[linha] = 0
+
+
+    def esvaziar(self):
+        """
+            Invalida a cache inteira (as linhas sujas descem antes). Os níveis
+            de baixo continuam como estão.
+        """
+
+        self.descarregar()
+        self.validos[:] = bytes(self.num_linhas)
+
+
+    def imprimir_estatisticas(self, titulo="Cache"):
 
         total = self.hits + self.misses
 
         if total > 0:
             taxa_hit = (self.hits / total) * 100
-            print(f"\n Estatísticas da Cache: \n")
+            print(f"\n Estatísticas da {titulo}: \n")
             print(f"   Hits: {self.hits} | Misses: {self.misses}")
             print(f"   Taxa de Hit: {taxa_hit:.1f}%")
 
+            if self.hits_escrita or self.misses_escrita:
+                print(f"   Escritas: {self.hits_escrita} hits | {self.misses_escrita} misses")
+            if self.writebacks:
+                print(f"   Write-backs: {self.writebacks}")
+
+
+class CacheInstrucoes(Cache):
+    """
+        Cache de instruções (I-cache): só leitura.
+
+        A busca lê a palavra inteira com uma consulta só (Cache.ler_palavra).
+        Escritas não passam por aqui: quem grava na seção text avisa com
+        invalidar() para a próxima busca ir na RAM.
+    """
+
+    def __init__(self, memoria_principal, tamanho_bloco=16, num_linhas=8,
+                 associatividade=1, substituicao='LRU', semente=None,
+                 latencia=1, proximo_nivel=None):
+
+        if tamanho_bloco % 4 != 0:
+            raise ValueError("O bloco da I-cache precisa ter palavras inteiras")
+
+        super().__init__(memoria_principal, tamanho_bloco, num_linhas, associatividade,
+                         substituicao, WRITE_THROUGH, alocar_na_escrita=False, semente=semente,
+                         latencia=latencia, proximo_nivel=proximo_nivel)
+
+
+    def escrever_palavra(self, endereco, valor):
+        raise Exception("A cache de instruções é só leitura")
+
+    def escrever_byte(self, endereco, valor):
+        raise Exception("A cache de instruções é só leitura")
+
+
+def montar_hierarquia(memoria_principal, dados, instrucoes=None, compartilhados=()):
+    """
+        Monta a hierarquia L1D (+ L1I) -> níveis compartilhados -> memória.
+
+        dados, instrucoes: argumentos da Cache de dados e da CacheInstrucoes
+                           (instrucoes=None: busca e dados na mesma L1)
+        compartilhados: argumentos de cada nível unificado, de cima para baixo
+                        (ex: [L2, L3])
+
+        Retorna (cache_dados, cache_instrucoes ou None, [níveis compartilhados])
+    """
+
+    niveis = []
+    proximo = None
+    tamanho_bloco_baixo = None
+    for configuracao in reversed(compartilhados):
+        nivel = Cache(memoria_principal, proximo_nivel=proximo, **configuracao)
+        if tamanho_bloco_baixo is not None and tamanho_bloco_baixo < nivel.tamanho_bloco:
+            raise ValueError("O bloco de um nível não pode ser maior que o do nível de baixo")
+        tamanho_bloco_baixo = nivel.tamanho_bloco
+        niveis.insert(0, nivel)
+        proximo = nivel
+
+    cache_dados = Cache(memoria_principal, proximo_nivel=proximo, **dados)
+    cache_instrucoes = None
+    if instrucoes is not None:
+        cache_instrucoes = CacheInstrucoes(memoria_principal, proximo_nivel=proximo, **instrucoes)
+
+    for l1 in (cache_dados, cache_instrucoes):
+        if l1 is not None and tamanho_bloco_baixo is not None and l1.tamanho_bloco > tamanho_bloco_baixo:
+            raise ValueError("O bloco da L1 não pode ser maior que o do nível de baixo")
+
+    return cache_dados, cache_instrucoes, niveis
+
+
+def tempo_medio_acesso(nivel):
+    """
+        AMAT (average memory access time) a partir de um nível:
+            latência do hit + taxa de miss * AMAT do nível de baixo
+        Na memória principal é a latência dela.
+    """
+
+    if not isinstance(nivel, Cache):
+        return nivel.latencia
+
+    total = nivel.hits + nivel.misses
+    taxa_miss = nivel.misses / total if total else 0.0
+    return nivel.latencia + taxa_miss * tempo_medio_acesso(nivel.proximo)
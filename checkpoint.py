@@ -0,0 +1,84 @@
+"""
+    Checkpoint da máquina inteira em disco.
+
+    Salva o processador (pipeline ou funcional) com tudo que ele alcança:
+    registradores, PC, registradores de pipeline, flags de hazard, esperas
+    da hierarquia, preditores, contadores, as caches (conteúdo e
+    estatísticas) e a memória principal. Da memória só vão as páginas que
+    não são zero (ver Memoria.__getstate__).
+
+    Formato: cabeçalho fixo seguido do estado em pickle, opcionalmente
+    comprimido com zlib.
+
+        magic 'MCKP' | versão (u16) | flags (u16) | tamanho do estado (u64)
+
+    O estado é pickle, então só carregue checkpoints de origem confiável.
+"""
+
+import pickle
+import struct
+import zlib
+
+
+MAGIC = b'MCKP'
+VERSAO = 4   # 4: história do preditor nos registradores IF/ID e ID/EX
+
+FLAG_ZLIB = 0x1
+
+_CABECALHO = struct.Struct('<4sHHQ')
+
+
+def salvar_checkpoint(arquivo, processador, comprimir=True):
+    """
+        Grava o estado completo do processador no arquivo.
+        Retorna o número de bytes gravados.
+    """
+
+    estado = pickle.dumps(processador, protocol=pickle.HIGHEST_PROTOCOL)
+
+    flags = 0
+    if comprimir:
+        estado = zlib.compress(estado)
+        flags |= FLAG_ZLIB
+
+    with open(arquivo, 'wb') as f:
+        f.write(_CABECALHO.pack(MAGIC, VERSAO, flags, len(estado)))
+        f.write(estado)
+
+    return _CABECALHO.size + len(estado)
+
+
+def carregar_checkpoint(arquivo):
+    """
+        Lê um checkpoint gravado por salvar_checkpoint e devolve o processador,
+        pronto para continuar do ciclo em que parou.
+    """
+
+    with open(arquivo, 'rb') as f:
+        cabecalho = f.read(_CABECALHO.size)
+        if len(cabecalho) < _CABECALHO.size:
+            raise ValueError(f"{arquivo}: arquivo pequeno demais para um checkpoint")
+
+        magic, versao, flags, tamanho = _CABECALHO.unpack(cabecalho)
+        if magic != MAGIC:
+            raise ValueError(f"{arquivo}: não é um checkpoint do simulador")
+        if versao != VERSAO:
+            raise ValueError(f"{arquivo}: versão de checkpoint não suportada ({versao})")
+
+        estado = f.read(tamanho)
+        if len(estado) != tamanho:
+            raise ValueError(f"{arquivo}: checkpoint truncado")
+
+    # Cabeçalho válido com conteúdo corrompido também é checkpoint inválido
+    if flags & FLAG_ZLIB:
+        try:
+            estado = zlib.decompress(estado)
+        except zlib.error as e:
+            raise ValueError(f"{arquivo}: checkpoint corrompido ({e})") from e
+
+    # Pickle corrompido (sem zlib não há checksum) pode falhar com quase
+    # qualquer exceção: UnpicklingError, EOFError, UnicodeDecodeError, ...
+    try:
+        return pickle.loads(estado)
+    except Exception as e:
+        raise ValueError(f"{arquivo}: checkpoint corrompido ({e})") from e
@@ -0,0 +1,189 @@
+"""
+    Contadores de desempenho do pipeline (como os contadores de hardware).
+
+    Cada estágio do Processador incrementa os seus contadores direto nos
+    atributos; as métricas derivadas (CPI, IPC, taxas de miss) só são
+    calculadas em como_dict(). Para medir um intervalo, tire um instantâneo
+    antes e subtraia depois:
+
+        antes = cpu.contadores.instantaneo()
+        ...
+        intervalo = cpu.contadores.instantaneo() - antes
+"""
+
+
+# Classe de cada instrução (pelo subtipo do decodificador). O resto é ULA.
+CLASSE_POR_SUBTIPO = {
+    'lw': 'load',
+    'sw': 'store',
+    'beq': 'branch', 'bne': 'branch',
+    'j': 'jump', 'jal': 'jump',
+    'unknown': 'outras',
+}
+
+CLASSES = ('alu', 'load', 'store', 'branch', 'jump', 'outras')
+
+# Caminhos de forwarding (ver EX_stage): da instrução logo à frente (no
+# MEM) e da de duas à frente (no WB)
+CAMINHOS_ADIANTAMENTO = ('EX/MEM', 'MEM/WB')
+
+_CAMPOS = (
+    'ciclos', 'instrucoes',
+    'bolhas_load_use', 'flushes_branch', 'flushes_jump',
+    'ciclos_espera_busca', 'ciclos_espera_dados',
+    'desvios', 'desvios_errados', 'saltos', 'saltos_errados',
+    'acessos_instrucao', 'misses_instrucao',
+    'leituras_dados', 'misses_leitura_dados',
+    'escritas_dados', 'misses_escrita_dados',
+)
+
+
+class ContadoresDesempenho:
+
+    def __init__(self):
+        self.ciclos = 0
+        self.instrucoes = 0          # Instruções aposentadas (passaram pelo WB)
+
+        # Instruções aposentadas por subtipo (a classe sai de CLASSE_POR_SUBTIPO)
+        self.por_subtipo = {}
+
+        # Hazards
+        self.bolhas_load_use = 0     # Bolhas inseridas pelo load-use no ID
+        self.flushes_branch = 0      # Ciclos perdidos com instrução descartada por branch
+        self.flushes_jump = 0        # ... e por jump
+
+        # Previsão: branches condicionais e jumps resolvidos no EX,
+        # e quantos deles o IF previu errado (próximo PC diferente)
+        self.desvios = 0
+        self.desvios_errados = 0
+        self.saltos = 0
+        self.saltos_errados = 0
+
+        # Ciclos a mais esperando a hierarquia de memória num miss
+        self.ciclos_espera_busca = 0   # IF sem instrução para entregar
+        self.ciclos_espera_dados = 0   # Pipeline congelado pelo MEM
+
+        # Forwarding: operandos adiantados por caminho
+        self.adiantamentos = dict.fromkeys(CAMINHOS_ADIANTAMENTO, 0)
+
+        # Cache, contando um acesso por palavra (não por byte)
+        self.acessos_instrucao = 0
+        self.misses_instrucao = 0
+        self.leituras_dados = 0
+        self.misses_leitura_dados = 0
+        self.escritas_dados = 0
+        self.misses_escrita_dados = 0
+
+
+    def aposentou(self, subtipo):
+        """ Uma instrução saiu do WB """
+
+        self.instrucoes += 1
+        self.por_subtipo[subtipo] = self.por_subtipo.get(subtipo, 0) + 1
+
+
+    def por_classe(self):
+        """ Instruções aposentadas por classe (alu, load, store, branch, jump) """
+
+        classes = dict.fromkeys(CLASSES, 0)
+        for subtipo, quantidade in self.por_subtipo.items():
+            classes[CLASSE_POR_SUBTIPO.get(subtipo, 'alu')] += quantidade
+        return classes
+
+
+    def instantaneo(self):
+        """ Cópia dos contadores neste momento """
+
+        copia = ContadoresDesempenho()
+        for campo in _CAMPOS:
+            setattr(copia, campo, getattr(self, campo))
+        copia.por_subtipo = dict(self.por_subtipo)
+        copia.adiantamentos = dict(self.adiantamentos)
+        return copia
+
+    def __sub__(self, anterior):
+        """ Contadores do intervalo entre dois instantâneos """
+
+        intervalo = ContadoresDesempenho()
+        for campo in _CAMPOS:
+            setattr(intervalo, campo, getattr(self, campo) - getattr(anterior, campo))
+        intervalo.por_subtipo = {
+            subtipo: quantidade - anterior.por_subtipo.get(subtipo, 0)
+            for subtipo, quantidade in self.por_subtipo.items()
+        }
+        intervalo.adiantamentos = {
+            caminho: quantidade - anterior.adiantamentos.get(caminho, 0)
+            for caminho, quantidade in self.adiantamentos.items()
+        }
+        return intervalo
+
+
+    def cpi(self):
+        return self.ciclos / self.instrucoes if self.instrucoes else None
+
+    def ipc(self):
+        return self.instrucoes / self.ciclos if self.ciclos else None
+
+
+    def precisao_desvios(self):
+        """ Fração dos branches condicionais previstos certo """
+        return 1 - self.desvios_errados / self.desvios if self.desvios else None
+
+    def mpki(self):
+        """ Previsões erradas (branches e jumps) a cada mil instruções """
+        if not self.instrucoes:
+            return None
+        return (self.desvios_errados + self.saltos_errados) * 1000 / self.instrucoes
+
+
+    def como_dict(self):
+        """ Contadores e métricas derivadas num dicionário (para JSON/CSV) """
+
+        def taxa(misses, acessos):
+            return misses / acessos if acessos else 0.0
+
+        resultado = {campo: getattr(self, campo) for campo in _CAMPOS}
+        resultado.update({
+            'cpi': self.cpi(),
+            'ipc': self.ipc(),
+            'precisao_desvios': self.precisao_desvios(),
+            'mpki': self.mpki(),
+            'por_classe': self.por_classe(),
+            'por_subtipo': dict(self.por_subtipo),
+            'adiantamentos': dict(self.adiantamentos),
+            'taxa_miss_instrucao': taxa(self.misses_instrucao, self.acessos_instrucao),
+            'taxa_miss_dados': taxa(self.misses_leitura_dados + self.misses_escrita_dados,
+                                    self.leituras_dados + self.escritas_dados),
+        })
+        return resultado
+
+
+    def imprimir(self):
+
+        print(f"\n Contadores de Desempenho: \n")
+        print(f"   Ciclos: {self.ciclos} | Instruções: {self.instrucoes}")
+        if self.instrucoes:
+            print(f"   CPI: {self.cpi():.3f} | IPC: {self.ipc():.3f}")
+
+        classes = ", ".join(f"{classe}={n}" for classe, n in self.por_classe().items() if n)
+        if classes:
+            print(f"   Por classe: {classes}")
+
+        print(f"   Bolhas load-use: {self.bolhas_load_use}")
+        print(f"   Flushes: {self.flushes_branch} (branch) | {self.flushes_jump} (jump)")
+        if self.desvios:
+            print(f"   Branches: {self.desvios} | previstos errado: {self.desvios_errados} "
+                  f"| precisão: {self.precisao_desvios() * 100:.1f}%")
+        if self.desvios or self.saltos:
+            print(f"   Jumps: {self.saltos} (errados: {self.saltos_errados}) | MPKI: {self.mpki():.2f}")
+        if self.ciclos_espera_busca or self.ciclos_espera_dados:
+            print(f"   Espera por memória: {self.ciclos_espera_busca} ciclos (busca) | "
+                  f"{self.ciclos_espera_dados} ciclos (dados)")
+        print("   Forwarding: " + " | ".join(f"{caminho} {self.adiantamentos.get(caminho, 0)}"
+                                         for caminho in CAMINHOS_ADIANTAMENTO))
+
+        if self.acessos_instrucao:
+            print(f"   Busca: {self.acessos_instrucao} palavras | {self.misses_instrucao} misses")
+        if self.leituras_dados or self.escritas_dados:
+            print(f"   Dados: {self.leituras_dados} leituras ({self.misses_leitura_dados} misses) | "
+                  f"{self.escritas_dados} escritas ({self.misses_escrita_dados} misses)")
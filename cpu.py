@@ -1,12 +1,30 @@
+import eventos as ev
+from cache import WRITE_BACK
+from contadores import CAMINHOS_ADIANTAMENTO, ContadoresDesempenho
+from decodificador import com_sinal, decodificar_instrucao
+from preditores import BTB, PreditorNuncaTomado, criar_preditor
+from rastro import DADO, ESCRITA, INSTRUCAO, LEITURA
+from registradores_pipeline import RegistradorEXMEM, RegistradorIDEX, RegistradorIFID, RegistradorMEMWB
+
+
 class Processador:
 
-    def __init__(self, memoria_cache):
+    def __init__(self, memoria_cache, cache_instrucoes=None, preditor=None, btb=None):
         """ Recebe uma cache com acesso a memória principal. 
             Isso me garante que dentro da CPU tem "apenas" a CACHE.
 
             Para acessar a principal seria: cache.memoria_principal. ... 
+
+            cache_instrucoes: I-cache separada para o IF (ex: cache.CacheInstrucoes).
+            Sem ela, busca e loads/stores dividem a mesma cache.
+
+            preditor: previsão de branches no IF (nome em preditores.PREDITORES
+            ou um objeto com a mesma interface) e btb: preditores.BTB.
+            Sem os dois, o IF sempre segue para PC + 4 (desvio nunca tomado).
         """
         self.cache = memoria_cache
+        self.cache_instrucoes = cache_instrucoes if cache_instrucoes is not None else memoria_cache
+        self.caches_separadas = cache_instrucoes is not None
 
 
         # Registradores
@@ -15,102 +33,119 @@ class Processador:
         self.PC = self.cache.ram.text_inicio  # Começa no início da seção text
 
 
-        # Estruturas de dados que vai transitar entre os estágios.
+        # Registradores de pipeline (ver registradores_pipeline.py).
+        # Cada estágio lê o registrador atual (self.IF_ID, ...) e escreve o
+        # próximo (self.prox_IF_ID, ...); no fim do ciclo os dois trocam de
+        # lugar, então um estágio nunca pisa no que o seguinte ainda vai ler.
 
-        self.IF_ID = {
-            'instruction': 0,      # Instrução de 32 bits
-            'PC': 0,               # Endereço desta instrução
-            'PC_mais_4': 0,        # PC + 4 (para branches)
-            'valid': False         # Tem instrução válida?
-        }
+        self.IF_ID = RegistradorIFID()
+        self.ID_EX = RegistradorIDEX()
+        self.EX_MEM = RegistradorEXMEM()
+        self.MEM_WB = RegistradorMEMWB()
 
+        self.prox_IF_ID = RegistradorIFID()
+        self.prox_ID_EX = RegistradorIDEX()
+        self.prox_EX_MEM = RegistradorEXMEM()
+        self.prox_MEM_WB = RegistradorMEMWB()
 
-        self.ID_EX = {
-            # Campos para as instruções.
-            'opcode': 0,            
-            'rs': 0,                
-            'rt': 0,                
-            'rd': 0,                
-            'shamt': 0,             
-            'funct': 0,             
-            'immediate': 0,         
-            'immediate_signed': 0,  
-            'address': 0,           
-            
-            # Conjunto de informação semanticas para 
-            # identificação do tipo de instrução
-            'tipo': 'unknown',     # 'R', 'I', 'branch', 'jump', 'unknown'
-            'subtipo': 'unknown',  # 'add', 'lw', 'beq', 'j', etc.
-            'descricao': '',       # Descrição humana: "ADD R-type", "Load Word", etc.
-            
-            # Campo para os dados lidos dos registradores.
-            'dado1': 0,       # Valor do registrador rs
-            'dado2': 0,       # Valor do registrador rt
-            
-            # Sinais de controle || Vai ser propagada para o EX_MEM
-            'PC_mais_4': 0,        # PC + 4 (para branches e jumps)
-            'controle': {          # Sinais de controle da unidade principal
-                'RegWrite': 0, 'RegDst': 0, 'ALUSrc': 0, 'MemToReg': 0,
-                'MemRead': 0, 'MemWrite': 0, 'Branch': 0, 'ALUOp': 0
-            },
-            
-            # Metadados
-            'PC_origem': 0,        # PC onde esta instrução foi buscada (para debug)
-            'valid': False         # Indica se os dados são válidos
-        }
 
+        # Controle de execução
 
-        self.EX_MEM = {
+        self.ciclo = 0
+        self.rodando = True
+        self.instrucoes_executadas = 0   # Instruções aposentadas (passaram pelo WB)
 
-            # Dados processados
-            'ALU_result': 0,         # Resultado da ULA
-            'write_data': 0,         # Dado para stores (valor do registrador rt ?)
-            'write_reg': 0,          # Registrador destino (rt ou rd ?)
+        # Contadores de desempenho (ver contadores.py)
+        self.contadores = ContadoresDesempenho()
 
+        # Controle de hazards
 
-            # Sinais de controle
-            'MemRead': False,       # É instrução de load? lw
-            'MemWrite': False,      # É instrução de store? sw
-            'RegWrite': False,      # Escreve no banco de registradores?
-            'MemToReg': False,      # Dado veio da memoria ou da ULA
-            'Branch': False,        # É instrução de branch?
-            'branch_taken': False,  # A branch aconteceu?  ??
-            'branch_target': 0,     # Alvo do branch (se taken)
-            
-            'valid': False
-        }
+        self.stall_IF = False
+        self.stall_ID = False
 
-        self.MEM_WB = {
-            'write_data': 0,         # Dado para write back
-            'write_reg': 0,          # Registrador destino
-            'RegWrite': False,       # Controla write back
-            'MemToReg': False,       # Veio da ULA? para debug.
+        # Fim de programa: o IF para de buscar e o pipeline esvazia antes de parar
+        self.busca_encerrada = False
+        self.drenando = False          # Sem buscas novas até esvaziar (ver drenar)
 
-            'valid': False
-        }
+        # Latência da memória (caches bloqueantes, ver Cache.latencia):
+        # ciclos que ainda faltam para a busca/o load-store terminar
+        self.espera_IF = 0
+        self.busca_pendente = 0        # Instrução que está vindo da memória
+        self.espera_MEM = 0
+        self.resultado_MEM = RegistradorMEMWB()   # O que vai para o MEM_WB quando a espera acabar
+        self.congelado = False         # EX/ID/IF parados pelo MEM no ciclo anterior
+        self.ciclos_pulados = 0        # Ciclos só de espera que executar_ate pulou de uma vez
 
+        # Rastro de acessos à memória (rastro.RastroAcessos), opcional
+        self.rastro = None
 
-        # Controle de execução
+        # Previsão de desvios (ver preditores.py)
+        if isinstance(preditor, str):
+            preditor = criar_preditor(preditor)
+        if preditor is not None and btb is None:
+            btb = BTB()
+        if btb is not None and preditor is None:
+            preditor = PreditorNuncaTomado()
+        self.preditor = preditor
+        self.btb = btb
 
-        self.ciclo = 0
-        self.rodando = True
-        self.instrucoes_executadas = 0
+        # Eventos dos estágios (eventos.EventosPipeline), opcional
+        self.eventos = None
 
-        # Controle de hazards
+        # Custo de cada instrução por PC (perfil.PerfilInstrucoes), opcional
+        self.perfil = None
+        self.buscas = 0     # Contador de buscas, vira o 'seq' da instrução
 
-        self.stall_IF = False
-        self.stall_ID = False
+        # Cache de decodificação (PC -> InstrucaoDecodificada)
+        self.cache_decodificacao = {}
+
+
+    def __getstate__(self):
+        """
+            Estado para o checkpoint (ver checkpoint.py). Ficam de fora o
+            rastro (arquivo aberto) e a cache de decodificação, que é refeita
+            sob demanda.
+        """
+
+        estado = self.__dict__.copy()
+        estado['rastro'] = None
+        estado['cache_decodificacao'] = {}
+        return estado
+
+
+    def _invalidar_decodificacao(self, endereco):
+        """
+            Descarta a decodificação guardada da palavra que contém o endereço,
+            caso ele esteja no código carregado (o IF não busca depois de
+            fim_programa, então dados no resto da seção text não entram aqui).
+        """
+
+        ram = self.cache.ram
+        if ram.text_inicio <= endereco < ram.fim_programa:
+            self.cache_decodificacao.pop(endereco & ~0x3, None)
+
+            # Com I-cache separada, o bloco velho sai dela. A próxima busca lê
+            # da RAM, então uma D-cache write-back devolve a palavra nova antes
+            # (e a linha continua válida nela).
+            if self.caches_separadas:
+                if self.cache.escrita == WRITE_BACK:
+                    self.cache.limpar(endereco)
+                self.cache_instrucoes.invalidar(endereco)
 
 
     # Função auxiliar para verificar hazard de dados (Load-Use)
     def _verificar_conflito_memoria(self, rs, rt):
-        # Se a instrução anterior (que ta indo pro MEM) for um Load
+        # Se a instrução anterior (que ta no EX neste ciclo) for um Load
         # E ela vai escrever no registrador que a gente precisa agora...
-        if self.EX_MEM['valid'] and self.EX_MEM['MemRead']:
-            load_reg = self.EX_MEM['write_reg']
-            if load_reg != 0:
-                if load_reg == rs or load_reg == rt:
-                    return True # Tem conflito, precisa de Stall
+        # (lw escreve no rt)
+        anterior = self.ID_EX
+        if anterior.valid:
+            d = anterior.decodificada
+            if d.controle.MemRead:
+                load_reg = d.rt
+                if load_reg != 0:
+                    if load_reg == rs or load_reg == rt:
+                        return True # Tem conflito, precisa de Stall
         return False
 
 
@@ -121,44 +156,89 @@ class Processador:
         """
 
         # Controle de execução do IF_stage
-        if not self.rodando:
-            self.IF_ID['valid'] = False
+        if not self.rodando or self.busca_encerrada:
+            self.prox_IF_ID.valid = False
             return
 
 
-        # Deteção de fim de programa.
-        fim_do_programa = self.cache.ram.text_inicio + (60 * 4) # Aumentei um pouco a margem
-        if self.PC >= fim_do_programa:
-            self.rodando = False
-            # print("\n Fim do programa alcancado! \n")
+        # Miss na busca: a instrução ainda está vindo da memória
+        if self.espera_IF:
+            self.espera_IF -= 1
+            if self.espera_IF:
+                self.prox_IF_ID.valid = False
+            else:
+                self._entregar_busca(self.busca_pendente)
             return
 
 
         # Detecção de hazard - pausa o fetch
+        # (vem antes do fim de programa para não perder a instrução segurada)
         if self.stall_IF:
-            # self.IF_ID['valid'] = False # Não invalida, só segura
+            # Não invalida, só segura: o IF_ID do próximo ciclo é o mesmo
             # print("IF: Stall - fetch pausado")
+            self.prox_IF_ID.copiar_de(self.IF_ID)
+            return
+
+
+        # Drenando o pipeline (ver drenar): não entra mais nada
+        if self.drenando:
+            self.prox_IF_ID.valid = False
+            return
+
+
+        # Deteção de fim de programa.
+        if self.PC >= self.cache.ram.fim_programa:
+            # print("\n Fim do programa alcancado! \n")
+            self.busca_encerrada = True
+            self.prox_IF_ID.valid = False
             return
 
 
         # Verifica se não está estourando a memória fisica ou fora da memória fisica.
         if self.PC >= len(self.cache.ram.dados) - 3:
             self.rodando = False
-            self.IF_ID['valid'] = False
+            self.prox_IF_ID.valid = False
             print(F"IF: Erro {hex(self.PC)} fora da memória fisica")
             return
 
         # Busca da instrução. 
         # arrumar acesso a memoria.
 
+        if self.rastro is not None:
+            self.rastro.registrar(self.ciclo, self.PC, LEITURA | INSTRUCAO)
+
+        contadores = self.contadores
+        contadores.acessos_instrucao += 1
+        cache_instrucoes = self.cache_instrucoes
+        misses = cache_instrucoes.misses
+
         try: # Tenta acesso na Cache
 
-                instrucao = self.cache.ler_palavra(self.PC)
+                instrucao = cache_instrucoes.ler_palavra(self.PC)
+
+                if cache_instrucoes.misses != misses:
+                    contadores.misses_instrucao += 1
+                    if self.perfil is not None:
+                        self.perfil.miss_instrucao(self.PC)
                 
                 # Checagem de segurança pra ver se não é lixo de memória
                 if instrucao == 0xFFFFFFFF: 
-                    self.rodando = False
-                    self.IF_ID['valid'] = False
+                    # HALT: para de buscar, mas deixa quem já está no pipeline terminar
+                    self.busca_encerrada = True
+                    self.prox_IF_ID.valid = False
+                    return
+
+                # Ciclos além do próprio IF (miss que desceu na hierarquia)
+                espera = cache_instrucoes.latencia_acesso - 1
+                if espera > 0:
+                    self.espera_IF = espera
+                    self.busca_pendente = instrucao
+                    self.prox_IF_ID.valid = False
+                    contadores.ciclos_espera_busca += espera
+                    if self.perfil is not None:
+                        self.perfil.espera(self.PC, espera)
+                    if self.eventos is not None:
+                        self.eventos.registrar(self.ciclo, ev.ESPERA_BUSCA, self.buscas + 1, self.PC, espera)
                     return
 
         except Exception as cache_error:
@@ -171,217 +251,46 @@ class Processador:
 
                 # print(f"IF: Cache falhou em {hex(self.PC)}: {cache_error}")
                 self.rodando = False
-                self.IF_ID['valid'] = False
+                self.prox_IF_ID.valid = False
                 return
 
 
-        # Preenchendo a estrutura de dados.
-
-        self.IF_ID['instruction'] = instrucao
-        self.IF_ID['PC'] = self.PC
-        self.IF_ID['PC_mais_4'] = self.PC + 4 # Estágio "atual"
-        self.IF_ID['valid'] = True
-
-        # Atualiza a PC de forma global
-        self.PC += 4 # Assume que não é branch por padrão.
-
+        self._entregar_busca(instrucao)
 
 
+    def _entregar_busca(self, instrucao):
+        """ Coloca a instrução buscada no próximo IF_ID e avança o PC """
 
-    def _detectar_tipo_instrucao(self, opcode, funct):
-        """ 
-            Sub função do estágio ID para detecta o tipo 
-            e subtipo da instrução 
-        """
-
-         
-        # Constantes para melhor legibilidade
-        R_TYPE = 0x00
-        ADDI = 0x08
-        LW = 0x23
-        SW = 0x2B 
-        BEQ = 0x04 
-        BNE = 0x05 
-        J = 0x02 
-        JAL = 0x03
-        
-
-        if opcode == R_TYPE:
-           # Detecta subtipo R pela função
-            subtipos_r = {
-                0x20: 'add', 0x22: 'sub', 0x24: 'and', 0x25: 'or',
-                0x2A: 'slt', 0x00: 'sll', 0x02: 'srl'
-            }
-            
-            return {
-                'type': 'R',
-                'subtype': subtipos_r.get(funct, 'unknown'),
-                'descricao': f"R-type: {subtipos_r.get(funct, 'unknown')}"
-            }
-        
-        elif opcode in [LW, SW, ADDI]:
-            subtipos_i = {LW: 'lw', SW: 'sw', ADDI: 'addi'}
-            return {
-                'type': 'I', 
-                'subtype': subtipos_i[opcode],
-                'descricao': f"I-type: {subtipos_i[opcode]}"
-            }
-        
-        elif opcode in [BEQ, BNE]:
-            subtipos_branch = {BEQ: 'beq', BNE: 'bne'}
-            return {
-                'type': 'branch',
-                'subtype': subtipos_branch[opcode],
-                'descricao': f"Branch: {subtipos_branch[opcode]}"
-            }
-        
-        elif opcode in [J, JAL]:
-            return {
-                'type': 'jump',
-                'subtype': 'j' if opcode == J else 'jal',
-                'descricao': 'Jump' if opcode == J else 'Jump and Link'
-            }
-        
-        else:
-            return {
-                'type': 'unknown',
-                'subtype': 'unknown',
-                'descricao': f"Instrução desconhecida (opcode: {opcode:02x})"
-        }
-
-
-
-    def _mapear_funct_para_alu(self, funct_subtipo):
-        """
-            Sub-função auxiliar da mapear 
-            responsável por Mapear subtipo R para operação ALU
-        """
-
-        mapeamento = {
-                'add': 'ADD', 'sub': 'SUB', 'and': 'AND', 'or': 'OR',
-                'slt': 'SLT', 'sll': 'SLL', 'srl': 'SRL', 'nor': 'NOR'
-        }
-
-        return mapeamento.get(funct_subtipo, 'ADD')
-
-
-
-    # Verificar inconssistencias no EX, ori? OR? slti? 
-    def _mapear_opcode_para_alu(self, opcode_subtipo):
-        """
-            Mapeia subtipo I para operação ALU
-        """
-
-        mapeamento = {
-            'addi': 'ADD', 'andi': 'AND', 'ori': 'OR', 'slti': 'SLT'
-        }
-
-        return mapeamento.get(opcode_subtipo, 'ADD')
-
-
-            
-
-        # O cerébro do processador
-    def _gerar_sinais_controle(self, info_tipo):
-        """
-            Gera os sinais de controle baseado no tipo/subtipo da instrução
-            Retorna um dicionário com todos os sinais
-        """
-
-        # Constantes para os sinais
-        SIM = 1
-        NAO = 0
-
-        REG_DST_RD = 1    # Registrador destino é rd
-        REG_DST_RT = 0    # Registrador destino é rt
-
-        ALU_SRC_REG = 0   # Fonte ALU é registrador
-        ALU_SRC_IMM = 1   # Fonte ALU é immediate
-
-        MEM_TO_REG_ALU = 0  # Dado vem da ALU
-        MEM_TO_REG_MEM = 1  # Dado vem da memória
-
-        ALU_OP_ADD = 0     # ALU faz ADD
-        ALU_OP_SUB = 1     # ALU faz SUB
-        ALU_OP_FUNCT = 2   # ALU opera baseado no funct
-
-        # Está enviando o sinal padrao
-        sinais_padrao = {
-            'RegWrite': NAO, 
-            'RegDst': REG_DST_RT, 
-            'ALUSrc': ALU_SRC_REG,
-            'ALUOp': ALU_OP_ADD, 
-            'MemRead': NAO,  
-            'MemWrite': NAO, 
-            'MemToReg': MEM_TO_REG_ALU, 
-            'Branch': NAO, 
-            'Jump': NAO,
-            'ALUControl': 'ADD'
-        }
-
-
-        tipo = info_tipo['type']
-        subtipo = info_tipo.get('subtype', '')
+        # Preenchendo a estrutura de dados.
 
-        
-        mapeamento_sinais = {
-            # === R-TYPE ===
-            'R': {
-                **sinais_padrao,
-                'RegWrite': SIM, 'RegDst': REG_DST_RD, 'ALUOp': ALU_OP_FUNCT,
-                'ALUControl': self._mapear_funct_para_alu(subtipo)
-            },
-            
-            # === I-TYPE ===
-            'I': {
-                **sinais_padrao,
-                'RegWrite': SIM, 'ALUSrc': ALU_SRC_IMM,
-                'ALUControl': self._mapear_opcode_para_alu(subtipo)
-            },
-            
-            # === LOAD ===
-            'lw': {
-                **sinais_padrao,
-                'RegWrite': SIM, 'ALUSrc': ALU_SRC_IMM, 'MemRead': SIM,
-                'MemToReg': MEM_TO_REG_MEM, 'ALUControl': 'ADD'
-            },
-            
-            # === STORE ===  
-            'sw': {
-                **sinais_padrao,
-                'ALUSrc': ALU_SRC_IMM, 'MemWrite': SIM, 'MemRead': NAO, 'ALUControl': 'ADD'
-            },
-            
-            # === BRANCH ===
-            'branch': {
-                **sinais_padrao,
-                'ALUOp': ALU_OP_SUB, 'Branch': SIM, 'ALUControl': 'SUB'
-            },
-            
-            # === JUMP ===
-            'jump': {
-                **sinais_padrao,
-                'Jump': SIM, 'ALUControl': 'JUMP'
-            },
-            
-            # === JAL ===
-            'jal': {
-                **sinais_padrao, 
-                'RegWrite': SIM, 'Jump': SIM, 'ALUControl': 'JAL'
-            }
-        }
-        
+        self.buscas += 1
+
+        # Próximo PC: PC + 4, a não ser que a BTB conheça este PC e o
+        # desvio seja previsto como tomado
+        proximo = self.PC + 4
+        historia = 0
+        if self.btb is not None:
+            historia = self.preditor.historia
+            entrada = self.btb.buscar(self.PC)
+            if entrada is not None:
+                alvo, incondicional = entrada
+                if incondicional or self.preditor.prever(self.PC, alvo):
+                    proximo = alvo
+
+        if_id = self.prox_IF_ID
+        if_id.instruction = instrucao
+        if_id.PC = self.PC
+        if_id.PC_mais_4 = self.PC + 4 # Estágio "atual"
+        if_id.PC_seguinte = proximo
+        if_id.historia = historia
+        if_id.seq = self.buscas
+        if_id.valid = True
+
+        if self.eventos is not None:
+            self.eventos.registrar(self.ciclo, ev.BUSCA, self.buscas, self.PC, instrucao)
 
-        # Retorna os sinais de controle
-        # Inverti a ordem aqui pra priorizar o subtipo (lw/sw) antes do tipo (I)
-        if subtipo in mapeamento_sinais:
-            return mapeamento_sinais[subtipo]
-        
-        elif tipo in mapeamento_sinais:
-            return mapeamento_sinais[tipo]
-        
-        else:
-            return sinais_padrao
+        # Atualiza a PC de forma global
+        self.PC = proximo
 
 
 
@@ -392,74 +301,61 @@ class Processador:
         """
 
         # Controle de execução do ID_stage
-        if not self.IF_ID['valid']:
-            self.ID_EX['valid'] = False
+        if_id = self.IF_ID
+        id_ex = self.prox_ID_EX
+
+        if not if_id.valid:
+            id_ex.valid = False
             return
 
         
-        instrucao = self.IF_ID['instruction']
-
+        instrucao = if_id.instruction
+        pc = if_id.PC
 
-        # Extração dos campos da instrução
 
-        # Lógica do bitwise
-        opcode = (instrucao >> 26) & 0x3F
-        rs = (instrucao >> 21) & 0x1F
-        rt = (instrucao >> 16) & 0x1F
-        rd = (instrucao >> 11) & 0x1F
-        shamt = (instrucao >> 6) & 0x1F
-        funct = instrucao & 0x3F
+        # Decodificação com cache: em loops a mesma instrução passa aqui
+        # milhares de vezes, então só decodifica de verdade na primeira vez.
+        # A comparação com a palavra protege contra escritas que não passam
+        # pelo MEM_stage (ex: carregar um programa novo na RAM).
+        decodificada = self.cache_decodificacao.get(pc)
+        if decodificada is None or decodificada.instrucao != instrucao:
+            decodificada = decodificar_instrucao(instrucao)
+            self.cache_decodificacao[pc] = decodificada
 
+        rs = decodificada.rs
+        rt = decodificada.rt
 
-        # Pega os 16 bits inferiores
-        immediate = instrucao & 0xFFFF
-        address = instrucao & 0x3FFFFFF  # Para jumps
 
-
-        # Extensão de sinal
-        immediate_signed = immediate
-        if immediate & 0x8000:
-            immediate_signed -= 0x10000
-
-            
-        # Detecção do tipo (segundo a abordagem do Lucas)
-        info_tipo = self._detectar_tipo_instrucao(opcode, funct)
-
-
-        # Verificar se tem conflito (hazard) antes de gerar sinais
+        # Verificar se tem conflito (hazard) antes de repassar
         if self._verificar_conflito_memoria(rs, rt):
             # print("ID: Detectado conflito de Load-Use! Inserindo bolha...")
             self.stall_IF = True # Segura o IF
-            self.ID_EX['valid'] = False # Manda nada pro EX
+            id_ex.valid = False # Manda nada pro EX
+            self.contadores.bolhas_load_use += 1
+            if self.perfil is not None:
+                self.perfil.bolha(self.ID_EX.PC_origem)
+            if self.eventos is not None:
+                self.eventos.registrar(self.ciclo, ev.STALL, if_id.seq, pc,
+                                       self.ID_EX.decodificada.rt)
             return
 
         self.stall_IF = False # Libera se não tiver BO
 
+        if self.eventos is not None:
+            self.eventos.registrar(self.ciclo, ev.DECODIFICACAO, if_id.seq, pc, instrucao)
 
-        # Sinais de controle baseados no tipo (abordagem do Lucas)
-        sinais_controle = self._gerar_sinais_controle(info_tipo)
 
-
-        # Preenchimento da estrutura de dados.
-        self.ID_EX.update({
-            'opcode': opcode, 'rs': rs, 'rt': rt, 'rd': rd,
-            'shamt': shamt, 'funct': funct,
-            'immediate': immediate, 'immediate_signed': immediate_signed,
-            'address': address,
-            
-            # Informação semântica
-            'tipo': info_tipo['type'],
-            'subtipo': info_tipo.get('subtype', 'unknown'),
-            'descricao': info_tipo.get('descricao', ''),
-            
-            # Dados e controle
-            'dado1': self.registradores[rs],
-            'dado2': self.registradores[rt],
-            'PC_mais_4': self.IF_ID['PC_mais_4'],
-            'controle': sinais_controle,
-            'PC_origem': self.IF_ID['PC'],
-            'valid': True
-        })
+        # Preenchimento da estrutura de dados: os campos e os sinais de
+        # controle vêm da própria instrução decodificada
+        id_ex.decodificada = decodificada
+        id_ex.dado1 = self.registradores[rs]
+        id_ex.dado2 = self.registradores[rt]
+        id_ex.PC_mais_4 = if_id.PC_mais_4
+        id_ex.PC_origem = pc
+        id_ex.PC_seguinte = if_id.PC_seguinte
+        id_ex.historia = if_id.historia
+        id_ex.seq = if_id.seq
+        id_ex.valid = True
 
 
 
@@ -496,40 +392,64 @@ class Processador:
             'SUB': lambda a, b: (a - b) & 0xFFFFFFFF,
             'AND': lambda a, b: a & b,
             'OR':  lambda a, b: a | b,
-            'SLT': lambda a, b: 1 if (a & 0xFFFFFFFF) < (b & 0xFFFFFFFF) else 0,
+            'SLT': lambda a, b: 1 if com_sinal(a) < com_sinal(b) else 0,
 
-            # Shifts 
-            'SLL': lambda a, b: (a << (shamt & 0x1F)) & 0xFFFFFFFF,
-            'SRL': lambda a, b: (a >> (shamt & 0x1F)) & 0xFFFFFFFF,
-            'SRA': lambda a, b: self._shift_right_arithmetic(a, shamt),
+            # Shifts (no MIPS o valor deslocado é o rt, que chega como op2)
+            'SLL': lambda a, b: (b << (shamt & 0x1F)) & 0xFFFFFFFF,
+            'SRL': lambda a, b: (b >> (shamt & 0x1F)) & 0xFFFFFFFF,
+            'SRA': lambda a, b: self._shift_right_arithmetic(b, shamt),
         }    
 
         return operations.get(alu_control, lambda a, b: 0)(op1, op2)
 
 
 
-    def _aplicar_jump(self, address, subtipo):
+    def _alvo_jump(self, address):
         """ 
-            Função auxiliar da EX_stage para tratamento de branches
+            Função auxiliar da EX_stage: alvo de j/jal
         """
 
         target = address << 2
         
         # Mantém os 4 bits superiores do PC atual (ID stage PC)
-        pc_top = self.ID_EX['PC_mais_4'] & 0xF0000000
-        
-        if subtipo == 'j':
-            self.PC = pc_top | target
-        
-        elif subtipo == 'jal':
-            self.PC = pc_top | target
+        pc_top = self.ID_EX.PC_mais_4 & 0xF0000000
+
+        return pc_top | target
+
+
+    def _aplicar_jump(self, target):
+        """ 
+            Função auxiliar da EX_stage para tratamento de jumps
+        """
+
+        self.PC = target
+        self._registrar_flush(por_jump=True)
+        self.espera_IF = 0 # Busca que estava vindo da memória era do caminho errado
+        self.IF_ID.valid = False # O ID deste ciclo não decodifica a buscada errada
+        self.busca_encerrada = False # O HALT que o IF viu era do caminho errado
 
-        self.IF_ID['valid'] = False
-        self.ID_EX['valid'] = False
-        self.rodando = True # Garante que a CPU nao morra no meio do pulo
 
 
 
+    def _registrar_flush(self, por_jump):
+        """ Conta (e registra o evento) da instrução buscada no caminho errado, se houver """
+
+        if not self.IF_ID.valid:
+            return
+
+        if por_jump:
+            self.contadores.flushes_jump += 1
+        else:
+            self.contadores.flushes_branch += 1
+
+        # Cobrado do desvio que errou (ainda no ID_EX)
+        if self.perfil is not None:
+            self.perfil.flush(self.ID_EX.PC_origem)
+
+        if self.eventos is not None:
+            self.eventos.registrar(self.ciclo, ev.FLUSH, self.IF_ID.seq, self.IF_ID.PC)
+
+
 
     def _aplicar_branch(self, target):
         """
@@ -538,9 +458,10 @@ class Processador:
         """
         
         self.PC = target
-        self.IF_ID['valid'] = False
-        self.ID_EX['valid'] = False
-        self.rodando = True # Mantem rodando
+        self._registrar_flush(por_jump=False)
+        self.espera_IF = 0 # Busca que estava vindo da memória era do caminho errado
+        self.IF_ID.valid = False # O ID deste ciclo não decodifica a buscada errada
+        self.busca_encerrada = False # O HALT que o IF viu era do caminho errado
 
 
 
@@ -552,59 +473,66 @@ class Processador:
         # Atenção aqui em!!!!
     
         # Controle de execução.
-        if not self.ID_EX['valid']:
-            self.EX_MEM['valid'] = False
+        id_ex = self.ID_EX
+        if not id_ex.valid:
+            self.prox_EX_MEM.valid = False
             return
 
 
         # Preparação dos dados
-        # Shamt não está sendo usado (ID_EX)??
-
-        opcode = self.ID_EX['opcode']
-        rs = self.ID_EX['rs']
-        rt = self.ID_EX['rt']
-        rd = self.ID_EX['rd']
-        funct = self.ID_EX['funct']
-        immediate_signed = self.ID_EX['immediate_signed']
-        dado1 = self.ID_EX['dado1']
-        dado2 = self.ID_EX['dado2']
-        controle = self.ID_EX['controle']
-        tipo = self.ID_EX['tipo']
-        subtipo = self.ID_EX['subtipo']
-        PC_mais_4 = self.ID_EX['PC_mais_4']
-        shamt = self.ID_EX['shamt']
+
+        d = id_ex.decodificada
+        rs = d.rs
+        rt = d.rt
+        immediate_signed = d.immediate_signed
+        dado1 = id_ex.dado1
+        dado2 = id_ex.dado2
+        controle = d.controle
+        subtipo = d.subtipo
+        PC_mais_4 = id_ex.PC_mais_4
+        shamt = d.shamt
 
 
         # Tratamento de adiantamento (Forwarding). Se o dado ta logo ali na frente, pega ele.
+        # O EX_MEM atual é a instrução logo à frente (no MEM neste ciclo) e o
+        # MEM_WB atual a de duas à frente (no WB neste ciclo, que o ID não
+        # chegou a ler do banco).
+        ex_mem = self.EX_MEM
+        mem_wb = self.MEM_WB
         operando1 = dado1
         operando2 = dado2
         val_store = dado2 
+        fonte1 = fonte2 = 0   # De onde veio cada operando (para os eventos)
 
         # Forwarding pro Operando 1 (RS)
-        if self.EX_MEM['valid'] and self.EX_MEM['RegWrite'] and self.EX_MEM['write_reg'] == rs and rs != 0:
-             operando1 = self.EX_MEM['ALU_result']
-        elif self.MEM_WB['valid'] and self.MEM_WB['RegWrite'] and self.MEM_WB['write_reg'] == rs and rs != 0:
-             operando1 = self.MEM_WB['write_data']
+        if ex_mem.valid and ex_mem.RegWrite and ex_mem.write_reg == rs and rs != 0:
+             operando1 = ex_mem.ALU_result
+             fonte1 = ev.FONTE_EX_MEM
+        elif mem_wb.valid and mem_wb.RegWrite and mem_wb.write_reg == rs and rs != 0:
+             operando1 = mem_wb.write_data & 0xFFFFFFFF
+             fonte1 = ev.FONTE_MEM_WB
 
         # Forwarding pro Operando 2 (RT)
-        if self.EX_MEM['valid'] and self.EX_MEM['RegWrite'] and self.EX_MEM['write_reg'] == rt and rt != 0:
-             temp_val = self.EX_MEM['ALU_result']
+        if ex_mem.valid and ex_mem.RegWrite and ex_mem.write_reg == rt and rt != 0:
+             temp_val = ex_mem.ALU_result
              operando2 = temp_val
              val_store = temp_val # Se for SW, o dado a ser salvo tbm precisa ser atualizado
-        elif self.MEM_WB['valid'] and self.MEM_WB['RegWrite'] and self.MEM_WB['write_reg'] == rt and rt != 0:
-             temp_val = self.MEM_WB['write_data']
+             fonte2 = ev.FONTE_EX_MEM
+        elif mem_wb.valid and mem_wb.RegWrite and mem_wb.write_reg == rt and rt != 0:
+             temp_val = mem_wb.write_data & 0xFFFFFFFF
              operando2 = temp_val
              val_store = temp_val
+             fonte2 = ev.FONTE_MEM_WB
 
 
         # Verificar se usa imediate ou se vem do registrador
-        if controle['ALUSrc'] == 1: 
+        if controle.ALUSrc == 1: 
             operando2 = immediate_signed # uso de sinal para as operações.
         
 
         # Execução da ULA.
         alu_result = self._executar_operacao_alu(
-            controle['ALUControl'], 
+            controle.ALUControl, 
             operando1,            
             operando2,
             shamt
@@ -612,7 +540,12 @@ class Processador:
 
 
         # Controle de instrução: R usa rd e I usa rt
-        write_reg = self.ID_EX['rd'] if controle['RegDst'] == 1 else self.ID_EX['rt']
+        write_reg = d.rd if controle.RegDst == 1 else rt
+
+        # JAL: guarda o endereço de retorno no $ra
+        if controle.ALUControl == 'JAL':
+            alu_result = PC_mais_4
+            write_reg = 31
 
 
 
@@ -620,42 +553,107 @@ class Processador:
 
         branch_target = 0
         branch_taken = False
-        if controle['Branch']:
+        if controle.Branch:
             branch_target = PC_mais_4 + (immediate_signed << 2)
-            if alu_result == 0: # BEQ
-                branch_taken = True
-                self.rodando = True # Nao deixa parar no loop
+            # BEQ desvia quando a subtração dá zero, BNE quando não dá
+            branch_taken = (alu_result == 0) == (subtipo == 'beq')
+
+
+        # Preenche o próximo EX_MEM
+        prox = self.prox_EX_MEM
+        prox.ALU_result = alu_result
+        prox.write_data = val_store
+        prox.write_reg = write_reg
+
 
+        # Propagação dos sinais de controle. 
+        prox.MemRead = controle.MemRead
+        prox.MemWrite = controle.MemWrite
+        prox.RegWrite = controle.RegWrite
+        prox.MemToReg = controle.MemToReg
 
-        # Preenche EX_MEM
-        self.EX_MEM.update({
-            'ALU_result': alu_result,
-            'write_data': val_store,
-            'write_reg': write_reg,
 
+        # Controle de branches
+        prox.Branch = controle.Branch
+        prox.branch_taken = branch_taken
+        prox.branch_target = branch_target
 
-            # Propagação dos sinais de controle. 
-            'MemRead': controle.get('MemRead', False),
-            'MemWrite': controle.get('MemWrite', False),
-            'RegWrite': controle.get('RegWrite', False),
-            'MemToReg': controle.get('MemToReg', False),
+        prox.PC_origem = id_ex.PC_origem
+        prox.subtipo = subtipo
+        prox.seq = id_ex.seq
+        prox.valid = True
 
+        adiantamentos = self.contadores.adiantamentos
+        if fonte1:
+            adiantamentos[CAMINHOS_ADIANTAMENTO[fonte1 - 1]] += 1
+        if fonte2:
+            adiantamentos[CAMINHOS_ADIANTAMENTO[fonte2 - 1]] += 1
 
-            # Controle de branches
-            'Branch': controle.get('Branch', False),
-            'branch_taken': branch_taken,
-            'branch_target': branch_target if controle['Branch'] else 0,
+        if self.eventos is not None:
+            seq = id_ex.seq
+            pc = id_ex.PC_origem
+            if fonte1:
+                self.eventos.registrar(self.ciclo, ev.ADIANTAMENTO, seq, pc, rs, fonte1)
+            if fonte2:
+                self.eventos.registrar(self.ciclo, ev.ADIANTAMENTO, seq, pc, rt, fonte2)
 
-            'valid': True
-        })
+            if controle.Jump:
+                desvio = ev.SALTO
+            elif controle.Branch:
+                desvio = ev.DESVIO_TOMADO if branch_taken else ev.DESVIO_NAO_TOMADO
+            else:
+                desvio = ev.SEM_DESVIO
+            self.eventos.registrar(self.ciclo, ev.EXECUCAO, seq, pc, alu_result, desvio)
 
 
-        # Tratamento para branches e jumps
+        # Tratamento para branches e jumps: o próximo PC de verdade contra o
+        # que o IF usou (PC + 4 sem previsão, ou o que a BTB/preditor disseram)
 
+        salto = controle.Jump
         if branch_taken:
-            self._aplicar_branch(branch_target)
-        elif controle.get('Jump', False):
-            self._aplicar_jump(self.ID_EX['address'], subtipo)
+            proximo_pc = branch_target
+        elif salto:
+            proximo_pc = self._alvo_jump(d.address)
+        else:
+            proximo_pc = PC_mais_4
+
+        if controle.Branch or salto:
+            self._atualizar_previsao(salto, branch_taken, proximo_pc)
+
+        if proximo_pc != id_ex.PC_seguinte:
+            if salto:
+                self._aplicar_jump(proximo_pc)
+            else:
+                self._aplicar_branch(proximo_pc)
+
+
+    def _atualizar_previsao(self, salto, tomado, proximo_pc):
+        """
+            Função auxiliar do EX_stage: conta acertos/erros de previsão e
+            ensina o preditor e a BTB com o resultado do desvio.
+        """
+
+        pc = self.ID_EX.PC_origem
+        errou = proximo_pc != self.ID_EX.PC_seguinte
+
+        contadores = self.contadores
+        if salto:
+            contadores.saltos += 1
+            contadores.saltos_errados += errou
+        else:
+            contadores.desvios += 1
+            contadores.desvios_errados += errou
+
+        if self.btb is None:
+            return
+
+        if salto:
+            self.btb.atualizar(pc, proximo_pc, True)
+        else:
+            if tomado:
+                self.btb.atualizar(pc, proximo_pc, False)
+            # Treina com a história da previsão (ver preditores.py)
+            self.preditor.atualizar(pc, tomado, self.ID_EX.historia)
 
 
 
@@ -665,19 +663,29 @@ class Processador:
         """
 
 
+        # Miss no load/store: o acesso já foi feito, falta só o tempo passar
+        if self.espera_MEM:
+            self.espera_MEM -= 1
+            if self.espera_MEM:
+                self.prox_MEM_WB.valid = False
+            else:
+                # O resultado guardado vira o próximo MEM_WB (troca, sem cópia)
+                self.prox_MEM_WB, self.resultado_MEM = self.resultado_MEM, self.prox_MEM_WB
+            return
+
+
         # Controle de execução
-        if not self.EX_MEM['valid']:
-            self.MEM_WB['valid'] = False
+        ex_mem = self.EX_MEM
+        prox = self.prox_MEM_WB
+        if not ex_mem.valid:
+            prox.valid = False
             return
 
         # Dados da EX_MEM
-        alu_result = self.EX_MEM['ALU_result']
-        write_data = self.EX_MEM['write_data']
-        write_reg = self.EX_MEM['write_reg']
-        mem_read = self.EX_MEM['MemRead']
-        mem_write = self.EX_MEM['MemWrite']
-        reg_write = self.EX_MEM['RegWrite']
-        mem_to_reg = self.EX_MEM['MemToReg'] # Para debug
+        alu_result = ex_mem.ALU_result
+        write_data = ex_mem.write_data
+        mem_read = ex_mem.MemRead
+        mem_write = ex_mem.MemWrite
 
 
 
@@ -690,10 +698,20 @@ class Processador:
 
         # load (lw): Leitura da memória.
         if mem_read:
+            if self.rastro is not None:
+                self.rastro.registrar(self.ciclo, alu_result, LEITURA | DADO)
+
+            self.contadores.leituras_dados += 1
+            misses = self.cache.misses
+
             try:
                 endereco = alu_result
                 if hasattr(self, 'cache'):
                     write_back_data = self.cache.ler_palavra(endereco)
+                    if self.cache.misses != misses:
+                        self.contadores.misses_leitura_dados += 1
+                        if self.perfil is not None:
+                            self.perfil.miss_dados(ex_mem.PC_origem)
                 else:
                     # Não tem na cache vai na memória principal. (simpres igual genro na casa do sogro)
                     write_back_data = self.cache.ram.ler_palavra(endereco)
@@ -702,33 +720,73 @@ class Processador:
             except Exception as e:
                 # print(f"MEM: ERRO ao ler memória {hex(alu_result)}: {e}")
                 self.rodando = False
+                prox.valid = False
                 return
 
         # store (sw): Escreve na memória.
         elif mem_write:
+            if self.rastro is not None:
+                self.rastro.registrar(self.ciclo, alu_result, ESCRITA | DADO)
+
+            self.contadores.escritas_dados += 1
+            misses = self.cache.misses_escrita
+
             try:
                 endereco = alu_result
                 if hasattr(self, 'cache'):
                     self.cache.escrever_palavra(endereco, write_data)
+                    if self.cache.misses_escrita != misses:
+                        self.contadores.misses_escrita_dados += 1
+                        if self.perfil is not None:
+                            self.perfil.miss_dados(ex_mem.PC_origem)
                 else:
                     self.cache.ram.escrever_palavra(endereco, write_data)
 
             except Exception as e:
                 # print(f"MEM: ERRO ao escrever memória {hex(alu_result)}: {e}")
                 self.rodando = False
+                prox.valid = False
                 return
+
+            # Código auto-modificável: escreveu na seção text, a decodificação
+            # guardada para aquele PC não vale mais.
+            self._invalidar_decodificacao(endereco)
         #else:
             #print(" DEBUG MEM_stage: nao usou mem_write e nem mem_write" )
 
 
         # Preenchimento do MEM_WEB
-        self.MEM_WB.update({
-            'write_data': write_back_data,
-            'write_reg': write_reg,
-            'RegWrite': reg_write,
-            'MemToReg': mem_to_reg,  # Dado vem da ULA ou da memoria?
-            'valid': True
-        })
+        prox.write_data = write_back_data
+        prox.write_reg = ex_mem.write_reg
+        prox.RegWrite = ex_mem.RegWrite
+        prox.MemToReg = ex_mem.MemToReg  # Dado vem da ULA ou da memoria?
+        prox.PC_origem = ex_mem.PC_origem
+        prox.subtipo = ex_mem.subtipo
+        prox.seq = ex_mem.seq
+        prox.valid = True
+
+        # Ciclos além do próprio MEM (miss que desceu na hierarquia):
+        # o resultado fica guardado e o resto do pipeline congela
+        espera = self.cache.latencia_acesso - 1 if mem_read or mem_write else 0
+        if espera > 0:
+            self.espera_MEM = espera
+            self.prox_MEM_WB, self.resultado_MEM = self.resultado_MEM, prox
+            self.prox_MEM_WB.valid = False
+            self.contadores.ciclos_espera_dados += espera
+            if self.perfil is not None:
+                self.perfil.espera(ex_mem.PC_origem, espera)
+
+        if self.eventos is not None:
+            seq = ex_mem.seq
+            pc = ex_mem.PC_origem
+            if mem_read:
+                self.eventos.registrar(self.ciclo, ev.LEITURA_MEM, seq, pc, alu_result, write_back_data)
+            elif mem_write:
+                self.eventos.registrar(self.ciclo, ev.ESCRITA_MEM, seq, pc, alu_result, write_data & 0xFFFFFFFF)
+            else:
+                self.eventos.registrar(self.ciclo, ev.MEMORIA, seq, pc)
+            if espera > 0:
+                self.eventos.registrar(self.ciclo, ev.ESPERA_DADOS, seq, pc, espera)
 
 
 
@@ -739,14 +797,15 @@ class Processador:
 
 
         # Controle de execução.
-        if not self.MEM_WB['valid']:
+        mem_wb = self.MEM_WB
+        if not mem_wb.valid:
             return
 
 
         # Dados da MEM_WB
-        write_data = self.MEM_WB['write_data']
-        write_reg = self.MEM_WB['write_reg']
-        reg_write = self.MEM_WB['RegWrite']
+        write_data = mem_wb.write_data
+        write_reg = mem_wb.write_reg
+        reg_write = mem_wb.RegWrite
 
         
         # Escrita no banco de registradores (vetor[0] * 32).
@@ -754,19 +813,156 @@ class Processador:
             self.registradores[write_reg] = write_data & 0xFFFFFFFF  # Garante 32 bits
 
 
-        # Estatistica (quantidade de instruções e outras possibilidades.)
-        if reg_write and write_reg != 0:
-            self.instrucoes_executadas += 1
+        if self.eventos is not None:
+            escrito = write_reg if reg_write and write_reg != 0 else 0
+            self.eventos.registrar(self.ciclo, ev.WRITEBACK, mem_wb.seq,
+                                   mem_wb.PC_origem, escrito,
+                                   self.registradores[escrito] if escrito else 0)
+
+        # Estatistica: toda instrução que chega aqui foi aposentada
+        # (inclusive sw, branches e jumps, que não escrevem registrador)
+        self.instrucoes_executadas += 1
+        self.contadores.aposentou(mem_wb.subtipo)
+        if self.perfil is not None:
+            self.perfil.aposentou(mem_wb.PC_origem, self.ciclo)
 
 
     def executar_ciclo(self):
         """ Executa um ciclo completo do pipeline  """
 
         self.ciclo += 1
+        self.contadores.ciclos += 1
+
+        if self.rastro is not None:
+            self.rastro.ciclo = self.ciclo
 
-        # Ordem reversa: WB → MEM → EX → ID → IF
+        # Ordem reversa: WB → MEM → EX → ID → IF. Os dados dos registradores
+        # de pipeline já não dependem dela (cada estágio lê o atual e escreve
+        # o próximo), mas os sinais do mesmo ciclo sim: o WB escreve no banco
+        # antes do ID ler, o EX desvia o PC e mata o IF_ID antes do ID e do
+        # IF, o ID segura o IF e o MEM congela os três de trás.
         self.WB_stage()    # 5. Write Back
         self.MEM_stage()   # 4. Memory Access
-        self.EX_stage()    # 3. Execute
-        self.ID_stage()    # 2. Instruction Decode
-        self.IF_stage()    # 1. Instruction Fetch
+
+        if self.espera_MEM:
+            # MEM esperando a memória: EX, ID e IF ficam parados com o que têm
+            self.congelado = True
+            self.MEM_WB, self.prox_MEM_WB = self.prox_MEM_WB, self.MEM_WB
+        else:
+            if self.congelado:
+                self._reler_operandos()
+                self.congelado = False
+
+            self.EX_stage()    # 3. Execute
+            self.ID_stage()    # 2. Instruction Decode
+            self.IF_stage()    # 1. Instruction Fetch
+
+            # Fim do ciclo: o que foi escrito passa a ser o atual
+            self.IF_ID, self.prox_IF_ID = self.prox_IF_ID, self.IF_ID
+            self.ID_EX, self.prox_ID_EX = self.prox_ID_EX, self.ID_EX
+            self.EX_MEM, self.prox_EX_MEM = self.prox_EX_MEM, self.EX_MEM
+            self.MEM_WB, self.prox_MEM_WB = self.prox_MEM_WB, self.MEM_WB
+
+        # Depois do HALT, só para quando o pipeline esvaziar
+        if self.busca_encerrada and not self._pipeline_ocupado():
+            self.rodando = False
+
+
+    def executar_ate(self, limite, max_instrucoes=None):
+        """
+            Roda até o ciclo `limite`, até parar ou até aposentar
+            max_instrucoes. Os trechos em que o pipeline só espera a memória
+            (ver _ciclos_ociosos) avançam de uma vez, sem passar pelos
+            estágios; o resultado (ciclos, contadores, estado) é o mesmo de
+            chamar executar_ciclo() ciclo a ciclo.
+        """
+
+        while self.rodando and self.ciclo < limite:
+            if max_instrucoes is not None and self.instrucoes_executadas >= max_instrucoes:
+                break
+
+            ociosos = self._ciclos_ociosos()
+            if ociosos:
+                self._pular_ciclos(min(ociosos, limite - self.ciclo))
+            else:
+                self.executar_ciclo()
+
+
+    def _ciclos_ociosos(self):
+        """
+            Quantos dos próximos ciclos não mudam nada além das contagens de
+            espera, e podem ser pulados:
+
+            - MEM esperando a memória com o MEM_WB vazio: o WB não tem o que
+              aposentar e EX, ID e IF estão congelados;
+            - pipeline vazio esperando uma busca: só o IF conta a espera.
+
+            O último ciclo da espera (o que entrega o dado) fica de fora e
+            roda normalmente.
+        """
+
+        if self.espera_MEM > 1:
+            return 0 if self.MEM_WB.valid else self.espera_MEM - 1
+
+        if (self.espera_IF > 1 and not self.espera_MEM and not self.busca_encerrada
+                and not self._pipeline_ocupado()):
+            return self.espera_IF - 1
+
+        return 0
+
+
+    def _pular_ciclos(self, ciclos):
+        """ Avança `ciclos` ciclos ociosos (ver _ciclos_ociosos) de uma vez """
+
+        self.ciclo += ciclos
+        self.contadores.ciclos += ciclos
+        self.ciclos_pulados += ciclos
+
+        # Os ciclos de espera já foram contados quando o miss aconteceu
+        # (ciclos_espera_dados/ciclos_espera_busca); aqui só o tempo passa
+        if self.espera_MEM:
+            self.espera_MEM -= ciclos
+        else:
+            self.espera_IF -= ciclos
+
+
+    def _reler_operandos(self):
+        """
+            Depois de um congelamento, os operandos que o ID leu podem ter
+            sido escritos no banco pelo WB enquanto a instrução esperava
+            (e o forwarding do WB só vale no mesmo ciclo). O banco já tem
+            tudo que é mais antigo que o load/store que estava no MEM.
+        """
+
+        id_ex = self.ID_EX
+        if id_ex.valid:
+            id_ex.dado1 = self.registradores[id_ex.decodificada.rs]
+            id_ex.dado2 = self.registradores[id_ex.decodificada.rt]
+
+
+    def drenar(self):
+        """
+            Para de buscar e roda até o pipeline esvaziar (usado para trocar
+            de modo no meio da execução, ver amostragem.py). No fim, registradores
+            e memória são os de quem executou até a última instrução aposentada
+            e o PC é o da próxima. Retorna quantos ciclos levou.
+        """
+
+        inicio = self.ciclo
+        self.drenando = True
+        while self.rodando and (self._pipeline_ocupado() or self.espera_IF):
+            ociosos = self._ciclos_ociosos()
+            if ociosos:
+                self._pular_ciclos(ociosos)
+            else:
+                self.executar_ciclo()
+        self.drenando = False
+
+        return self.ciclo - inicio
+
+
+    def _pipeline_ocupado(self):
+        """ Tem alguma instrução válida em algum registrador de pipeline? """
+
+        return (self.IF_ID.valid or self.ID_EX.valid
+                or self.EX_MEM.valid or self.MEM_WB.valid)
@@ -0,0 +1,257 @@
+from collections import namedtuple
+
+
+# Registro imutável com tudo que o ID_stage precisa de uma instrução.
+# Como é uma tupla nomeada, é compacto e pode ser compartilhado entre ciclos
+# sem medo de alguém alterar no meio do caminho.
+InstrucaoDecodificada = namedtuple('InstrucaoDecodificada', [
+    'instrucao',         # Palavra de 32 bits original (usada para validar a cache)
+    'opcode', 'rs', 'rt', 'rd', 'shamt', 'funct',
+    'immediate',         # 16 bits inferiores
+    'immediate_signed',  # Immediate com extensão de sinal
+    'address',           # 26 bits inferiores (para jumps)
+    'tipo',              # 'R', 'I', 'branch', 'jump', 'unknown'
+    'subtipo',           # 'add', 'lw', 'beq', 'j', etc.
+    'descricao',         # Descrição humana
+    'controle',          # Sinais de controle (SinaisControle)
+    'alu_control'        # Operação da ULA (atalho para controle.ALUControl)
+])
+
+
+# Sinais de controle da unidade principal. Tupla nomeada: imutável e lida
+# por atributo (controle.MemRead) no caminho quente do EX/MEM.
+SinaisControle = namedtuple('SinaisControle', [
+    'RegWrite', 'RegDst', 'ALUSrc', 'ALUOp', 'MemRead', 'MemWrite',
+    'MemToReg', 'Branch', 'Jump', 'ALUControl'
+])
+
+
+# Constantes para melhor legibilidade
+R_TYPE = 0x00
+ADDI = 0x08
+LW = 0x23
+SW = 0x2B
+BEQ = 0x04
+BNE = 0x05
+J = 0x02
+JAL = 0x03
+
+
+SUBTIPOS_R = {
+    0x20: 'add', 0x22: 'sub', 0x24: 'and', 0x25: 'or',
+    0x2A: 'slt', 0x00: 'sll', 0x02: 'srl'
+}
+
+SUBTIPOS_I = {LW: 'lw', SW: 'sw', ADDI: 'addi'}
+
+SUBTIPOS_BRANCH = {BEQ: 'beq', BNE: 'bne'}
+
+
+def detectar_tipo_instrucao(opcode, funct):
+    """
+        Detecta o tipo e subtipo da instrução
+    """
+
+    if opcode == R_TYPE:
+        # Detecta subtipo R pela função
+        return {
+            'type': 'R',
+            'subtype': SUBTIPOS_R.get(funct, 'unknown'),
+            'descricao': f"R-type: {SUBTIPOS_R.get(funct, 'unknown')}"
+        }
+
+    elif opcode in SUBTIPOS_I:
+        return {
+            'type': 'I',
+            'subtype': SUBTIPOS_I[opcode],
+            'descricao': f"I-type: {SUBTIPOS_I[opcode]}"
+        }
+
+    elif opcode in SUBTIPOS_BRANCH:
+        return {
+            'type': 'branch',
+            'subtype': SUBTIPOS_BRANCH[opcode],
+            'descricao': f"Branch: {SUBTIPOS_BRANCH[opcode]}"
+        }
+
+    elif opcode in [J, JAL]:
+        return {
+            'type': 'jump',
+            'subtype': 'j' if opcode == J else 'jal',
+            'descricao': 'Jump' if opcode == J else 'Jump and Link'
+        }
+
+    else:
+        return {
+            'type': 'unknown',
+            'subtype': 'unknown',
+            'descricao': f"Instrução desconhecida (opcode: {opcode:02x})"
+        }
+
+
+def mapear_funct_para_alu(funct_subtipo):
+    """
+        Mapeia subtipo R para operação ALU
+    """
+
+    mapeamento = {
+        'add': 'ADD', 'sub': 'SUB', 'and': 'AND', 'or': 'OR',
+        'slt': 'SLT', 'sll': 'SLL', 'srl': 'SRL', 'nor': 'NOR'
+    }
+
+    return mapeamento.get(funct_subtipo, 'ADD')
+
+
+# Verificar inconssistencias no EX, ori? OR? slti?
+def mapear_opcode_para_alu(opcode_subtipo):
+    """
+        Mapeia subtipo I para operação ALU
+    """
+
+    mapeamento = {
+        'addi': 'ADD', 'andi': 'AND', 'ori': 'OR', 'slti': 'SLT'
+    }
+
+    return mapeamento.get(opcode_subtipo, 'ADD')
+
+
+# Os sinais só dependem de (tipo, subtipo), então cada combinação é montada
+# uma única vez e reaproveitada por todas as instruções iguais.
+_sinais_por_tipo = {}
+
+
+# O cerébro do processador
+def gerar_sinais_controle(info_tipo):
+    """
+        Gera os sinais de controle baseado no tipo/subtipo da instrução
+        Retorna um SinaisControle (compartilhado por todas as instruções iguais)
+    """
+
+    tipo = info_tipo['type']
+    subtipo = info_tipo.get('subtype', '')
+
+    chave = (tipo, subtipo)
+    sinais = _sinais_por_tipo.get(chave)
+    if sinais is None:
+        sinais = SinaisControle(**_montar_sinais_controle(tipo, subtipo))
+        _sinais_por_tipo[chave] = sinais
+
+    return sinais
+
+
+def _montar_sinais_controle(tipo, subtipo):
+    """
+        Monta só o dicionário de sinais que interessa para (tipo, subtipo)
+    """
+
+    # Constantes para os sinais
+    SIM = 1
+    NAO = 0
+
+    REG_DST_RD = 1    # Registrador destino é rd
+    REG_DST_RT = 0    # Registrador destino é rt
+
+    ALU_SRC_REG = 0   # Fonte ALU é registrador
+    ALU_SRC_IMM = 1   # Fonte ALU é immediate
+
+    MEM_TO_REG_ALU = 0  # Dado vem da ALU
+    MEM_TO_REG_MEM = 1  # Dado vem da memória
+
+    ALU_OP_ADD = 0     # ALU faz ADD
+    ALU_OP_SUB = 1     # ALU faz SUB
+    ALU_OP_FUNCT = 2   # ALU opera baseado no funct
+
+    # Está enviando o sinal padrao
+    sinais = {
+        'RegWrite': NAO,
+        'RegDst': REG_DST_RT,
+        'ALUSrc': ALU_SRC_REG,
+        'ALUOp': ALU_OP_ADD,
+        'MemRead': NAO,
+        'MemWrite': NAO,
+        'MemToReg': MEM_TO_REG_ALU,
+        'Branch': NAO,
+        'Jump': NAO,
+        'ALUControl': 'ADD'
+    }
+
+    # Prioriza o subtipo (lw/sw/jal) antes do tipo (I/jump)
+    if subtipo == 'lw':
+        sinais.update({
+            'RegWrite': SIM, 'ALUSrc': ALU_SRC_IMM, 'MemRead': SIM,
+            'MemToReg': MEM_TO_REG_MEM, 'ALUControl': 'ADD'
+        })
+
+    elif subtipo == 'sw':
+        sinais.update({
+            'ALUSrc': ALU_SRC_IMM, 'MemWrite': SIM, 'MemRead': NAO, 'ALUControl': 'ADD'
+        })
+
+    elif subtipo == 'jal':
+        sinais.update({
+            'RegWrite': SIM, 'Jump': SIM, 'ALUControl': 'JAL'
+        })
+
+    elif tipo == 'R':
+        sinais.update({
+            'RegWrite': SIM, 'RegDst': REG_DST_RD, 'ALUOp': ALU_OP_FUNCT,
+            'ALUControl': mapear_funct_para_alu(subtipo)
+        })
+
+    elif tipo == 'I':
+        sinais.update({
+            'RegWrite': SIM, 'ALUSrc': ALU_SRC_IMM,
+            'ALUControl': mapear_opcode_para_alu(subtipo)
+        })
+
+    elif tipo == 'branch':
+        sinais.update({
+            'ALUOp': ALU_OP_SUB, 'Branch': SIM, 'ALUControl': 'SUB'
+        })
+
+    elif tipo == 'jump':
+        sinais.update({
+            'Jump': SIM, 'ALUControl': 'JUMP'
+        })
+
+    return sinais
+
+
+def com_sinal(valor):
+    """ Interpreta 32 bits como inteiro com sinal (complemento de 2) """
+    return valor - 0x100000000 if valor & 0x80000000 else valor
+
+
+def decodificar_instrucao(instrucao):
+    """
+        Extrai os campos, detecta o tipo e gera os sinais de controle.
+        Retorna um InstrucaoDecodificada.
+    """
+
+    # Lógica do bitwise
+    opcode = (instrucao >> 26) & 0x3F
+    rs = (instrucao >> 21) & 0x1F
+    rt = (instrucao >> 16) & 0x1F
+    rd = (instrucao >> 11) & 0x1F
+    shamt = (instrucao >> 6) & 0x1F
+    funct = instrucao & 0x3F
+
+    # Pega os 16 bits inferiores
+    immediate = instrucao & 0xFFFF
+    address = instrucao & 0x3FFFFFF  # Para jumps
+
+    # Extensão de sinal
+    immediate_signed = immediate
+    if immediate & 0x8000:
+        immediate_signed -= 0x10000
+
+    info_tipo = detectar_tipo_instrucao(opcode, funct)
+    controle = gerar_sinais_controle(info_tipo)
+
+    return InstrucaoDecodificada(
+        instrucao, opcode, rs, rt, rd, shamt, funct,
+        immediate, immediate_signed, address,
+        info_tipo['type'], info_tipo.get('subtype', 'unknown'),
+        info_tipo.get('descricao', ''),
+        controle, controle.ALUControl
+    )
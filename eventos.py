@@ -0,0 +1,288 @@
+"""
+    Eventos do pipeline num buffer circular de tamanho fixo.
+
+    O Processador anota o que cada estágio fez (busca, decodificação, stall,
+    flush, forwarding, acesso à memória, write back) como números em vetores
+    pré-alocados; quando o buffer enche, os eventos mais antigos são
+    sobrescritos. Nada é formatado durante a simulação: texto, trace do Chrome
+    e diagrama do pipeline só são montados na hora de despejar.
+
+    Cada evento: (ciclo, tipo, seq, pc, a, b)
+        seq: número de ordem da busca (identifica a instrução no pipeline)
+        pc:  endereço da instrução
+        a, b: dependem do tipo (ver formatar_evento)
+
+    Uso:
+        cpu.eventos = EventosPipeline(4096)
+        ...
+        cpu.eventos.exportar_chrome('trace.json')   # abrir em chrome://tracing
+        print(cpu.eventos.diagrama())
+"""
+
+import json
+import sys
+from array import array
+
+from decodificador import decodificar_instrucao
+
+
+# Tipos de evento
+BUSCA = 0           # a = instrução
+DECODIFICACAO = 1   # a = instrução
+EXECUCAO = 2        # a = resultado da ULA, b = DESVIO_*
+MEMORIA = 3         # Passou pelo MEM sem acessar a memória
+LEITURA_MEM = 4     # a = endereço, b = valor lido
+ESCRITA_MEM = 5     # a = endereço, b = valor gravado
+WRITEBACK = 6       # a = registrador (0 = nenhum), b = valor
+STALL = 7           # a = registrador do load que causou a bolha
+FLUSH = 8           # Instrução descartada por branch/jump
+ADIANTAMENTO = 9    # a = registrador, b = FONTE_*
+ESPERA_BUSCA = 10   # Miss na busca: a = ciclos a mais esperando a memória
+ESPERA_DADOS = 11   # Miss no load/store: a = ciclos a mais (o pipeline congela)
+
+# Resultado do desvio no EXECUCAO
+SEM_DESVIO = 0
+DESVIO_NAO_TOMADO = 1
+DESVIO_TOMADO = 2
+SALTO = 3
+
+# De onde veio o valor adiantado
+FONTE_EX_MEM = 1
+FONTE_MEM_WB = 2
+
+ESTAGIOS = ('IF', 'ID', 'EX', 'MEM', 'WB')
+
+# Estágio de cada tipo de evento (índice em ESTAGIOS)
+ESTAGIO_DO_TIPO = {
+    BUSCA: 0, ESPERA_BUSCA: 0,
+    DECODIFICACAO: 1, STALL: 1, FLUSH: 1,
+    EXECUCAO: 2, ADIANTAMENTO: 2,
+    MEMORIA: 3, LEITURA_MEM: 3, ESCRITA_MEM: 3, ESPERA_DADOS: 3,
+    WRITEBACK: 4,
+}
+
+NOMES_TIPO = {
+    BUSCA: 'busca', DECODIFICACAO: 'decodificacao', EXECUCAO: 'execucao',
+    MEMORIA: 'memoria', LEITURA_MEM: 'leitura', ESCRITA_MEM: 'escrita',
+    WRITEBACK: 'writeback', STALL: 'stall', FLUSH: 'flush',
+    ADIANTAMENTO: 'adiantamento', ESPERA_BUSCA: 'espera_busca',
+    ESPERA_DADOS: 'espera_dados',
+}
+
+_NOMES_FONTE = {FONTE_EX_MEM: 'EX/MEM', FONTE_MEM_WB: 'MEM/WB'}
+_NOMES_DESVIO = {DESVIO_NAO_TOMADO: ' -> Branch NÃO TOMADO', DESVIO_TOMADO: ' -> Branch TOMADO',
+                 SALTO: ' -> Jump'}
+
+
+class EventosPipeline:
+    """
+        Buffer circular com os últimos `capacidade` eventos do pipeline.
+        Os campos ficam em vetores paralelos, um elemento por evento.
+    """
+
+    def __init__(self, capacidade=65536):
+        if capacidade <= 0:
+            raise ValueError("capacidade precisa ser positiva")
+
+        self.capacidade = capacidade
+        self.ciclos = array('Q', bytes(8 * capacidade))
+        self.tipos = bytearray(capacidade)
+        self.seqs = array('Q', bytes(8 * capacidade))
+        self.pcs = array('I', bytes(4 * capacidade))
+        self.campos_a = array('q', bytes(8 * capacidade))
+        self.campos_b = array('q', bytes(8 * capacidade))
+
+        self.total = 0      # Eventos registrados desde o início (inclui os sobrescritos)
+
+    def registrar(self, ciclo, tipo, seq, pc, a=0, b=0):
+        """ Anota um evento (sobrescreve o mais antigo se o buffer estiver cheio) """
+
+        i = self.total % self.capacidade
+        self.ciclos[i] = ciclo
+        self.tipos[i] = tipo
+        self.seqs[i] = seq
+        self.pcs[i] = pc & 0xFFFFFFFF
+        self.campos_a[i] = a
+        self.campos_b[i] = b
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacidade)
+
+    def limpar(self):
+        self.total = 0
+
+    def eventos(self, desde_ciclo=0):
+        """
+            Eventos guardados, do mais antigo ao mais novo, como tuplas
+            (ciclo, tipo, seq, pc, a, b). desde_ciclo filtra os mais antigos.
+        """
+
+        quantidade = len(self)
+        inicio = self.total - quantidade
+        for n in range(inicio, self.total):
+            i = n % self.capacidade
+            if self.ciclos[i] >= desde_ciclo:
+                yield (self.ciclos[i], self.tipos[i], self.seqs[i], self.pcs[i],
+                       self.campos_a[i], self.campos_b[i])
+
+    def ultimo_ciclo(self):
+        if not self.total:
+            return 0
+        return self.ciclos[(self.total - 1) % self.capacidade]
+
+    def _desde_ultimos(self, ultimos_ciclos):
+        if ultimos_ciclos is None:
+            return 0
+        return max(self.ultimo_ciclo() - ultimos_ciclos + 1, 0)
+
+
+    def despejar(self, saida=None, ultimos_ciclos=None):
+        """
+            Escreve os eventos em texto, agrupados por ciclo
+            (por padrão na saída padrão).
+        """
+
+        if saida is None:
+            saida = sys.stdout
+
+        ciclo_atual = None
+        for evento in self.eventos(self._desde_ultimos(ultimos_ciclos)):
+            if evento[0] != ciclo_atual:
+                ciclo_atual = evento[0]
+                saida.write(f"--- CICLO {ciclo_atual:03d} " + "-"*45 + "\n")
+            saida.write("  " + formatar_evento(evento) + "\n")
+
+
+    def trace_chrome(self, ultimos_ciclos=None):
+        """
+            Eventos no formato trace_event do Chrome (chrome://tracing, Perfetto).
+            Um ciclo vale 1 µs; cada estágio é uma "thread".
+        """
+
+        trace = [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': estagio,
+                  'args': {'name': nome}} for estagio, nome in enumerate(ESTAGIOS)]
+        trace.append({'name': 'process_name', 'ph': 'M', 'pid': 0,
+                      'args': {'name': 'pipeline MIPS'}})
+
+        nomes = {}  # seq -> nome da instrução (da busca)
+
+        for ciclo, tipo, seq, pc, a, b in self.eventos(self._desde_ultimos(ultimos_ciclos)):
+            if tipo in (BUSCA, DECODIFICACAO):
+                nomes[seq] = _nome_instrucao(a)
+            nome = nomes.get(seq, hex(pc))
+
+            args = {'seq': seq, 'pc': hex(pc)}
+            registro = {'pid': 0, 'tid': ESTAGIO_DO_TIPO[tipo], 'ts': ciclo, 'args': args}
+
+            if tipo in (STALL, FLUSH, ADIANTAMENTO, ESPERA_BUSCA, ESPERA_DADOS):
+                # Marcadores instantâneos por cima da instrução
+                registro.update(name=f"{NOMES_TIPO[tipo]} {nome}", ph='i', s='t')
+                if tipo == STALL:
+                    args['registrador'] = a
+                elif tipo == ADIANTAMENTO:
+                    args['registrador'] = a
+                    args['fonte'] = _NOMES_FONTE.get(b, b)
+                else:
+                    args['ciclos'] = a
+            else:
+                registro.update(name=nome, ph='X', dur=1)
+                if tipo == EXECUCAO:
+                    args['ula'] = a
+                elif tipo in (LEITURA_MEM, ESCRITA_MEM):
+                    args['endereco'] = hex(a)
+                    args['valor'] = b
+                elif tipo == WRITEBACK and a:
+                    args['registrador'] = a
+                    args['valor'] = b
+
+            trace.append(registro)
+
+        return {'traceEvents': trace, 'displayTimeUnit': 'ns'}
+
+    def exportar_chrome(self, arquivo, ultimos_ciclos=None):
+        """ Grava o trace do Chrome em JSON """
+
+        with open(arquivo, 'w') as f:
+            json.dump(self.trace_chrome(ultimos_ciclos), f)
+
+
+    def diagrama(self, ultimos_ciclos=None):
+        """
+            Diagrama clássico do pipeline: uma linha por instrução, uma coluna
+            por ciclo, com o estágio em que a instrução estava em cada ciclo.
+            Stall aparece como 'st' e instrução descartada como 'xx'.
+        """
+
+        linhas = {}     # seq -> [pc, nome, {ciclo: marca}]
+
+        for ciclo, tipo, seq, pc, a, b in self.eventos(self._desde_ultimos(ultimos_ciclos)):
+            linha = linhas.get(seq)
+            if linha is None:
+                linha = linhas[seq] = [pc, '?', {}]
+            if tipo in (BUSCA, DECODIFICACAO):
+                linha[1] = _nome_instrucao(a)
+
+            if tipo == STALL:
+                marca = 'st'
+            elif tipo == FLUSH:
+                marca = 'xx'
+            elif tipo in (ADIANTAMENTO, ESPERA_BUSCA, ESPERA_DADOS):
+                continue
+            else:
+                marca = ESTAGIOS[ESTAGIO_DO_TIPO[tipo]]
+            linha[2][ciclo] = marca
+
+        if not linhas:
+            return ""
+
+        primeiro = min(min(l[2]) for l in linhas.values() if l[2])
+        ultimo = max(max(l[2]) for l in linhas.values() if l[2])
+
+        cabecalho = f"{'PC':>8} {'instr':<6}|" + "".join(f"{c % 1000:>4}" for c in range(primeiro, ultimo + 1))
+        saida = [cabecalho, "-" * len(cabecalho)]
+        for seq in sorted(linhas):
+            pc, nome, marcas = linhas[seq]
+            celulas = "".join(f"{marcas.get(c, ''):>4}" for c in range(primeiro, ultimo + 1))
+            saida.append(f"{pc:>8x} {nome:<6}|{celulas}")
+
+        return "\n".join(saida)
+
+
+def _nome_instrucao(instrucao):
+    return decodificar_instrucao(instrucao).subtipo
+
+
+def formatar_evento(evento):
+    """ Uma linha de texto para o evento (ciclo, tipo, seq, pc, a, b) """
+
+    _, tipo, seq, pc, a, b = evento
+
+    if tipo == BUSCA:
+        return f"[IF]  BUSCA   : PC {hex(pc)} -> Instrução {hex(a)}"
+    if tipo == DECODIFICACAO:
+        return f"[ID]  DECODE  : Preparando instrução '{_nome_instrucao(a).upper()}' (PC {hex(pc)})"
+    if tipo == STALL:
+        return f"[ID]  STALL   : Load-use em ${a}, bolha inserida (PC {hex(pc)})"
+    if tipo == FLUSH:
+        return f"[ID]  FLUSH   : Instrução do PC {hex(pc)} descartada"
+    if tipo == EXECUCAO:
+        return f"[EX]  EXECUÇÃO: PC {hex(pc)} | Resultado ULA: {hex(a & 0xFFFFFFFF)}{_NOMES_DESVIO.get(b, '')}"
+    if tipo == ADIANTAMENTO:
+        return f"[EX]  FORWARD : ${a} vem do {_NOMES_FONTE.get(b, b)}"
+    if tipo == MEMORIA:
+        return f"[MEM] Passagem: Apenas repassando dados (sem acesso à RAM)"
+    if tipo == LEITURA_MEM:
+        return f"[MEM] LEITURA : Endereço {hex(a)} -> {b} (Hex: {hex(b)}) (LW)"
+    if tipo == ESCRITA_MEM:
+        return f"[MEM] GRAVANDO: Valor {b} (Hex: {hex(b)}) no endereço {hex(a)} (SW)"
+    if tipo == ESPERA_BUSCA:
+        return f"[IF]  MISS    : PC {hex(pc)} esperando a memória por mais {a} ciclo(s)"
+    if tipo == ESPERA_DADOS:
+        return f"[MEM] MISS    : Pipeline congelado por mais {a} ciclo(s) (PC {hex(pc)})"
+    if tipo == WRITEBACK:
+        if a:
+            return f"[WB]  ESCRITA : Reg ${a} recebe {hex(b)} (Dec: {b})"
+        return f"[WB]  Nenhuma escrita em registrador."
+
+    return f"evento {tipo} seq={seq} pc={hex(pc)} a={a} b={b}"
@@ -0,0 +1,299 @@
+from decodificador import com_sinal, decodificar_instrucao
+from tradutor import TradutorBlocos
+
+
+class ProcessadorFuncional:
+    """
+        Modo funcional (nível de ISA): executa uma instrução inteira por passo,
+        sem registradores de pipeline, forwarding ou stalls.
+
+        Serve para quando só interessa o estado final (registradores e memória).
+        Usa a mesma Cache/Memoria do pipeline e a mesma decodificação, então o
+        resultado arquitetural é o mesmo do Processador.
+    """
+
+    def __init__(self, memoria_cache, registradores=None, traduzir_blocos=False):
+        """
+            traduzir_blocos: executa blocos básicos compilados (ver tradutor.py)
+            em vez de despachar instrução por instrução.
+        """
+        self.cache = memoria_cache
+
+        # Registradores (pode receber o banco de outro processador para continuar dele)
+        if registradores is None:
+            registradores = [0] * 32
+            registradores[29] = self.cache.ram.pilha_fim  # $sp no topo da pilha
+        self.registradores = registradores
+        self.PC = self.cache.ram.text_inicio
+
+        # Controle de execução
+        self.rodando = True
+        self.instrucoes_executadas = 0
+
+        # PC -> (função que executa, InstrucaoDecodificada)
+        self.cache_decodificacao = {}
+
+        self.tradutor = None
+        if traduzir_blocos:
+            self.tradutor = TradutorBlocos(memoria_cache, invalidar=self._invalidar_decodificacao)
+
+        self.despacho = self._montar_despacho()
+
+
+    def _montar_despacho(self):
+        # Tabela de despacho. Loads, stores, branches e jumps vão pelo subtipo;
+        # o resto dos tipos R e I vai pela operação da ULA (igual o EX_stage).
+        return {
+            ('R', 'ADD'): self._add,
+            ('R', 'SUB'): self._sub,
+            ('R', 'AND'): self._and,
+            ('R', 'OR'): self._or,
+            ('R', 'SLT'): self._slt,
+            ('R', 'SLL'): self._sll,
+            ('R', 'SRL'): self._srl,
+            ('I', 'ADD'): self._addi,
+            'lw': self._lw,
+            'sw': self._sw,
+            'beq': self._beq,
+            'bne': self._bne,
+            'j': self._j,
+            'jal': self._jal,
+        }
+
+
+    def __getstate__(self):
+        """
+            Estado para o checkpoint (ver checkpoint.py). A tabela de despacho,
+            a cache de decodificação e os blocos traduzidos são refeitos na carga.
+        """
+
+        estado = self.__dict__.copy()
+        del estado['despacho']
+        estado['cache_decodificacao'] = {}
+        estado['tradutor'] = self.tradutor is not None
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self.despacho = self._montar_despacho()
+        if self.tradutor:
+            self.tradutor = TradutorBlocos(self.cache, invalidar=self._invalidar_decodificacao)
+        else:
+            self.tradutor = None
+
+
+    def _buscar(self, pc):
+        """
+            Busca e decodifica a instrução do PC. Devolve None se for fim de programa.
+        """
+
+        ram = self.cache.ram
+
+        # Mesma regra de fim de programa do IF_stage
+        if pc >= ram.fim_programa:
+            return None
+
+        # Pela cache (sem contar acesso), para enxergar stores ainda não
+        # gravados na RAM quando a cache é write-back
+        instrucao = self.cache.espiar_palavra(pc)
+        if instrucao == 0xFFFFFFFF:  # HALT
+            return None
+
+        decodificada = decodificar_instrucao(instrucao)
+
+        # Prioriza o subtipo (lw/sw são tipo I), igual aos sinais de controle
+        executar = self.despacho.get(decodificada.subtipo)
+        if executar is None:
+            # Instrução que o pipeline não reconhece não escreve nada (vira NOP)
+            chave = (decodificada.tipo, decodificada.alu_control)
+            executar = self.despacho.get(chave, self._nop)
+
+        entrada = (executar, decodificada)
+        self.cache_decodificacao[pc] = entrada
+        return entrada
+
+
+    def passo(self):
+        """
+            Executa (e aposenta) uma instrução.
+        """
+
+        if not self.rodando:
+            return
+
+        pc = self.PC
+        entrada = self.cache_decodificacao.get(pc)
+        if entrada is None:
+            try:
+                entrada = self._buscar(pc)
+            except Exception:
+                entrada = None
+
+            if entrada is None:
+                self.rodando = False
+                return
+
+        executar, d = entrada
+        try:
+            self.PC = executar(d, pc)
+        except Exception:
+            # Mesmo comportamento do MEM_stage: erro de memória para a CPU
+            self.rodando = False
+            return
+
+        self.registradores[0] = 0
+        self.instrucoes_executadas += 1
+
+
+    def executar(self, max_instrucoes=None):
+        """
+            Roda até o HALT (ou até max_instrucoes). Retorna quantas instruções rodou.
+        """
+
+        inicio = self.instrucoes_executadas
+        passo = self.passo
+
+        if self.tradutor is not None:
+            self._executar_blocos(max_instrucoes)
+
+        if max_instrucoes is None:
+            while self.rodando:
+                passo()
+        else:
+            limite = inicio + max_instrucoes
+            while self.rodando and self.instrucoes_executadas < limite:
+                passo()
+
+        return self.instrucoes_executadas - inicio
+
+
+    def _executar_blocos(self, max_instrucoes=None):
+        """
+            Despacha blocos traduzidos até o HALT. Com limite de instruções, para
+            antes do bloco que passaria do limite (o resto vai pelo passo()).
+        """
+
+        obter = self.tradutor.obter
+        r = self.registradores
+        pc = self.PC
+        executadas = self.instrucoes_executadas
+        limite = None if max_instrucoes is None else executadas + max_instrucoes
+
+        try:
+            while True:
+                bloco = obter(pc)
+                if bloco is None:
+                    # Fim de programa: o passo() cuida de parar a CPU
+                    break
+
+                funcao, tamanho = bloco
+                if limite is not None and executadas + tamanho > limite:
+                    break
+
+                proximo, n = funcao(r)
+                executadas += n
+                if proximo is None:
+                    # Erro de memória na instrução n do bloco (mesmo comportamento
+                    # do MEM_stage): as anteriores já foram aposentadas e o PC
+                    # fica na que falhou, igual ao passo()
+                    pc += 4 * n
+                    self.rodando = False
+                    break
+                pc = proximo
+
+        except Exception:
+            # Erro ao traduzir o bloco: nada dele rodou
+            self.rodando = False
+
+        self.PC = pc
+        self.instrucoes_executadas = executadas
+
+
+    def _invalidar_decodificacao(self, endereco):
+        """
+            Store na seção text: a instrução guardada para aquele PC não vale mais.
+        """
+
+        ram = self.cache.ram
+        if ram.text_inicio <= endereco <= ram.text_fim:
+            self.cache_decodificacao.pop(endereco & ~0x3, None)
+            if self.tradutor is not None:
+                self.tradutor.invalidar(endereco)
+
+
+    # Implementação das instruções.
+    # Cada uma recebe a instrução decodificada e o PC, e devolve o próximo PC.
+
+    def _nop(self, d, pc):
+        return pc + 4
+
+    def _add(self, d, pc):
+        r = self.registradores
+        r[d.rd] = (r[d.rs] + r[d.rt]) & 0xFFFFFFFF
+        return pc + 4
+
+    def _sub(self, d, pc):
+        r = self.registradores
+        r[d.rd] = (r[d.rs] - r[d.rt]) & 0xFFFFFFFF
+        return pc + 4
+
+    def _and(self, d, pc):
+        r = self.registradores
+        r[d.rd] = r[d.rs] & r[d.rt]
+        return pc + 4
+
+    def _or(self, d, pc):
+        r = self.registradores
+        r[d.rd] = r[d.rs] | r[d.rt]
+        return pc + 4
+
+    def _slt(self, d, pc):
+        r = self.registradores
+        r[d.rd] = 1 if com_sinal(r[d.rs]) < com_sinal(r[d.rt]) else 0
+        return pc + 4
+
+    def _sll(self, d, pc):
+        r = self.registradores
+        r[d.rd] = (r[d.rt] << d.shamt) & 0xFFFFFFFF
+        return pc + 4
+
+    def _srl(self, d, pc):
+        r = self.registradores
+        r[d.rd] = r[d.rt] >> d.shamt
+        return pc + 4
+
+    def _addi(self, d, pc):
+        r = self.registradores
+        r[d.rt] = (r[d.rs] + d.immediate_signed) & 0xFFFFFFFF
+        return pc + 4
+
+    def _lw(self, d, pc):
+        r = self.registradores
+        r[d.rt] = self.cache.ler_palavra((r[d.rs] + d.immediate_signed) & 0xFFFFFFFF)
+        return pc + 4
+
+    def _sw(self, d, pc):
+        r = self.registradores
+        endereco = (r[d.rs] + d.immediate_signed) & 0xFFFFFFFF
+        self.cache.escrever_palavra(endereco, r[d.rt])
+        self._invalidar_decodificacao(endereco)
+        return pc + 4
+
+    def _beq(self, d, pc):
+        r = self.registradores
+        if r[d.rs] == r[d.rt]:
+            return pc + 4 + (d.immediate_signed << 2)
+        return pc + 4
+
+    def _bne(self, d, pc):
+        r = self.registradores
+        if r[d.rs] != r[d.rt]:
+            return pc + 4 + (d.immediate_signed << 2)
+        return pc + 4
+
+    def _j(self, d, pc):
+        return ((pc + 4) & 0xF0000000) | (d.address << 2)
+
+    def _jal(self, d, pc):
+        self.registradores[31] = pc + 4
+        return ((pc + 4) & 0xF0000000) | (d.address << 2)
@@ -0,0 +1,143 @@
+"""
+    Formato de imagem de programa (.img)
+
+    Cabeçalho (little-endian, 28 bytes):
+        magic          4s   b'MIPS'
+        versao         H    1
+        flags          H    reservado (0)
+        entrada        I    PC inicial
+        endereco_text  I    onde a seção text é carregada
+        tamanho_text   I    em bytes
+        endereco_dados I    onde a seção de dados é carregada
+        tamanho_dados  I    em bytes
+
+    Depois do cabeçalho vêm os bytes da text e depois os da seção de dados,
+    já na ordem da memória (little-endian), então carregar é só copiar.
+
+    Arquivos sem o magic são tratados como o binário antigo (.bin do
+    gerar_binario.py): só instruções, cada palavra em big-endian.
+"""
+
+import mmap
+import struct
+
+
+MAGIC = b'MIPS'
+VERSAO = 1
+
+CABECALHO = struct.Struct('<4sHHIIIII')
+
+
+def _para_bytes(conteudo):
+    """
+        Aceita bytes/bytearray/memoryview ou uma lista de palavras de 32 bits
+        e devolve os bytes na ordem da memória (little-endian).
+    """
+
+    if isinstance(conteudo, (bytes, bytearray, memoryview)):
+        return bytes(conteudo)
+
+    return struct.pack(f'<{len(conteudo)}I', *[p & 0xFFFFFFFF for p in conteudo])
+
+
+def big_endian_para_memoria(dados):
+    """
+        Converte palavras big-endian (formato do .bin) para a ordem da memória.
+        A troca é feita com fatias, sem laço palavra por palavra.
+        Bytes que sobram no final (palavra incompleta) são ignorados.
+    """
+
+    tamanho = len(dados) - (len(dados) % 4)
+    trocado = bytearray(tamanho)
+
+    trocado[0::4] = dados[3:tamanho:4]
+    trocado[1::4] = dados[2:tamanho:4]
+    trocado[2::4] = dados[1:tamanho:4]
+    trocado[3::4] = dados[0:tamanho:4]
+
+    return trocado
+
+
+def salvar_imagem(arquivo, texto, dados=b'', entrada=None,
+                  endereco_text=0x0000, endereco_dados=0x10000):
+    """
+        Grava uma imagem com a seção text e (opcionalmente) a seção de dados.
+        texto/dados podem ser bytes ou listas de palavras de 32 bits.
+    """
+
+    texto = _para_bytes(texto)
+    dados = _para_bytes(dados)
+
+    if entrada is None:
+        entrada = endereco_text
+
+    with open(arquivo, "wb") as f:
+        f.write(CABECALHO.pack(MAGIC, VERSAO, 0, entrada,
+                               endereco_text, len(texto),
+                               endereco_dados, len(dados)))
+        f.write(texto)
+        f.write(dados)
+
+
+def carregar_imagem(memoria, arquivo, endereco_inicio=None):
+    """
+        Lê o arquivo uma única vez (mmap) e copia cada seção para a memória
+        com uma única operação.
+
+        Retorna um dicionário com entrada, endereços e tamanhos das seções.
+    """
+
+    with open(arquivo, "rb") as f:
+        # mmap não aceita arquivo vazio
+        if f.seek(0, 2) == 0:
+            raise Exception(f"Arquivo {arquivo} está vazio")
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            with memoryview(mapa) as conteudo:
+                if len(conteudo) >= CABECALHO.size and conteudo[:4] == MAGIC:
+                    return _carregar_formato_imagem(memoria, conteudo, arquivo)
+
+                # Binário antigo: só instruções em big-endian
+                if endereco_inicio is None:
+                    endereco_inicio = memoria.text_inicio
+
+                texto = big_endian_para_memoria(conteudo)
+                memoria.carregar_programa(texto, endereco_inicio)
+
+                return {
+                    'entrada': endereco_inicio,
+                    'endereco_text': endereco_inicio,
+                    'tamanho_text': len(texto),
+                    'endereco_dados': memoria.dados_inicio,
+                    'tamanho_dados': 0,
+                }
+
+
+def _carregar_formato_imagem(memoria, conteudo, arquivo):
+    """
+        Carrega um arquivo no formato de imagem (com cabeçalho)
+    """
+
+    (_, versao, _, entrada, endereco_text, tamanho_text,
+     endereco_dados, tamanho_dados) = CABECALHO.unpack_from(conteudo)
+
+    if versao != VERSAO:
+        raise Exception(f"Versão de imagem não suportada em {arquivo}: {versao}")
+
+    inicio_text = CABECALHO.size
+    inicio_dados = inicio_text + tamanho_text
+
+    if inicio_dados + tamanho_dados > len(conteudo):
+        raise Exception(f"Imagem {arquivo} truncada")
+
+    memoria.carregar_programa(conteudo[inicio_text:inicio_dados], endereco_text)
+    memoria.carregar_dados(conteudo[inicio_dados:inicio_dados + tamanho_dados], endereco_dados)
+    memoria.entrada = entrada
+
+    return {
+        'entrada': entrada,
+        'endereco_text': endereco_text,
+        'tamanho_text': tamanho_text,
+        'endereco_dados': endereco_dados,
+        'tamanho_dados': tamanho_dados,
+    }
@@ -0,0 +1,318 @@
+"""
+    Execução em lote: programas x grade de configurações em paralelo.
+
+    O simulador é Python puro e roda numa thread só; para usar todos os
+    núcleos, cada combinação (programa, configuração) vira um trabalho num
+    ProcessPoolExecutor, com Memoria/Cache/Processador próprios.
+
+    A configuração vem de um arquivo JSON ou TOML. As chaves são os nomes
+    das opções do main.py (com _ no lugar de -):
+
+        programas = ["teste.bin", "loop.img"]
+
+        [fixos]                      # valem para todos os trabalhos
+        modo = "pipeline"
+        memoria_latencia = 20
+
+        [grade]                      # produto cartesiano das listas
+        cache_linhas = [4, 8, 16]
+        cache_assoc = [1, 2]
+        preditor = ["nenhum", "gshare"]
+
+    Cada resultado é gravado assim que o trabalho termina, em CSV (uma linha
+    com as métricas principais) ou JSON lines (o resumo inteiro), conforme a
+    extensão da saída. Rodando de novo com a mesma saída, os trabalhos que
+    já têm resultado são pulados, inclusive os que deram erro; com
+    --refazer-falhas as linhas de erro saem do arquivo e esses trabalhos
+    rodam de novo (cada chave fica com uma linha só).
+
+    Uso:
+        python lote.py grade.toml --saida resultados.csv --processos 32
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from amostragem import simular_amostrado
+from main import (carregar_arquivo, criar_parser, executar_funcional, executar_pipeline, montar_maquina,
+                  montar_resumo, nomear_registradores)
+from preditores import BTB, criar_preditor
+
+try:
+    import tomllib
+except ImportError:     # Python < 3.11
+    tomllib = None
+
+
+# Métricas de cada trabalho no CSV (o JSON lines leva o resumo inteiro)
+COLUNAS_METRICAS = (
+    'modo', 'ciclos', 'instrucoes', 'cpi', 'terminou', 'segundos',
+    'taxa_hit_dados', 'taxa_hit_instrucoes', 'amat_dados',
+    'precisao_desvios', 'mpki', 'erro',
+)
+
+
+def carregar_configuracao(arquivo):
+    """
+        Lê a configuração do lote (JSON ou TOML, pela extensão) e confere se
+        todas as chaves são opções conhecidas.
+    """
+
+    if arquivo.endswith('.toml'):
+        if tomllib is None:
+            raise ValueError("Ler TOML precisa do Python 3.11 ou mais novo (use JSON)")
+        with open(arquivo, 'rb') as f:
+            configuracao = tomllib.load(f)
+    else:
+        with open(arquivo) as f:
+            configuracao = json.load(f)
+
+    if not configuracao.get('programas'):
+        raise ValueError("A configuração precisa de uma lista 'programas'")
+
+    conhecidas = set(vars(criar_parser().parse_args([])))
+    for secao in ('fixos', 'grade'):
+        desconhecidas = set(configuracao.get(secao, {})) - conhecidas
+        if desconhecidas:
+            raise ValueError(f"Opções desconhecidas em '{secao}': {', '.join(sorted(desconhecidas))}")
+
+    for nome, valores in configuracao.get('grade', {}).items():
+        if not isinstance(valores, list) or not valores:
+            raise ValueError(f"'grade.{nome}' precisa ser uma lista não vazia")
+
+    return configuracao
+
+
+def gerar_trabalhos(configuracao):
+    """
+        Um trabalho por programa x combinação da grade: (chave, programa, opções).
+        A chave identifica o trabalho na saída (é o que a retomada procura).
+    """
+
+    fixos = configuracao.get('fixos', {})
+    grade = configuracao.get('grade', {})
+    nomes = sorted(grade)
+
+    for programa in configuracao['programas']:
+        for valores in itertools.product(*(grade[nome] for nome in nomes)):
+            opcoes = dict(fixos)
+            opcoes.update(zip(nomes, valores))
+            chave = programa + '|' + json.dumps(opcoes, sort_keys=True)
+            yield chave, programa, opcoes
+
+
+def executar_trabalho(programa, opcoes_trabalho):
+    """
+        Roda um trabalho do começo ao fim, sem imprimir nada.
+        Roda no processo filho; retorna o resumo (ver main.montar_resumo).
+    """
+
+    opcoes = criar_parser().parse_args([programa])
+    for nome, valor in opcoes_trabalho.items():
+        setattr(opcoes, nome, valor)
+
+    memoria, cache, cache_instrucoes, niveis = montar_maquina(opcoes)
+
+    # Fonte .s é montado, imagem/binário é carregado; se não carregou, o
+    # trabalho é um erro (e não um programa de lixo rodando)
+    if not carregar_arquivo(memoria, programa, opcoes.endereco)['tamanho_text']:
+        raise ValueError(f"{programa}: nenhuma instrução carregada")
+
+    preditor = btb = None
+    if opcoes.preditor != 'nenhum':
+        preditor = criar_preditor(opcoes.preditor, opcoes.preditor_entradas, opcoes.historia)
+        btb = BTB(opcoes.btb_entradas)
+
+    inicio = time.perf_counter()
+
+    if opcoes.modo == 'amostrado':
+        resumo = simular_amostrado(cache, opcoes.avanco, opcoes.aquecimento, opcoes.ciclos_amostra,
+                                   opcoes.ciclos_enchimento, cache_instrucoes, niveis,
+                                   preditor, btb, opcoes.max_instrucoes, opcoes.confianca)
+        resumo['modo'] = opcoes.modo
+        resumo['ciclos'] = resumo['ciclos_estimados']
+        resumo['registradores'] = nomear_registradores(resumo['registradores'])
+        resumo['segundos'] = time.perf_counter() - inicio
+        return resumo
+
+    if opcoes.modo == 'pipeline':
+        cpu = executar_pipeline(cache, opcoes.max_ciclos, opcoes.max_instrucoes, 0,
+                                cache_instrucoes=cache_instrucoes, preditor=preditor, btb=btb)
+        ciclos = cpu.ciclo
+    else:
+        cache_instrucoes = None
+        cpu = executar_funcional(cache, opcoes.max_instrucoes or 10_000_000,
+                                 traduzir_blocos=(opcoes.modo == 'blocos'))
+        ciclos = 0
+
+    segundos = time.perf_counter() - inicio
+    cache.descarregar()
+
+    return montar_resumo(opcoes.modo, cpu, cache, ciclos, segundos, cache_instrucoes, niveis)
+
+
+def _rodar(chave, programa, opcoes):
+    """ Ponto de entrada no processo filho: erro vira resultado também """
+
+    try:
+        return chave, programa, opcoes, executar_trabalho(programa, opcoes), None
+    except Exception as e:
+        return chave, programa, opcoes, None, f"{type(e).__name__}: {e}"
+
+
+def _linha_csv(chave, programa, opcoes, resumo, erro):
+    linha = {'chave': chave, 'programa': programa, 'erro': erro}
+    linha.update(opcoes)
+    if resumo is None:
+        return linha
+
+    for coluna in ('modo', 'ciclos', 'instrucoes', 'cpi', 'terminou', 'segundos'):
+        linha[coluna] = resumo.get(coluna)
+
+    if 'cache' in resumo:
+        linha['taxa_hit_dados'] = resumo['cache']['taxa_hit']
+        linha['amat_dados'] = resumo['cache']['amat']
+    if resumo.get('cache_instrucoes'):
+        linha['taxa_hit_instrucoes'] = resumo['cache_instrucoes']['taxa_hit']
+    if 'contadores' in resumo:
+        linha['precisao_desvios'] = resumo['contadores']['precisao_desvios']
+        linha['mpki'] = resumo['contadores']['mpki']
+    return linha
+
+
+def _trabalhos_feitos(saida, refazer_falhas=False):
+    """
+        Chaves que já têm resultado no arquivo de saída (com ou sem erro).
+        Com refazer_falhas, as linhas com erro saem do arquivo e as chaves
+        delas ficam de fora, para rodarem de novo sem repetir linha.
+    """
+
+    if not os.path.exists(saida):
+        return set()
+
+    como_csv = saida.endswith('.csv')
+    registros = []      # (chave, erro, linha como está no arquivo)
+    with open(saida, newline='') as f:
+        if como_csv:
+            leitor = csv.DictReader(f)
+            colunas = leitor.fieldnames
+            for linha in leitor:
+                registros.append((linha.get('chave'), linha.get('erro'), linha))
+        else:
+            for texto in f:
+                try:
+                    registro = json.loads(texto)
+                except ValueError:
+                    continue    # Linha cortada por uma interrupção
+                registros.append((registro.get('chave'), registro.get('erro'), texto.rstrip('\n') + '\n'))
+
+    if refazer_falhas and any(erro for _, erro, _ in registros):
+        registros = [registro for registro in registros if not registro[1]]
+
+        # Reescreve num temporário e troca, para não perder nada numa interrupção
+        temporario = saida + '.tmp'
+        with open(temporario, 'w', newline='') as f:
+            if como_csv:
+                escritor = csv.DictWriter(f, fieldnames=colunas)
+                escritor.writeheader()
+                escritor.writerows(linha for _, _, linha in registros)
+            else:
+                f.writelines(texto for _, _, texto in registros)
+        os.replace(temporario, saida)
+
+    return {chave for chave, _, _ in registros if chave}
+
+
+def executar_lote(configuracao, saida, processos=None, progresso=True, refazer_falhas=False):
+    """
+        Roda os trabalhos que ainda não estão na saída, gravando cada resultado
+        assim que ele fica pronto. Retorna (rodados, com erro, pulados).
+        refazer_falhas: roda de novo os que deram erro (ver _trabalhos_feitos).
+    """
+
+    trabalhos = list(gerar_trabalhos(configuracao))
+    feitos = _trabalhos_feitos(saida, refazer_falhas)
+    pendentes = [trabalho for trabalho in trabalhos if trabalho[0] not in feitos]
+    pulados = len(trabalhos) - len(pendentes)
+
+    if progresso:
+        print(f"{len(trabalhos)} trabalhos, {pulados} já feitos, {len(pendentes)} para rodar", file=sys.stderr)
+
+    como_csv = saida.endswith('.csv')
+    colunas = ['chave', 'programa'] + sorted(configuracao.get('fixos', {})) + sorted(configuracao.get('grade', {}))
+    colunas += [coluna for coluna in COLUNAS_METRICAS if coluna not in colunas]
+    novo = not os.path.exists(saida) or os.path.getsize(saida) == 0
+
+    rodados = erros = 0
+    with open(saida, 'a', newline='') as f, ProcessPoolExecutor(processos) as executor:
+        escritor = None
+        if como_csv:
+            escritor = csv.DictWriter(f, fieldnames=colunas, extrasaction='ignore')
+            if novo:
+                escritor.writeheader()
+
+        futuros = [executor.submit(_rodar, *trabalho) for trabalho in pendentes]
+        try:
+            for futuro in as_completed(futuros):
+                chave, programa, opcoes, resumo, erro = futuro.result()
+
+                if como_csv:
+                    escritor.writerow(_linha_csv(chave, programa, opcoes, resumo, erro))
+                else:
+                    registro = {'chave': chave, 'programa': programa, 'opcoes': opcoes,
+                                'resumo': resumo, 'erro': erro}
+                    f.write(json.dumps(registro) + '\n')
+                f.flush()
+
+                rodados += 1
+                erros += erro is not None
+                if progresso:
+                    situacao = f"ERRO {erro}" if erro else f"cpi={resumo.get('cpi')}"
+                    print(f"[{rodados}/{len(pendentes)}] {chave}: {situacao}", file=sys.stderr)
+
+        except KeyboardInterrupt:
+            # O que terminou já está na saída; a próxima execução continua dali
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    return rodados, erros, pulados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roda programas x configurações em paralelo")
+    parser.add_argument('configuracao', help="arquivo JSON ou TOML com 'programas', 'fixos' e 'grade'")
+    parser.add_argument('--saida', default='resultados.csv',
+                        help="arquivo de resultados, .csv ou .jsonl (padrão: resultados.csv)")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="processos em paralelo (padrão: um por núcleo)")
+    parser.add_argument('--refazer-falhas', action='store_true',
+                        help="roda de novo os trabalhos que deram erro (as linhas de erro saem da saída)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="sem progresso na saída de erro")
+    args = parser.parse_args(argv)
+
+    try:
+        configuracao = carregar_configuracao(args.configuracao)
+    except (OSError, ValueError) as e:
+        print(f"Configuração inválida: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        rodados, erros, pulados = executar_lote(configuracao, args.saida, args.processos, not args.quiet,
+                                                args.refazer_falhas)
+    except KeyboardInterrupt:
+        print("\n Interrompido! Rode de novo com a mesma saída para continuar.", file=sys.stderr)
+        return 1
+
+    print(f"{rodados} trabalhos rodados ({erros} com erro), {pulados} pulados -> {args.saida}",
+          file=sys.stderr)
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
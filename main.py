@@ -1,6 +1,24 @@
+import argparse
+import cProfile
+import json
+import pstats
+import sys
+import time
+
+from amostragem import simular_amostrado
+from checkpoint import carregar_checkpoint, salvar_checkpoint
 from cpu import Processador
-from cache import Cache
-from memoria import Memoria 
+from eventos import EventosPipeline, formatar_evento
+from cache import WRITE_BACK, WRITE_THROUGH, Cache, montar_hierarquia, tempo_medio_acesso
+from funcional import ProcessadorFuncional
+from imagem import carregar_imagem
+from memoria import Memoria
+from montador import carregar_montado, montar
+from perfil import PerfilInstrucoes, fontes_montadas
+from perfil_host import PerfilHost
+from preditores import BTB, PREDITORES, criar_preditor
+from rastro import RastroAcessos
+from substituicao import POLITICAS_SUBSTITUICAO
 
 # Mapa de nomes de registradores para facilitar o debug visual
 nomes_registradores = {
@@ -11,130 +29,671 @@ nomes_registradores = {
     24: '$t8', 25: '$t9', 26: '$k0', 27: '$k1', 28: '$gp', 29: '$sp', 30: '$fp', 31: '$ra'
 }
 
-def carregar_programa(memoria, arquivo="programa.bin", endereco_inicio=0):
-    try:
-        with open(arquivo, "rb") as f:
-            dados = f.read()
+def carregar_arquivo(memoria, arquivo, endereco_inicio=0):
+    """
+        Carrega um .bin antigo (palavras big-endian), uma imagem .img
+        (ver imagem.py) ou um fonte .s, montado na hora (ver montador.py).
+        Retorna as seções carregadas (ver imagem.carregar_imagem); erros
+        de leitura ou de montagem sobem como exceção.
+    """
+
+    if arquivo.endswith('.s'):
+        programa = montar_fonte(arquivo)
+        carregar_montado(memoria, programa)
+        return {
+            'endereco_text': programa['endereco_text'],
+            'tamanho_text': 4 * len(programa['texto']),
+            'endereco_dados': programa['endereco_dados'],
+            'tamanho_dados': 4 * len(programa['dados']),
+        }
 
-        for i in range(0, len(dados), 4):
-            palavra_bytes = dados[i:i+4]
-            if len(palavra_bytes) == 4:
-                palavra = int.from_bytes(palavra_bytes, byteorder='big')
-                memoria.escrever_palavra(endereco_inicio + i, palavra)
+    return carregar_imagem(memoria, arquivo, endereco_inicio)
 
-        print(f"Programa carregado: {len(dados)} bytes em {hex(endereco_inicio)}")
-        return len(dados)        
+
+def carregar_programa(memoria, arquivo="programa.bin", endereco_inicio=0, silencioso=False):
+    """
+        Carrega o programa (ver carregar_arquivo) avisando do erro no stderr.
+        Retorna o tamanho da seção text em bytes (0 se não carregou).
+    """
+    try:
+        info = carregar_arquivo(memoria, arquivo, endereco_inicio)
+
+        if not silencioso:
+            print(f"Programa carregado: {info['tamanho_text']} bytes em {hex(info['endereco_text'])}")
+            if info['tamanho_dados']:
+                print(f"Dados carregados: {info['tamanho_dados']} bytes em {hex(info['endereco_dados'])}")
+        return info['tamanho_text']
 
     except FileNotFoundError:
-        print(f"Arquivo {arquivo} não encontrado")
+        print(f"Arquivo {arquivo} não encontrado", file=sys.stderr)
         return 0
     except Exception as e:
-        print(f"Erro ao carregar binário: {e}")
+        print(f"Erro ao carregar binário: {e}", file=sys.stderr)
         return 0
 
-def main():
-    
-    memoria_principal = Memoria()
-    cache = Cache(memoria_principal)
-    cpu = Processador(cache)
+def montar_fonte(arquivo):
+    """ Monta um .s sem gravar imagem (ver montador.montar) """
 
-    carregar_programa(
-        memoria_principal,
-        arquivo="teste.bin",
-        endereco_inicio=memoria_principal.text_inicio 
-    )
+    with open(arquivo) as f:
+        return montar(f.read())
 
-    cpu.PC = memoria_principal.text_inicio
-    max_ciclos = 1000
-    ciclos_executados = 0
 
-    try:
+def nomear_registradores(registradores):
+    """ Registradores por nome, como vão no resumo (ver montar_resumo) """
+
+    return {nomes_registradores[num]: valor for num, valor in enumerate(registradores)}
+
+
+def imprimir_registradores(registradores):
+    """ Mostra os registradores diferentes de zero """
+
+    print(" Registradores (diferentes de zero):")
+    for num, valor in enumerate(registradores):
+        if valor != 0:
+            print(f"   {nomes_registradores[num]:>5}: {hex(valor)} (Dec: {valor})")
+
+
+def imprimir_ciclo_detalhado(cpu, ciclo):
+    """
+        Verbosidade 2: os eventos que os estágios registraram no ciclo
+        (ver eventos.py). O texto só é montado aqui, fora da CPU.
+    """
+
+    print(f"--- CICLO {ciclo:03d} " + "-"*45)
+
+    for evento in cpu.eventos.eventos(desde_ciclo=ciclo):
+        print("  " + formatar_evento(evento))
+
+
+def imprimir_ciclo_compacto(cpu, ciclo):
+    """
+        Verbosidade 1: uma linha por ciclo
+    """
+
+    busca = hex(cpu.IF_ID.PC) if cpu.IF_ID.valid else '-'
+    decodifica = cpu.ID_EX.subtipo.upper() if cpu.ID_EX.valid else '-'
+    memoria = ('LW' if cpu.EX_MEM.MemRead else 'SW' if cpu.EX_MEM.MemWrite else '..') if cpu.EX_MEM.valid else '-'
+    escrita = '-'
+    if cpu.MEM_WB.valid and cpu.MEM_WB.RegWrite and cpu.MEM_WB.write_reg != 0:
+        escrita = f"{nomes_registradores[cpu.MEM_WB.write_reg]}={hex(cpu.MEM_WB.write_data)}"
+
+    print(f"{ciclo:06d} | IF {busca:>8} | ID {decodifica:>5} | MEM {memoria:>2} | WB {escrita}")
+
+
+def montar_maquina(opcoes):
+    """
+        Cria Memoria e a hierarquia de caches a partir das opções da linha de
+        comando: L1D (+ L1I) -> L2 -> L3 -> memória, com L2/L3 opcionais.
+        Com --cache-unificada não tem I-cache (retorna None no lugar dela).
+
+        Retorna (memoria, cache de dados, cache de instruções, [L2, L3...])
+    """
+
+    memoria_principal = Memoria(latencia=opcoes.memoria_latencia)
+
+    dados = {
+        'tamanho_bloco': opcoes.cache_bloco,
+        'num_linhas': opcoes.cache_linhas,
+        'associatividade': opcoes.cache_assoc,
+        'substituicao': opcoes.cache_substituicao,
+        'escrita': opcoes.cache_escrita,
+        'latencia': opcoes.cache_latencia,
+    }
+
+    instrucoes = None
+    if not opcoes.cache_unificada:
+        instrucoes = {
+            'tamanho_bloco': opcoes.icache_bloco,
+            'num_linhas': opcoes.icache_linhas,
+            'associatividade': opcoes.icache_assoc,
+            'substituicao': opcoes.icache_substituicao,
+            'latencia': opcoes.icache_latencia,
+        }
+
+    compartilhados = []
+    for nivel in ('l2', 'l3'):
+        num_linhas = getattr(opcoes, f'{nivel}_linhas')
+        if not num_linhas:
+            break
+        compartilhados.append({
+            'tamanho_bloco': getattr(opcoes, f'{nivel}_bloco'),
+            'num_linhas': num_linhas,
+            'associatividade': getattr(opcoes, f'{nivel}_assoc'),
+            'escrita': WRITE_BACK,
+            'latencia': getattr(opcoes, f'{nivel}_latencia'),
+        })
+
+    cache, cache_instrucoes, niveis = montar_hierarquia(memoria_principal, dados, instrucoes, compartilhados)
+    return memoria_principal, cache, cache_instrucoes, niveis
+
+
+def estatisticas_cache(cache):
+    """ Estatísticas da cache num dicionário (para o resumo) """
+
+    total = cache.hits + cache.misses
+    return {
+        'hits': cache.hits,
+        'misses': cache.misses,
+        'taxa_hit': cache.hits / total if total else 0.0,
+        'hits_escrita': cache.hits_escrita,
+        'misses_escrita': cache.misses_escrita,
+        'writebacks': cache.writebacks,
+        'latencia': cache.latencia,
+        'amat': tempo_medio_acesso(cache),
+    }
+
+
+def montar_resumo(modo, cpu, cache, ciclos, segundos, cache_instrucoes=None, niveis=()):
+    """
+        Resumo final da execução (usado no texto e no JSON)
+    """
+
+    resumo = {
+        'modo': modo,
+        'ciclos': ciclos,
+        'instrucoes': cpu.instrucoes_executadas,
+        'cpi': ciclos / cpu.instrucoes_executadas if ciclos and cpu.instrucoes_executadas else None,
+        'terminou': not cpu.rodando,
+        'segundos': segundos,
+        'cache': estatisticas_cache(cache),
+        'cache_instrucoes': estatisticas_cache(cache_instrucoes) if cache_instrucoes is not None else None,
+        'niveis': [estatisticas_cache(nivel) for nivel in niveis],
+        'registradores': nomear_registradores(cpu.registradores),
+        'PC': cpu.PC,
+    }
+
+    # Só o pipeline tem contadores de desempenho
+    contadores = getattr(cpu, 'contadores', None)
+    if contadores is not None:
+        resumo['contadores'] = contadores.como_dict()
+        resumo['ciclos_pulados'] = cpu.ciclos_pulados
+
+    return resumo
+
+
+def imprimir_resumo(resumo, cpu, cache, cache_instrucoes=None, niveis=()):
+    """ Resumo final em texto """
+
+    print("\n" + "="*60)
+    print(" RESUMO DA EXECUÇÃO ")
+    print("="*60 + "\n")
+
+    print(f" Modo: {resumo['modo']}")
+    if resumo['ciclos']:
+        print(f" Ciclos: {resumo['ciclos']}")
+    print(f" Instruções: {resumo['instrucoes']}")
+    if resumo['cpi'] is not None:
+        print(f" CPI: {resumo['cpi']:.3f}")
+    if not resumo['terminou']:
+        print(" (parou pelo limite de ciclos/instruções)")
+    if resumo.get('ciclos_pulados'):
+        print(f" Ciclos só de espera pulados: {resumo['ciclos_pulados']}")
+    print(f" Tempo: {resumo['segundos']:.3f} s\n")
+
+    imprimir_registradores(cpu.registradores)
+    if cache_instrucoes is not None:
+        cache_instrucoes.imprimir_estatisticas("I-cache")
+        cache.imprimir_estatisticas("D-cache")
+    else:
+        cache.imprimir_estatisticas()
+
+    for numero, nivel in enumerate(niveis, start=2):
+        nivel.imprimir_estatisticas(f"L{numero}")
+
+    print(f"\n Tempo médio de acesso (AMAT): \n")
+    if cache_instrucoes is not None:
+        print(f"   Instruções: {resumo['cache_instrucoes']['amat']:.2f} ciclos")
+    print(f"   Dados: {resumo['cache']['amat']:.2f} ciclos")
+
+    if getattr(cpu, 'contadores', None) is not None:
+        cpu.contadores.imprimir()
+
+
+def imprimir_amostragem(resultado):
+    """ Resumo da simulação por amostragem em texto """
+
+    print("\n" + "="*60)
+    print(" RESUMO DA SIMULAÇÃO POR AMOSTRAGEM ")
+    print("="*60 + "\n")
+
+    print(f" Instruções: {resultado['instrucoes']}")
+    print(f" Amostras: {resultado['amostras']} ({resultado['ciclos_medidos']} ciclos, "
+          f"{resultado['instrucoes_medidas']} instruções medidas)")
+    if not resultado['terminou']:
+        print(" (parou pelo limite de instruções)")
+
+    if resultado['cpi'] is not None:
+        print(f" CPI estimado: {resultado['cpi']:.3f}")
+        if resultado['cpi_minimo'] is not None:
+            print(f"   Intervalo de {resultado['confianca'] * 100:.0f}%: "
+                  f"{resultado['cpi_minimo']:.3f} a {resultado['cpi_maximo']:.3f}")
+        print(f" Ciclos estimados: {resultado['ciclos_estimados']}")
+    print(f" Tempo: {resultado['segundos']:.3f} s\n")
+
+    imprimir_registradores(resultado['registradores'].values())
+
+
+def exportar_perfil(perfil, opcoes, memoria):
+    """
+        Top N e/ou arquivo do callgrind. Com um .s os PCs ganham rótulos e
+        linhas do fonte.
+    """
+
+    rotulos = fontes = linhas = None
+    if opcoes.arquivo.endswith('.s') and not opcoes.carregar_checkpoint:
+        programa = montar_fonte(opcoes.arquivo)
+        rotulos = programa['rotulos']
+        fontes, linhas = fontes_montadas(programa)
+
+    if opcoes.perfil_top and not opcoes.json:
+        perfil.imprimir_top(opcoes.perfil_top, memoria, rotulos, fontes)
+
+    if opcoes.perfil:
+        perfil.exportar_callgrind(opcoes.perfil, opcoes.arquivo, rotulos, linhas)
+        if not opcoes.json:
+            print(f"\n Perfil gravado em {opcoes.perfil} (abra com o KCachegrind)")
+
+
+def relatar_tempo_host(opcoes, perfil_host, perfilador, ciclos, instrucoes, segundos):
+    """
+        Tempo do simulador no host: quebra por componente (--perfil-host)
+        e/ou cProfile. Com --json o texto vai para a saída de erro.
+    """
+
+    saida = sys.stderr if opcoes.json else sys.stdout
+
+    if perfil_host is not None:
+        if opcoes.perfil_host_json:
+            perfil_host.exportar_json(opcoes.perfil_host_json, ciclos, instrucoes, segundos)
+        if opcoes.perfil_host:
+            perfil_host.imprimir(ciclos, instrucoes, segundos, saida)
+
+    if perfilador is not None:
+        if opcoes.cprofile:
+            perfilador.dump_stats(opcoes.cprofile)
+            print(f"\n Estatísticas do cProfile gravadas em {opcoes.cprofile}", file=saida)
+        else:
+            print("\n cProfile (por tempo próprio): \n", file=saida)
+            pstats.Stats(perfilador, stream=saida).sort_stats('tottime').print_stats(25)
+
+
+def executar_funcional(cache, max_instrucoes=10_000_000, traduzir_blocos=False):
+    """
+        Modo funcional: roda só a semântica das instruções, sem o pipeline.
+        Retorna o processador funcional depois de rodar.
+    """
+
+    cpu = ProcessadorFuncional(cache, traduzir_blocos=traduzir_blocos)
+    cpu.PC = cache.ram.entrada
+
+    cpu.executar(max_instrucoes)
+    return cpu
+
+
+def executar_pipeline(cache, max_ciclos, max_instrucoes=None, verbosidade=2, rastro=None,
+                      eventos=None, cache_instrucoes=None, preditor=None, btb=None,
+                      cpu=None, checkpoint=None, perfil=None, perfil_host=None):
+    """
+        Modo detalhado: roda o pipeline ciclo a ciclo.
+        Retorna o processador depois de rodar.
+
+        cpu: processador restaurado de um checkpoint; continua dele em vez
+         de criar um novo (as caches e o preditor vêm junto com ele).
+        checkpoint: (ciclo, arquivo, comprimir) para salvar a máquina
+         inteira quando o pipeline chegar naquele ciclo.
+        perfil: perfil.PerfilInstrucoes para o custo de cada instrução.
+        perfil_host: perfil_host.PerfilHost para cronometrar os estágios.
+    """
+
+    if cpu is None:
+        cpu = Processador(cache, cache_instrucoes, preditor, btb)
+        cpu.PC = cache.ram.entrada
+    cpu.rastro = rastro
+
+    # A saída detalhada é montada a partir dos eventos
+    if verbosidade >= 2 and eventos is None:
+        eventos = EventosPipeline(1024)
+    cpu.eventos = eventos
+
+    cpu.perfil = perfil
+    if perfil is not None:
+        perfil.ultimo_ciclo = cpu.ciclo
+
+    if perfil_host is not None:
+        perfil_host.instrumentar_processador(cpu)
+
+    if verbosidade >= 2:
+        imprimir_ciclo = imprimir_ciclo_detalhado
+    elif verbosidade == 1:
+        imprimir_ciclo = imprimir_ciclo_compacto
+    else:
+        imprimir_ciclo = None
+
+    if imprimir_ciclo is not None:
         print("\n" + "="*60)
         print(" INICIANDO A SIMULAÇÃO DETALHADA DO PIPELINE ")
         print("="*60 + "\n")
 
-        while cpu.rodando and ciclos_executados < max_ciclos:
-            
-            # Cabeçalho do Ciclo
-            print(f"--- CICLO {ciclos_executados:03d} " + "-"*45)
-            
-            cpu.executar_ciclo()
-            ciclos_executados += 1
-
-            # ---------------------------------------------------------
-            # 1. WRITE BACK (WB)
-            # ---------------------------------------------------------
-            if cpu.MEM_WB['valid']:
-                reg_num = cpu.MEM_WB['write_reg']
-                if cpu.MEM_WB['RegWrite'] and reg_num != 0:
-                    reg_nome = nomes_registradores.get(reg_num, f"${reg_num}")
-                    val = cpu.MEM_WB['write_data']
-                    print(f"  [WB]  ESCRITA : Reg {reg_nome} recebe {hex(val)} (Dec: {val})")
-                else:
-                    print(f"  [WB]  Nenhuma escrita em registrador.")
-
-            # ---------------------------------------------------------
-            # 2. MEMORY (MEM)
-            # ---------------------------------------------------------
-            if cpu.EX_MEM['valid']:
-                if cpu.EX_MEM['MemRead']:
-                    addr = cpu.EX_MEM['ALU_result']
-                    print(f"  [MEM] LEITURA : Lendo endereço {hex(addr)} (LW)")
-                elif cpu.EX_MEM['MemWrite']:
-                    addr = cpu.EX_MEM['ALU_result']
-                    val = cpu.EX_MEM['write_data']
-                    print(f"  [MEM] GRAVANDO: Valor {val} (Hex: {hex(val)}) no endereço {hex(addr)} (SW)")
-                else:
-                    print(f"  [MEM] Passagem: Apenas repassando dados (sem acesso à RAM)")
-
-            # ---------------------------------------------------------
-            # 3. EXECUTE (EX)
-            # ---------------------------------------------------------
-            if cpu.ID_EX['valid']:
-                nome_instr = cpu.ID_EX.get('subtipo', cpu.ID_EX['tipo']).upper()
-                res_alu = cpu.EX_MEM['ALU_result']
-                
-                msg_branch = ""
-                if cpu.EX_MEM['Branch']:
-                    status = "TOMADO" if cpu.EX_MEM['branch_taken'] else "NÃO TOMADO"
-                    msg_branch = f"-> Branch {status}"
-
-                print(f"  [EX]  EXECUÇÃO: {nome_instr} | Resultado ULA: {hex(res_alu)} {msg_branch}")
-
-            # ---------------------------------------------------------
-            # 4. DECODE (ID)
-            # ---------------------------------------------------------
-            if cpu.ID_EX['valid']:
-                tipo = cpu.ID_EX.get('subtipo', 'instrução')
-                print(f"  [ID]  DECODE  : Preparando instrução '{tipo.upper()}'")
-
-            # ---------------------------------------------------------
-            # 5. FETCH (IF)
-            # ---------------------------------------------------------
-            if cpu.IF_ID['valid']:
-                pc_atual = cpu.IF_ID['PC']
-                hex_instr = cpu.IF_ID['instruction']
-                print(f"  [IF]  BUSCA   : PC {hex(pc_atual)} -> Instrução {hex(hex_instr)}")
-            else:
-                print(f"  [IF]  BUSCA   : (Stall ou Fim)")
-
-
-            # Verifica parada
-            if not cpu.rodando:
-                print("\n" + "="*60)
-                print(" CPU PAROU - FIM DO PROGRAMA ")
-                print("="*60 + "\n")
-                break
-            
-            # Espaço entre ciclos
-            print("") 
+    if checkpoint is not None:
+        ciclo_checkpoint, arquivo, comprimir = checkpoint
+        _rodar_pipeline(cpu, min(ciclo_checkpoint, max_ciclos), max_instrucoes, verbosidade, imprimir_ciclo)
+
+        tamanho = salvar_checkpoint(arquivo, cpu, comprimir)
+        if verbosidade > 0:
+            print(f" Checkpoint do ciclo {cpu.ciclo} salvo em {arquivo} ({tamanho} bytes)\n")
+
+    _rodar_pipeline(cpu, max_ciclos, max_instrucoes, verbosidade, imprimir_ciclo)
+    return cpu
+
+
+def _rodar_pipeline(cpu, max_ciclos, max_instrucoes, verbosidade, imprimir_ciclo):
+    """ Roda o pipeline até parar ou bater em algum dos limites """
+
+    # Laço sem formatação nenhuma no modo silencioso (é onde ia o tempo),
+    # pulando os ciclos em que o pipeline só espera a memória
+    if imprimir_ciclo is None:
+        cpu.executar_ate(max_ciclos, max_instrucoes)
+        return
+
+    while cpu.rodando and cpu.ciclo < max_ciclos:
+        if max_instrucoes is not None and cpu.instrucoes_executadas >= max_instrucoes:
+            break
+
+        cpu.executar_ciclo()
+        imprimir_ciclo(cpu, cpu.ciclo)
+
+        # Verifica parada
+        if not cpu.rodando:
+            print("\n" + "="*60)
+            print(" CPU PAROU - FIM DO PROGRAMA ")
+            print("="*60 + "\n")
+            break
+
+        # Espaço entre ciclos
+        if verbosidade >= 2:
+            print("")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Simulador MIPS com pipeline de 5 estágios")
+
+    parser.add_argument('arquivo', nargs='?', default='teste.bin',
+                        help="programa (.bin ou .img) (padrão: teste.bin)")
+    parser.add_argument('--endereco', type=lambda v: int(v, 0), default=None,
+                        help="endereço de carga de um .bin (padrão: início da seção text)")
+    parser.add_argument('--modo', choices=['pipeline', 'funcional', 'blocos', 'amostrado'], default='pipeline',
+                        help="pipeline (ciclo a ciclo), funcional (instrução a instrução), "
+                             "blocos (funcional com blocos básicos traduzidos) "
+                             "ou amostrado (intervalos de pipeline no meio do funcional)")
+    parser.add_argument('--max-ciclos', type=int, default=100_000,
+                        help="limite de ciclos do pipeline (padrão: 100000)")
+    parser.add_argument('--max-instrucoes', type=int, default=None,
+                        help="limite de instruções executadas")
+
+    saida = parser.add_argument_group('saída')
+    saida.add_argument('-v', '--verbosidade', type=int, choices=[0, 1, 2], default=2,
+                       help="0 = só o resumo, 1 = uma linha por ciclo, 2 = detalhado (padrão)")
+    saida.add_argument('-q', '--quiet', action='store_true',
+                       help="modo batch: sem saída por ciclo, só o resumo final")
+    saida.add_argument('--json', action='store_true',
+                       help="imprime o resumo final em JSON (implica --quiet)")
+    saida.add_argument('--rastro', metavar='ARQUIVO',
+                       help="grava o rastro de acessos à memória do pipeline (ver rastro.py)")
+
+    eventos = parser.add_argument_group('eventos do pipeline (ver eventos.py)')
+    eventos.add_argument('--eventos', type=int, metavar='N', default=None,
+                         help="guarda os últimos N eventos dos estágios num buffer circular")
+    eventos.add_argument('--chrome', metavar='ARQUIVO',
+                         help="exporta os eventos guardados como trace do Chrome (JSON)")
+    eventos.add_argument('--diagrama', type=int, metavar='CICLOS', nargs='?', const=40, default=None,
+                         help="imprime o diagrama do pipeline dos últimos CICLOS ciclos (padrão: 40)")
+
+    cache = parser.add_argument_group('cache')
+    cache.add_argument('--cache-bloco', type=int, default=16, help="bytes por bloco (padrão: 16)")
+    cache.add_argument('--cache-linhas', type=int, default=8, help="número de linhas (padrão: 8)")
+    cache.add_argument('--cache-assoc', type=int, default=1, help="associatividade (padrão: 1)")
+    cache.add_argument('--cache-substituicao', choices=sorted(POLITICAS_SUBSTITUICAO), default='LRU')
+    cache.add_argument('--cache-escrita', choices=[WRITE_THROUGH, WRITE_BACK], default=WRITE_THROUGH)
+    cache.add_argument('--cache-latencia', type=int, default=1, help="ciclos de um hit (padrão: 1)")
+    cache.add_argument('--cache-unificada', action='store_true',
+                       help="busca e dados dividem a mesma cache (sem I-cache separada)")
+
+    icache = parser.add_argument_group('cache de instruções (I-cache)')
+    icache.add_argument('--icache-bloco', type=int, default=16, help="bytes por bloco (padrão: 16)")
+    icache.add_argument('--icache-linhas', type=int, default=8, help="número de linhas (padrão: 8)")
+    icache.add_argument('--icache-assoc', type=int, default=1, help="associatividade (padrão: 1)")
+    icache.add_argument('--icache-substituicao', choices=sorted(POLITICAS_SUBSTITUICAO), default='LRU')
+    icache.add_argument('--icache-latencia', type=int, default=1, help="ciclos de um hit (padrão: 1)")
+
+    for nivel, linhas, bloco, assoc, latencia in (('l2', 0, 32, 4, 10), ('l3', 0, 64, 8, 30)):
+        grupo = parser.add_argument_group(f'{nivel.upper()} unificada (write-back)')
+        grupo.add_argument(f'--{nivel}-linhas', type=int, default=linhas,
+                           help="número de linhas (padrão: 0 = sem este nível)")
+        grupo.add_argument(f'--{nivel}-bloco', type=int, default=bloco, help=f"bytes por bloco (padrão: {bloco})")
+        grupo.add_argument(f'--{nivel}-assoc', type=int, default=assoc, help=f"associatividade (padrão: {assoc})")
+        grupo.add_argument(f'--{nivel}-latencia', type=int, default=latencia,
+                           help=f"ciclos de um hit (padrão: {latencia})")
+
+    previsao = parser.add_argument_group('previsão de desvios (ver preditores.py)')
+    previsao.add_argument('--preditor', choices=['nenhum'] + list(PREDITORES), default='nenhum',
+                          help="preditor de branches no IF (padrão: nenhum, sempre PC + 4)")
+    previsao.add_argument('--preditor-entradas', type=int, default=1024,
+                          help="entradas da tabela do preditor (padrão: 1024)")
+    previsao.add_argument('--historia', type=int, default=12,
+                          help="bits de história global do gshare/torneio (padrão: 12)")
+    previsao.add_argument('--btb-entradas', type=int, default=64, help="entradas da BTB (padrão: 64)")
+
+    amostras = parser.add_argument_group('simulação por amostragem (ver amostragem.py, --modo amostrado)')
+    amostras.add_argument('--avanco', type=int, default=100_000,
+                          help="instruções de avanço rápido entre amostras (padrão: 100000)")
+    amostras.add_argument('--aquecimento', type=int, default=10_000,
+                          help="instruções aquecendo caches e preditor antes de cada amostra (padrão: 10000)")
+    amostras.add_argument('--ciclos-amostra', type=int, default=10_000,
+                          help="ciclos medidos no pipeline em cada amostra (padrão: 10000)")
+    amostras.add_argument('--ciclos-enchimento', type=int, default=100,
+                          help="ciclos de pipeline antes de começar a medir (padrão: 100)")
+    amostras.add_argument('--confianca', type=float, default=0.95,
+                          help="nível de confiança do intervalo do CPI (padrão: 0.95)")
+
+    perfil = parser.add_argument_group('perfil do programa por instrução (ver perfil.py, modo pipeline)')
+    perfil.add_argument('--perfil', metavar='ARQUIVO',
+                        help="grava o custo de cada instrução no formato do callgrind (KCachegrind)")
+    perfil.add_argument('--perfil-top', type=int, metavar='N', nargs='?', const=20, default=None,
+                        help="mostra as N instruções que mais gastaram ciclos (padrão: 20)")
+
+    host = parser.add_argument_group('tempo do simulador no host (ver perfil_host.py)')
+    host.add_argument('--perfil-host', action='store_true',
+                      help="cronometra estágios, caches e memória e mostra onde foi o tempo "
+                           "(com --json, na saída de erro)")
+    host.add_argument('--perfil-host-json', metavar='ARQUIVO',
+                      help="grava o tempo por componente em JSON (implica --perfil-host)")
+    host.add_argument('--cprofile', metavar='ARQUIVO', nargs='?', const='', default=None,
+                      help="roda a simulação no cProfile; sem ARQUIVO mostra as funções que "
+                           "mais gastaram, com ARQUIVO grava as estatísticas (pstats)")
+
+    checkpoint = parser.add_argument_group('checkpoint da máquina (ver checkpoint.py, modo pipeline)')
+    checkpoint.add_argument('--salvar-checkpoint', metavar='ARQUIVO',
+                            help="salva a máquina inteira no ciclo de --checkpoint-ciclo e continua")
+    checkpoint.add_argument('--checkpoint-ciclo', type=int, metavar='N', default=None,
+                            help="ciclo em que o checkpoint é salvo (padrão: no fim da execução)")
+    checkpoint.add_argument('--sem-compressao', action='store_true',
+                            help="grava o checkpoint sem zlib")
+    checkpoint.add_argument('--carregar-checkpoint', metavar='ARQUIVO',
+                            help="continua de um checkpoint (a configuração da máquina vem dele; "
+                                 "o programa não é carregado)")
+
+    parser.add_argument('--memoria-latencia', type=int, default=20,
+                        help="ciclos de um acesso à memória principal num miss (padrão: 20; 0 = miss sem custo)")
+
+    return parser
+
+
+def main(argv=None):
+
+    opcoes = criar_parser().parse_args(argv)
+
+    if opcoes.quiet or opcoes.json:
+        opcoes.verbosidade = 0
+
+    cpu_restaurado = preditor = btb = None
+
+    if opcoes.carregar_checkpoint:
+        try:
+            cpu_restaurado = carregar_checkpoint(opcoes.carregar_checkpoint)
+        except (OSError, ValueError) as e:
+            print(f"Não deu para carregar o checkpoint: {e}", file=sys.stderr)
+            return 1
+        if not isinstance(cpu_restaurado, Processador):
+            print("O checkpoint não é do pipeline", file=sys.stderr)
+            return 1
+
+        opcoes.modo = 'pipeline'
+        cache = cpu_restaurado.cache
+        cache_instrucoes = cpu_restaurado.cache_instrucoes if cpu_restaurado.caches_separadas else None
+
+        # Níveis compartilhados abaixo da D-cache, até a memória principal
+        niveis = []
+        nivel = cache.proximo
+        while isinstance(nivel, Cache):
+            niveis.append(nivel)
+            nivel = nivel.proximo
+
+        if opcoes.verbosidade > 0:
+            print(f" Continuando do ciclo {cpu_restaurado.ciclo} ({opcoes.carregar_checkpoint})\n")
+
+    else:
+        try:
+            memoria_principal, cache, cache_instrucoes, niveis = montar_maquina(opcoes)
+        except ValueError as e:
+            print(f"Configuração de cache inválida: {e}", file=sys.stderr)
+            return 1
+
+        carregado = carregar_programa(
+            memoria_principal,
+            arquivo=opcoes.arquivo,
+            endereco_inicio=opcoes.endereco,
+            silencioso=opcoes.verbosidade == 0
+        )
+        if not carregado:
+            return 1
+
+        if opcoes.preditor != 'nenhum':
+            try:
+                preditor = criar_preditor(opcoes.preditor, opcoes.preditor_entradas, opcoes.historia)
+                btb = BTB(opcoes.btb_entradas)
+            except ValueError as e:
+                print(f"Configuração do preditor inválida: {e}", file=sys.stderr)
+                return 1
+
+    perfil_host = None
+    if opcoes.perfil_host or opcoes.perfil_host_json:
+        if opcoes.salvar_checkpoint:
+            # Os métodos embrulhados não vão para o pickle
+            print("--perfil-host não combina com --salvar-checkpoint", file=sys.stderr)
+            return 1
+        perfil_host = PerfilHost()
+        perfil_host.instrumentar_memoria(cache, cache_instrucoes)
+
+    checkpoint = None
+    if opcoes.salvar_checkpoint:
+        ciclo = opcoes.checkpoint_ciclo if opcoes.checkpoint_ciclo is not None else opcoes.max_ciclos
+        checkpoint = (ciclo, opcoes.salvar_checkpoint, not opcoes.sem_compressao)
+
+    rastro = RastroAcessos(opcoes.rastro) if opcoes.rastro else None
+
+    perfil = None
+    if opcoes.modo == 'pipeline' and (opcoes.perfil or opcoes.perfil_top):
+        ram = cache.ram
+        perfil = PerfilInstrucoes(ram.text_inicio, max(ram.text_fim + 1, ram.fim_programa))
+
+    eventos = None
+    if opcoes.eventos or opcoes.chrome or opcoes.diagrama is not None:
+        eventos = EventosPipeline(opcoes.eventos or 65536)
+
+    perfilador = cProfile.Profile() if opcoes.cprofile is not None else None
+
+    inicio = time.perf_counter()
+    ciclos = 0
+
+    try:
+        if perfilador is not None:
+            perfilador.enable()
+
+        if opcoes.modo == 'pipeline':
+            cpu = executar_pipeline(cache, opcoes.max_ciclos, opcoes.max_instrucoes,
+                                    opcoes.verbosidade, rastro, eventos, cache_instrucoes,
+                                    preditor, btb, cpu_restaurado, checkpoint, perfil, perfil_host)
+            ciclos = cpu.ciclo
+        elif opcoes.modo == 'amostrado':
+            amostragem = simular_amostrado(cache, opcoes.avanco, opcoes.aquecimento, opcoes.ciclos_amostra,
+                                           opcoes.ciclos_enchimento, cache_instrucoes, niveis,
+                                           preditor, btb, opcoes.max_instrucoes, opcoes.confianca)
+        else:
+            # O modo funcional não modela a busca, então não usa a I-cache
+            cache_instrucoes = None
+            cpu = executar_funcional(cache, opcoes.max_instrucoes or 10_000_000,
+                                     traduzir_blocos=(opcoes.modo == 'blocos'))
 
     except KeyboardInterrupt:
         print("\n Execução interrompida pelo usuário!\n")
+        return 1
     except Exception as e:
         print(f"\n Deu algum erro bizarro: {e} \n")
         import traceback
         traceback.print_exc()
 
+        # O que o pipeline fez logo antes do erro
+        if eventos is not None and len(eventos):
+            print("\n Últimos eventos do pipeline:\n")
+            eventos.despejar(ultimos_ciclos=10)
+        return 1
+    finally:
+        if perfilador is not None:
+            perfilador.disable()
+        if rastro is not None:
+            rastro.fechar()
+
+    segundos = time.perf_counter() - inicio
+
+    if perfil_host is not None:
+        perfil_host.remover()
+
+    # Write-back: o que ficou na cache também é estado final da memória
+    cache.descarregar()
+
+    if opcoes.modo == 'amostrado':
+        # Mesmo formato dos outros modos (ver montar_resumo)
+        amostragem['registradores'] = nomear_registradores(amostragem['registradores'])
+        amostragem['segundos'] = segundos
+        if opcoes.json:
+            print(json.dumps(amostragem, indent=2))
+        else:
+            imprimir_amostragem(amostragem)
+        relatar_tempo_host(opcoes, perfil_host, perfilador, 0, amostragem['instrucoes'], segundos)
+        return 0
+
+    if eventos is not None:
+        if opcoes.chrome:
+            eventos.exportar_chrome(opcoes.chrome)
+        if opcoes.diagrama is not None and not opcoes.json:
+            print("\n" + eventos.diagrama(opcoes.diagrama))
+
+    resumo = montar_resumo(opcoes.modo, cpu, cache, ciclos, segundos, cache_instrucoes, niveis)
+    if perfil is not None and opcoes.perfil_top:
+        resumo['perfil'] = perfil.top(opcoes.perfil_top)
+
+    if opcoes.json:
+        print(json.dumps(resumo, indent=2))
+    else:
+        imprimir_resumo(resumo, cpu, cache, cache_instrucoes, niveis)
+
+    if perfil is not None:
+        exportar_perfil(perfil, opcoes, cache.ram)
+
+    relatar_tempo_host(opcoes, perfil_host, perfilador, ciclos, cpu.instrucoes_executadas, segundos)
+
+    return 0
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -1,16 +1,77 @@
+import struct
+
+
+# Formatos little-endian (MIPS) para acesso direto por palavra e meia palavra
+_PALAVRA = struct.Struct('<I')
+_MEIA_PALAVRA = struct.Struct('<H')
+
+# Páginas do checkpoint (ver __getstate__)
+_TAMANHO_PAGINA = 4096
+
+
 class Memoria:
-    def __init__(self, tamanho=1024*1024):  # 1MB por padrão
+    def __init__(self, tamanho=1024*1024, latencia=0):  # 1MB por padrão
 
-        #self.dados = bytearray(tamanho)
-        
         """ 
-            Essa abordagem é mais fiel ao hardware, vale a pena discutir depois isso.
-             Por agora deixei como vetor, como o Lucas sugeriu
+            Memória em bytearray: 1 byte por posição, igual ao hardware.
+             Como vetor de inteiros do Python cada posição custava um ponteiro
+             de 8 bytes, agora 1MB de memória ocupa 1MB.
+
+            latencia: ciclos de um acesso de bloco vindo da cache (num miss).
+             Com 0 os misses não custam nada, como antes.
         """
         
-        self.dados = [0] * tamanho
+        self.dados = bytearray(tamanho)
+
+        # Mesma interface de latência dos níveis de cache (ver Cache)
+        self.latencia = latencia
+        self.latencia_acesso = latencia
+
+        # Visão sem cópia dos dados, para ler/escrever blocos inteiros
+        self.visao = memoryview(self.dados)
+
         self.definir_secoes()
 
+    def __getstate__(self):
+        """
+            Estado para o checkpoint (pickle). A memória vai só com as páginas
+            que não são todas zero; a visão é refeita no __setstate__.
+        """
+
+        estado = self.__dict__.copy()
+        del estado['visao']
+
+        dados = estado.pop('dados')
+        zeros = bytes(_TAMANHO_PAGINA)
+        paginas = {}
+        for inicio in range(0, len(dados), _TAMANHO_PAGINA):
+            pagina = dados[inicio:inicio + _TAMANHO_PAGINA]
+            if pagina != zeros[:len(pagina)]:
+                paginas[inicio // _TAMANHO_PAGINA] = bytes(pagina)
+
+        estado['tamanho'] = len(dados)
+        estado['paginas'] = paginas
+        return estado
+
+    def __setstate__(self, estado):
+        estado = dict(estado)
+        dados = bytearray(estado.pop('tamanho'))
+        for indice, pagina in estado.pop('paginas').items():
+            inicio = indice * _TAMANHO_PAGINA
+            dados[inicio:inicio + len(pagina)] = pagina
+
+        self.__dict__.update(estado)
+        self.dados = dados
+        self.visao = memoryview(dados)
+
+    @property
+    def ram(self):
+        """
+            Mesma interface da Cache: o modo funcional também roda direto na
+            memória, sem passar por cache nenhuma (ver amostragem.py).
+        """
+        return self
+
     def definir_secoes(self):
         """Define as seções de memória"""
         
@@ -23,6 +84,11 @@ class Memoria:
         self.pilha_inicio = 0x20000
         self.pilha_fim = 0x2FFFF
 
+        # Programa carregado: ponto de entrada e fim das instruções.
+        # Sem programa carregado vale a seção text inteira.
+        self.entrada = self.text_inicio
+        self.fim_programa = self.text_fim + 1
+
     # AQUI É BYTE A BYTE. É o que está sendo usado.
 
     def ler_byte(self, endereco):
@@ -50,35 +116,100 @@ class Memoria:
 
     def ler_palavra(self, endereco):
         """
-            Lê 4 bytes como uma palavra de 32 bits
+            Lê 4 bytes como uma palavra de 32 bits (little-endian)
         """
 
-        palavra = 0
-        for i in range(4):
-            byte = self.ler_byte(endereco + i)
-            palavra |= (byte << (8 * i))  # Little-endian
-        
-        return palavra
+        if 0 <= endereco <= len(self.dados) - 4:
+            return _PALAVRA.unpack_from(self.dados, endereco)[0]
+        else:
+            raise Exception(f"Erro de Segmentação: Acesso inválido a {endereco}")
+
+
+    def espiar_palavra(self, endereco):
+        """ Igual a ler_palavra (a memória não tem estatística para poupar) """
+        return self.ler_palavra(endereco)
 
 
     def escrever_palavra(self, endereco, valor):
         """ 
-            Escreve uma palavra de 32 bits em 4 bytes
+            Escreve uma palavra de 32 bits em 4 bytes (little-endian)
         """
-        
-        for i in range(4):
-            byte = (valor >> (8 * i)) & 0xFF  # Little-endian
-            self.escrever_byte(endereco + i, byte)
 
+        if 0 <= endereco <= len(self.dados) - 4:
+            _PALAVRA.pack_into(self.dados, endereco, valor & 0xFFFFFFFF)
 
-    def carregar_programa(self, instrucoes):
+
+        # TRATAMENTO DE MEIA PALAVRA (16 BITS) 2 BYTES
+
+
+    def ler_meia_palavra(self, endereco):
+        """
+            Lê 2 bytes como meia palavra de 16 bits (little-endian)
+        """
+
+        if 0 <= endereco <= len(self.dados) - 2:
+            return _MEIA_PALAVRA.unpack_from(self.dados, endereco)[0]
+        else:
+            raise Exception(f"Erro de Segmentação: Acesso inválido a {endereco}")
+
+
+    def escrever_meia_palavra(self, endereco, valor):
+        """
+            Escreve meia palavra de 16 bits em 2 bytes (little-endian)
+        """
+
+        if 0 <= endereco <= len(self.dados) - 2:
+            _MEIA_PALAVRA.pack_into(self.dados, endereco, valor & 0xFFFF)
+
+
+        # TRATAMENTO DE BLOCOS (usado pela cache para preencher linhas)
+
+
+    def ler_bloco(self, endereco, tamanho):
+        """
+            Retorna uma visão (memoryview, sem cópia) de `tamanho` bytes a partir
+            do endereço. A visão acompanha a memória: copie se for guardar.
+        """
+
+        if 0 <= endereco and endereco + tamanho <= len(self.dados):
+            return self.visao[endereco:endereco + tamanho]
+        else:
+            raise Exception(f"Erro de Segmentação: Acesso inválido a {endereco}")
+
+
+    def escrever_bloco(self, endereco, dados):
+        """
+            Copia um bloco de bytes (bytes, bytearray ou memoryview) para a memória
+        """
+
+        if 0 <= endereco and endereco + len(dados) <= len(self.dados):
+            self.visao[endereco:endereco + len(dados)] = dados
+        else:
+            raise Exception(f"Erro de Segmentação: Acesso inválido a {endereco}")
+
+
+    def carregar_programa(self, instrucoes, endereco=None):
         """
             Responsável por carregar as instruções na memória.
+            Recebe os bytes já na ordem da memória (little-endian) e copia
+            tudo de uma vez. Também marca onde o programa termina.
         """
-        ...
 
-    def carregar_dados(self, dados):
+        if endereco is None:
+            endereco = self.text_inicio
+
+        self.escrever_bloco(endereco, instrucoes)
+
+        self.entrada = endereco
+        self.fim_programa = endereco + len(instrucoes)
+
+    def carregar_dados(self, dados, endereco=None):
         """
             Responsável por carregar os dados na seção dados da memória.
+            Recebe os bytes já na ordem da memória (little-endian).
         """
-        ...
+
+        if endereco is None:
+            endereco = self.dados_inicio
+
+        self.escrever_bloco(endereco, dados)
@@ -0,0 +1,590 @@
+"""
+    Montador de dois passos para programas em texto (.s).
+
+    Primeiro passo: lê as linhas, expande as pseudo-instruções e monta as
+    seções (.text e .data). Como toda pseudo-instrução tem tamanho fixo, os
+    endereços dos rótulos já saem daqui. Segundo passo: codifica as
+    instruções resolvendo os rótulos. O resultado é uma imagem .img (ver
+    imagem.py) com a entrada no rótulo 'main' (ou no início da text).
+
+    Sintaxe:
+
+            .data
+        v1: .word 1, 2, 3
+        v3: .space 12               # bytes zerados
+            .text
+        main:
+            la   $s0, v1
+            lw   $t0, 4($s0)
+            blt  $t0, $t1, fim      # pseudo: slt $at + bne
+        fim:
+            halt
+
+    Instruções: add sub and or slt sll srl addi lw sw beq bne j jal.
+    Pseudo-instruções: nop move li la b beqz bnez blt bge bgt ble subi neg halt.
+    O processador não tem lui/ori, então li (fora de 16 bits) e la viram
+    addi + sll 16 + addi.
+
+    Agendamento (opcional): dentro de cada bloco básico, reordena instruções
+    independentes para que nenhuma use o registrador do lw logo antes dela
+    (a bolha de load-use do ID_stage). O pipeline tem intertravamento e
+    forwarding completo e descarta o que foi buscado depois de um desvio
+    tomado (não tem delay slot), então os NOPs escritos à mão são tirados;
+    com preencher_nops, um NOP só entra onde a bolha não deu para evitar.
+
+    Uso:
+        python montador.py programa.s -o programa.img --agendar --listagem
+"""
+
+import argparse
+import re
+import struct
+import sys
+from collections import namedtuple
+
+from decodificador import ADDI, BEQ, BNE, J, JAL, LW, R_TYPE, SUBTIPOS_R, SW
+from imagem import salvar_imagem
+
+
+REGISTRADORES = {
+    '$zero': 0, '$at': 1, '$v0': 2, '$v1': 3,
+    '$a0': 4, '$a1': 5, '$a2': 6, '$a3': 7,
+    '$t0': 8, '$t1': 9, '$t2': 10, '$t3': 11, '$t4': 12, '$t5': 13, '$t6': 14, '$t7': 15,
+    '$s0': 16, '$s1': 17, '$s2': 18, '$s3': 19, '$s4': 20, '$s5': 21, '$s6': 22, '$s7': 23,
+    '$t8': 24, '$t9': 25, '$k0': 26, '$k1': 27, '$gp': 28, '$sp': 29, '$fp': 30, '$ra': 31,
+}
+REGISTRADORES.update({f'${numero}': numero for numero in range(32)})
+
+HALT = 0xFFFFFFFF
+
+# Mesmas seções da Memoria (ver Memoria.definir_secoes)
+TEXT_INICIO = 0x0000
+DADOS_INICIO = 0x10000
+
+# Mnemônico -> (formato, opcode, funct)
+_FUNCT_R = {subtipo: funct for funct, subtipo in SUBTIPOS_R.items()}
+INSTRUCOES = {
+    'add': ('R', R_TYPE, _FUNCT_R['add']),
+    'sub': ('R', R_TYPE, _FUNCT_R['sub']),
+    'and': ('R', R_TYPE, _FUNCT_R['and']),
+    'or': ('R', R_TYPE, _FUNCT_R['or']),
+    'slt': ('R', R_TYPE, _FUNCT_R['slt']),
+    'nop': ('R', R_TYPE, _FUNCT_R['add']),    # add $zero, $zero, $zero
+    'sll': ('shift', R_TYPE, _FUNCT_R['sll']),
+    'srl': ('shift', R_TYPE, _FUNCT_R['srl']),
+    'addi': ('I', ADDI, None),
+    'lw': ('mem', LW, None),
+    'sw': ('mem', SW, None),
+    'beq': ('branch', BEQ, None),
+    'bne': ('branch', BNE, None),
+    'j': ('jump', J, None),
+    'jal': ('jump', JAL, None),
+    'halt': ('word', None, None),
+    '.word': ('word', None, None),
+}
+
+# Operandos por formato:
+#   R (rd, rs, rt) | shift (rd, rt, shamt) | I (rt, rs, imediato) | mem (rt, offset, rs)
+#   branch (rs, rt, alvo) | jump (alvo,) | word (valor,)
+# Imediatos e alvos podem ser int, nome de rótulo ou ('hi'/'lo', rótulo).
+Instrucao = namedtuple('Instrucao', ['mnemonico', 'operandos', 'linha'])
+
+_MEMORIA = re.compile(r'^(.*)\(\s*(\$\w+)\s*\)$')
+_ROTULO = re.compile(r'^[A-Za-z_.][\w.]*$')
+
+
+def _erro(linha, mensagem):
+    return ValueError(f"linha {linha}: {mensagem}")
+
+
+def _registrador(texto, linha):
+    numero = REGISTRADORES.get(texto.strip())
+    if numero is None:
+        raise _erro(linha, f"registrador inválido: {texto.strip()}")
+    return numero
+
+
+def _valor(texto, linha, aceita_rotulo=True):
+    """ Número (decimal, 0x...) ou, se permitido, nome de rótulo """
+
+    texto = texto.strip()
+    try:
+        return int(texto, 0)
+    except ValueError:
+        pass
+    if aceita_rotulo and _ROTULO.match(texto):
+        return texto
+    raise _erro(linha, f"valor inválido: {texto}")
+
+
+def _metades(valor):
+    """ (hi, lo) com lo com sinal, para addi hi / sll 16 / addi lo """
+
+    lo = ((valor & 0xFFFF) ^ 0x8000) - 0x8000
+    return ((valor - lo) >> 16) & 0xFFFF, lo
+
+
+def _carregar_constante(rt, alto, baixo, linha):
+    """ rt = alto << 16 + baixo, só com addi e sll """
+    return [
+        Instrucao('addi', (rt, 0, alto), linha),
+        Instrucao('sll', (rt, rt, 16), linha),
+        Instrucao('addi', (rt, rt, baixo), linha),
+    ]
+
+
+def _expandir(mnemonico, operandos, linha):
+    """
+        Converte uma linha de instrução (real ou pseudo) na lista de
+        Instrucao reais equivalente.
+    """
+
+    def reg(i):
+        return _registrador(operandos[i], linha)
+
+    def quantidade(n):
+        if len(operandos) != n:
+            raise _erro(linha, f"{mnemonico} espera {n} operandos, recebeu {len(operandos)}")
+
+    # Pseudo-instruções
+    if mnemonico == 'nop':
+        quantidade(0)
+        return [Instrucao('nop', (0, 0, 0), linha)]
+    if mnemonico == 'halt':
+        quantidade(0)
+        return [Instrucao('halt', (HALT,), linha)]
+    if mnemonico == 'move':
+        quantidade(2)
+        return [Instrucao('add', (reg(0), reg(1), 0), linha)]
+    if mnemonico == 'neg':
+        quantidade(2)
+        return [Instrucao('sub', (reg(0), 0, reg(1)), linha)]
+    if mnemonico == 'subi':
+        quantidade(3)
+        return [Instrucao('addi', (reg(0), reg(1), -_valor(operandos[2], linha, False)), linha)]
+    if mnemonico == 'li':
+        quantidade(2)
+        valor = _valor(operandos[1], linha, False)
+        if -0x8000 <= valor <= 0x7FFF:
+            return [Instrucao('addi', (reg(0), 0, valor), linha)]
+        return _carregar_constante(reg(0), *_metades(valor), linha)
+    if mnemonico == 'la':
+        quantidade(2)
+        rotulo = _valor(operandos[1], linha)
+        return _carregar_constante(reg(0), ('hi', rotulo), ('lo', rotulo), linha)
+    if mnemonico == 'b':
+        quantidade(1)
+        return [Instrucao('beq', (0, 0, _valor(operandos[0], linha)), linha)]
+    if mnemonico in ('beqz', 'bnez'):
+        quantidade(2)
+        return [Instrucao(mnemonico[:3], (reg(0), 0, _valor(operandos[1], linha)), linha)]
+    if mnemonico in ('blt', 'bge', 'bgt', 'ble'):
+        quantidade(3)
+        a, b = reg(0), reg(1)
+        if mnemonico in ('bgt', 'ble'):
+            a, b = b, a
+        desvio = 'bne' if mnemonico in ('blt', 'bgt') else 'beq'
+        return [
+            Instrucao('slt', (1, a, b), linha),
+            Instrucao(desvio, (1, 0, _valor(operandos[2], linha)), linha),
+        ]
+
+    if mnemonico not in INSTRUCOES:
+        raise _erro(linha, f"instrução desconhecida: {mnemonico}")
+
+    formato = INSTRUCOES[mnemonico][0]
+    if formato == 'R':
+        quantidade(3)
+        return [Instrucao(mnemonico, (reg(0), reg(1), reg(2)), linha)]
+    if formato == 'shift':
+        quantidade(3)
+        return [Instrucao(mnemonico, (reg(0), reg(1), _valor(operandos[2], linha, False)), linha)]
+    if formato == 'I':
+        quantidade(3)
+        return [Instrucao(mnemonico, (reg(0), reg(1), _valor(operandos[2], linha)), linha)]
+    if formato == 'mem':
+        quantidade(2)
+        casamento = _MEMORIA.match(operandos[1].strip())
+        if casamento is None:
+            raise _erro(linha, f"{mnemonico} espera offset($registrador)")
+        offset = casamento.group(1).strip()
+        offset = _valor(offset, linha, False) if offset else 0
+        return [Instrucao(mnemonico, (reg(0), offset, _registrador(casamento.group(2), linha)), linha)]
+    if formato == 'branch':
+        quantidade(3)
+        return [Instrucao(mnemonico, (reg(0), reg(1), _valor(operandos[2], linha)), linha)]
+    if formato == 'jump':
+        quantidade(1)
+        return [Instrucao(mnemonico, (_valor(operandos[0], linha),), linha)]
+
+    raise _erro(linha, f"instrução desconhecida: {mnemonico}")
+
+
+def _ler(fonte):
+    """
+        Primeiro passo: separa rótulos, diretivas e instruções.
+
+        Retorna (blocos, dados, rotulos_dados), onde blocos é a text em
+        blocos básicos [(rótulos no início do bloco, [Instrucao])] e dados é
+        a lista de palavras da .data (int ou rótulo, resolvidas no segundo
+        passo).
+    """
+
+    blocos = [([], [])]
+    dados = []
+    rotulos_dados = {}
+    vistos = set()
+    secao = '.text'
+
+    for numero, texto in enumerate(fonte.splitlines(), start=1):
+        texto = texto.split('#', 1)[0].strip()
+
+        # Rótulos (pode ter mais de um na mesma linha)
+        while True:
+            casamento = re.match(r'^([A-Za-z_.][\w.]*)\s*:(.*)$', texto)
+            if casamento is None:
+                break
+            rotulo, texto = casamento.group(1), casamento.group(2).strip()
+            if rotulo in vistos:
+                raise _erro(numero, f"rótulo repetido: {rotulo}")
+            vistos.add(rotulo)
+
+            if secao == '.data':
+                rotulos_dados[rotulo] = len(dados)
+            else:
+                # Rótulo começa um bloco básico novo
+                if blocos[-1][1]:
+                    blocos.append(([], []))
+                blocos[-1][0].append(rotulo)
+
+        if not texto:
+            continue
+
+        partes = texto.split(None, 1)
+        mnemonico = partes[0].lower()
+        operandos = [o for o in partes[1].split(',')] if len(partes) > 1 else []
+
+        if mnemonico in ('.text', '.data'):
+            secao = mnemonico
+            continue
+        if mnemonico in ('.globl', '.global', '.ent', '.end'):
+            continue
+
+        if secao == '.data':
+            if mnemonico == '.word':
+                dados.extend(_valor(o, numero) for o in operandos)
+            elif mnemonico == '.space':
+                tamanho = _valor(operandos[0] if operandos else '', numero, False)
+                dados.extend([0] * ((tamanho + 3) // 4))
+            else:
+                raise _erro(numero, f"diretiva não suportada na .data: {mnemonico}")
+            continue
+
+        if mnemonico == '.word':
+            novas = [Instrucao('.word', (_valor(o, numero),), numero) for o in operandos]
+        else:
+            novas = _expandir(mnemonico, operandos, numero)
+
+        for instrucao in novas:
+            blocos[-1][1].append(instrucao)
+            if _encerra_bloco(instrucao):
+                blocos.append(([], []))
+
+    return blocos, dados, rotulos_dados
+
+
+def _encerra_bloco(instrucao):
+    """ Desvios, saltos, halt e palavras soltas não saem do lugar """
+    return INSTRUCOES[instrucao.mnemonico][0] in ('branch', 'jump', 'word')
+
+
+def _registros(instrucao):
+    """ (registradores escritos, registradores lidos), sem o $zero """
+
+    formato = INSTRUCOES[instrucao.mnemonico][0]
+    o = instrucao.operandos
+
+    if formato == 'R':
+        escritos, lidos = {o[0]}, {o[1], o[2]}
+    elif formato == 'shift':
+        escritos, lidos = {o[0]}, {o[1]}
+    elif formato == 'I':
+        escritos, lidos = {o[0]}, {o[1]}
+    elif formato == 'mem':
+        if instrucao.mnemonico == 'lw':
+            escritos, lidos = {o[0]}, {o[2]}
+        else:
+            escritos, lidos = set(), {o[0], o[2]}
+    elif formato == 'branch':
+        escritos, lidos = set(), {o[0], o[1]}
+    elif instrucao.mnemonico == 'jal':
+        escritos, lidos = {31}, set()
+    else:
+        escritos, lidos = set(), set()
+
+    return escritos - {0}, lidos - {0}
+
+
+def _campos_rs_rt(instrucao):
+    """
+        Campos rs e rt da palavra, que é o que o ID compara com o destino do
+        load (mesmo quando o rt é destino, como no addi e no lw)
+    """
+
+    formato = INSTRUCOES[instrucao.mnemonico][0]
+    o = instrucao.operandos
+
+    if formato == 'R':
+        return o[1], o[2]
+    if formato == 'shift':
+        return 0, o[1]
+    if formato in ('I', 'branch'):
+        return o[1], o[0]
+    if formato == 'mem':
+        return o[2], o[0]
+    return ()
+
+
+def _bolha(anterior, instrucao):
+    """ A instrução logo depois deste load para no ID (load-use)? """
+
+    if anterior is None or anterior.mnemonico != 'lw' or anterior.operandos[0] == 0:
+        return False
+    return anterior.operandos[0] in _campos_rs_rt(instrucao)
+
+
+def agendar_bloco(instrucoes, reordenar=True, preencher_nops=False):
+    """
+        Agenda um bloco básico (o desvio do fim, se tiver, fica no fim).
+
+        Escalonamento de lista: a cada passo escolhe, entre as instruções com
+        as dependências já atendidas, uma que não cause bolha de load-use com
+        a anterior, preferindo a de maior caminho crítico. Se todas causam,
+        entra um NOP (preencher_nops) ou deixa a bolha para o hardware.
+        NOPs do programa original são descartados.
+    """
+
+    corpo = [i for i in instrucoes if i.mnemonico != 'nop']
+    terminador = corpo.pop() if corpo and _encerra_bloco(corpo[-1]) else None
+
+    # Dependências: dado (RAW), anti (WAR), saída (WAW) e memória (store com qualquer acesso)
+    registros = [_registros(i) for i in corpo]
+    memoria = [INSTRUCOES[i.mnemonico][0] == 'mem' for i in corpo]
+    predecessores = [set() for _ in corpo]
+    sucessores = [set() for _ in corpo]
+    for j in range(len(corpo)):
+        escritos_j, lidos_j = registros[j]
+        for i in range(j):
+            escritos_i, lidos_i = registros[i]
+            depende = (escritos_i & lidos_j) or (lidos_i & escritos_j) or (escritos_i & escritos_j)
+            if not depende and memoria[i] and memoria[j]:
+                depende = corpo[i].mnemonico == 'sw' or corpo[j].mnemonico == 'sw'
+            if depende:
+                predecessores[j].add(i)
+                sucessores[i].add(j)
+
+    # Caminho crítico até o fim do bloco (o load conta um ciclo a mais)
+    altura = [0] * len(corpo)
+    for i in reversed(range(len(corpo))):
+        latencia = 2 if corpo[i].mnemonico == 'lw' else 1
+        altura[i] = latencia + max((altura[s] for s in sucessores[i]), default=0)
+
+    nop = Instrucao('nop', (0, 0, 0), None)
+    agendadas = []
+    feitas = set()
+    restantes = list(range(len(corpo)))
+    anterior = None
+
+    while restantes:
+        prontas = [i for i in restantes if predecessores[i] <= feitas]
+        if not reordenar:
+            prontas = prontas[:1]
+
+        sem_bolha = [i for i in prontas if not _bolha(anterior, corpo[i])]
+        if not sem_bolha and preencher_nops:
+            agendadas.append(nop)
+            anterior = nop
+            continue
+
+        escolhida = max(sem_bolha or prontas, key=lambda i: (altura[i], -i))
+        restantes.remove(escolhida)
+        feitas.add(escolhida)
+        anterior = corpo[escolhida]
+        agendadas.append(anterior)
+
+    if terminador is not None:
+        if preencher_nops and _bolha(anterior, terminador):
+            agendadas.append(nop)
+        agendadas.append(terminador)
+
+    return agendadas
+
+
+def _codificar(instrucao, pc, rotulos):
+    """ Segundo passo: palavra de 32 bits da instrução no endereço pc """
+
+    formato, opcode, funct = INSTRUCOES[instrucao.mnemonico]
+    o = instrucao.operandos
+    linha = instrucao.linha
+
+    def resolver(valor):
+        if isinstance(valor, tuple):
+            parte, rotulo = valor
+            alto, baixo = _metades(resolver(rotulo))
+            return alto if parte == 'hi' else baixo
+        if isinstance(valor, str):
+            if valor not in rotulos:
+                raise _erro(linha, f"rótulo não definido: {valor}")
+            return rotulos[valor]
+        return valor
+
+    def imediato(valor):
+        valor = resolver(valor)
+        if not -0x8000 <= valor <= 0xFFFF:
+            raise _erro(linha, f"imediato fora de 16 bits: {valor}")
+        return valor & 0xFFFF
+
+    if formato == 'R':
+        rd, rs, rt = o
+        return (opcode << 26) | (rs << 21) | (rt << 16) | (rd << 11) | funct
+    if formato == 'shift':
+        rd, rt, shamt = o
+        if not 0 <= shamt <= 31:
+            raise _erro(linha, f"deslocamento fora de 0..31: {shamt}")
+        return (opcode << 26) | (rt << 16) | (rd << 11) | (shamt << 6) | funct
+    if formato == 'I':
+        rt, rs, valor = o
+        return (opcode << 26) | (rs << 21) | (rt << 16) | imediato(valor)
+    if formato == 'mem':
+        rt, offset, rs = o
+        return (opcode << 26) | (rs << 21) | (rt << 16) | imediato(offset)
+    if formato == 'branch':
+        rs, rt, alvo = o
+        alvo = resolver(alvo)
+        deslocamento = (alvo - (pc + 4)) >> 2
+        if not -0x8000 <= deslocamento <= 0x7FFF:
+            raise _erro(linha, f"desvio longe demais: {hex(alvo)}")
+        return (opcode << 26) | (rs << 21) | (rt << 16) | (deslocamento & 0xFFFF)
+    if formato == 'jump':
+        alvo = resolver(o[0])
+        if (alvo & 0xF0000000) != ((pc + 4) & 0xF0000000):
+            raise _erro(linha, f"salto para outra região de 256 MB: {hex(alvo)}")
+        return (opcode << 26) | ((alvo >> 2) & 0x3FFFFFF)
+
+    return resolver(o[0]) & 0xFFFFFFFF
+
+
+def montar(fonte, agendar=False, preencher_nops=False,
+           endereco_text=TEXT_INICIO, endereco_dados=DADOS_INICIO):
+    """
+        Monta o texto de um programa.
+
+        agendar: reordena os blocos básicos para fugir do load-use (e tira os NOPs)
+        preencher_nops: põe NOP onde ainda sobrar load-use (para um pipeline
+         sem intertravamento); sem agendar, só acrescenta os NOPs
+
+        Retorna um dicionário com 'texto' e 'dados' (listas de palavras),
+        'entrada', 'rotulos' (nome -> endereço), 'listagem'
+        [(endereço, palavra, linha do fonte)] e 'linhas' (endereço -> número
+        da linha no fonte, 0 nos NOPs do agendador).
+    """
+
+    blocos, dados, rotulos_dados = _ler(fonte)
+
+    # Agendamento e endereços da text
+    rotulos = {}
+    instrucoes = []
+    for nomes, bloco in blocos:
+        for nome in nomes:
+            rotulos[nome] = endereco_text + 4 * len(instrucoes)
+        if agendar or preencher_nops:
+            bloco = agendar_bloco(bloco, reordenar=agendar, preencher_nops=preencher_nops)
+        instrucoes.extend(bloco)
+
+    for nome, indice in rotulos_dados.items():
+        rotulos[nome] = endereco_dados + 4 * indice
+
+    # Segundo passo
+    texto = []
+    listagem = []
+    numeros = {}
+    linhas = fonte.splitlines()
+    for indice, instrucao in enumerate(instrucoes):
+        pc = endereco_text + 4 * indice
+        palavra = _codificar(instrucao, pc, rotulos)
+        texto.append(palavra)
+        origem = linhas[instrucao.linha - 1].strip() if instrucao.linha else '(nop do agendador)'
+        listagem.append((pc, palavra, origem))
+        numeros[pc] = instrucao.linha or 0
+
+    palavras_dados = []
+    for valor in dados:
+        if isinstance(valor, str):
+            if valor not in rotulos:
+                raise ValueError(f"rótulo não definido na .data: {valor}")
+            valor = rotulos[valor]
+        palavras_dados.append(valor & 0xFFFFFFFF)
+
+    return {
+        'texto': texto,
+        'dados': palavras_dados,
+        'entrada': rotulos.get('main', endereco_text),
+        'endereco_text': endereco_text,
+        'endereco_dados': endereco_dados,
+        'rotulos': rotulos,
+        'listagem': listagem,
+        'linhas': numeros,
+    }
+
+
+def montar_arquivo(entrada, saida, agendar=False, preencher_nops=False):
+    """ Monta um .s e grava a imagem. Retorna o resultado de montar() """
+
+    with open(entrada) as f:
+        programa = montar(f.read(), agendar, preencher_nops)
+
+    salvar_imagem(saida, programa['texto'], programa['dados'], programa['entrada'],
+                  programa['endereco_text'], programa['endereco_dados'])
+    return programa
+
+
+def carregar_montado(memoria, programa):
+    """ Carrega o resultado de montar() direto na memória, sem passar por arquivo """
+
+    texto, dados = programa['texto'], programa['dados']
+    memoria.carregar_programa(struct.pack(f'<{len(texto)}I', *texto), programa['endereco_text'])
+    memoria.carregar_dados(struct.pack(f'<{len(dados)}I', *dados), programa['endereco_dados'])
+    memoria.entrada = programa['entrada']
+
+
+def imprimir_listagem(programa):
+    for endereco, palavra, origem in programa['listagem']:
+        print(f"  {endereco:08x}  {palavra:08x}  {origem}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Montador MIPS (.s -> .img)")
+    parser.add_argument('fonte', help="programa em assembly (.s)")
+    parser.add_argument('-o', '--saida', default=None, help="imagem de saída (padrão: fonte com .img)")
+    parser.add_argument('--agendar', action='store_true',
+                        help="reordena instruções independentes para evitar bolhas de load-use")
+    parser.add_argument('--nops', action='store_true',
+                        help="põe NOP nos load-use que sobrarem (pipeline sem intertravamento)")
+    parser.add_argument('--listagem', action='store_true', help="mostra endereço, palavra e fonte")
+    args = parser.parse_args(argv)
+
+    saida = args.saida or args.fonte.rsplit('.', 1)[0] + '.img'
+    try:
+        programa = montar_arquivo(args.fonte, saida, args.agendar, args.nops)
+    except (OSError, ValueError) as e:
+        print(f"{args.fonte}: {e}", file=sys.stderr)
+        return 1
+
+    if args.listagem:
+        imprimir_listagem(programa)
+    print(f"{len(programa['texto'])} instruções e {len(programa['dados'])} palavras de dados -> {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
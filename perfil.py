@@ -0,0 +1,240 @@
+"""
+    Perfil do programa simulado por instrução (por PC).
+
+    O Processador anota em vetores pré-alocados, um elemento por palavra da
+    seção text, o custo de cada instrução:
+
+        aposentadas      vezes que a instrução passou pelo WB
+        ciclos           ciclos cobrados: cada ciclo vai para a próxima
+                         instrução a se aposentar, então a soma dá o total
+                         de ciclos do programa e as bolhas, flushes e
+                         esperas caem em quem ficou esperando
+        bolhas_load_use  bolhas causadas (cobradas do lw que segurou o ID)
+        flushes          instruções descartadas por este branch/jump
+        misses_instrucao misses na busca desta instrução
+        misses_dados     misses do load/store desta instrução
+        espera_memoria   ciclos a mais esperando a hierarquia (busca e dados)
+
+    Nada de dicionário no caminho quente: o índice é (pc - inicio) >> 2.
+    Os relatórios (top N em texto e o formato do callgrind, para abrir no
+    KCachegrind) só são montados no fim.
+
+    Uso:
+        cpu.perfil = PerfilInstrucoes(memoria.text_inicio, memoria.fim_programa)
+        ...
+        cpu.perfil.imprimir_top(20, memoria)
+        cpu.perfil.exportar_callgrind('callgrind.out.programa')
+"""
+
+from array import array
+from bisect import bisect_right
+
+from decodificador import decodificar_instrucao
+
+
+# Campos do perfil, na ordem das colunas do callgrind
+CAMPOS = ('aposentadas', 'ciclos', 'bolhas_load_use', 'flushes',
+          'misses_instrucao', 'misses_dados', 'espera_memoria')
+
+# Nome curto e descrição de cada campo no callgrind ('Ir' é o nome que o
+# KCachegrind já conhece para instruções executadas)
+_EVENTOS_CALLGRIND = (
+    ('Ir', 'Instruções aposentadas'),
+    ('Ciclos', 'Ciclos cobrados'),
+    ('LoadUse', 'Bolhas de load-use causadas'),
+    ('Flush', 'Instruções descartadas por desvio'),
+    ('I1mr', 'Misses na busca'),
+    ('D1mr', 'Misses de dados'),
+    ('EsperaMem', 'Ciclos esperando a memória'),
+)
+
+
+class PerfilInstrucoes:
+    """
+        Contadores por PC para as instruções de [inicio, fim).
+        ciclo: ciclo do processador no momento em que o perfil foi ligado.
+    """
+
+    def __init__(self, inicio, fim, ciclo=0):
+        if fim <= inicio:
+            raise ValueError("o perfil precisa de pelo menos uma instrução")
+
+        self.inicio = inicio
+        self.tamanho = (fim - inicio + 3) // 4
+
+        for campo in CAMPOS:
+            setattr(self, campo, array('Q', bytes(8 * self.tamanho)))
+
+        self.ultimo_ciclo = ciclo   # Ciclo da última aposentadoria
+
+
+    # Anotações do Processador
+
+    def aposentou(self, pc, ciclo):
+        i = (pc - self.inicio) >> 2
+        self.aposentadas[i] += 1
+        self.ciclos[i] += ciclo - self.ultimo_ciclo
+        self.ultimo_ciclo = ciclo
+
+    def bolha(self, pc):
+        self.bolhas_load_use[(pc - self.inicio) >> 2] += 1
+
+    def flush(self, pc):
+        self.flushes[(pc - self.inicio) >> 2] += 1
+
+    def miss_instrucao(self, pc):
+        self.misses_instrucao[(pc - self.inicio) >> 2] += 1
+
+    def miss_dados(self, pc):
+        self.misses_dados[(pc - self.inicio) >> 2] += 1
+
+    def espera(self, pc, ciclos):
+        self.espera_memoria[(pc - self.inicio) >> 2] += ciclos
+
+
+    # Relatórios
+
+    def total(self, campo):
+        return sum(getattr(self, campo))
+
+    def instrucoes(self):
+        """
+            Um dicionário por PC que teve algum custo, em ordem de endereço:
+            {'pc': ..., <campo>: ...} para cada campo de CAMPOS.
+        """
+
+        vetores = [getattr(self, campo) for campo in CAMPOS]
+        for i in range(self.tamanho):
+            valores = [vetor[i] for vetor in vetores]
+            if any(valores):
+                linha = dict(zip(CAMPOS, valores))
+                linha['pc'] = self.inicio + 4 * i
+                yield linha
+
+    def top(self, n=20, campo='ciclos'):
+        """ As n instruções com mais `campo`, da mais cara para a mais barata """
+
+        return sorted(self.instrucoes(), key=lambda linha: linha[campo], reverse=True)[:n]
+
+
+    def imprimir_top(self, n=20, memoria=None, rotulos=None, fontes=None, campo='ciclos'):
+        """
+            Relatório em texto das n instruções mais caras.
+
+            memoria: para mostrar a instrução desmontada (sem fontes)
+            rotulos: nome -> endereço (ver montador.montar), para mostrar PCs
+             como rotulo+deslocamento
+            fontes: pc -> linha do fonte (ver fontes_montadas)
+        """
+
+        total_ciclos = self.total('ciclos') or 1
+        simbolos = _Simbolos(rotulos)
+
+        print(f"\n Instruções mais caras (por {campo}): \n")
+        print(f"   {'PC':>8} {'rótulo':<16} {'aposent.':>9} {'ciclos':>9} {'%':>6} {'CPI':>6} "
+              f"{'load-use':>8} {'flush':>6} {'miss I':>6} {'miss D':>6}  instrução")
+
+        for linha in self.top(n, campo):
+            pc = linha['pc']
+            cpi = linha['ciclos'] / linha['aposentadas'] if linha['aposentadas'] else 0.0
+            print(f"   {pc:>8x} {simbolos.nome(pc):<16} {linha['aposentadas']:>9} {linha['ciclos']:>9} "
+                  f"{linha['ciclos'] * 100 / total_ciclos:>5.1f}% {cpi:>6.2f} "
+                  f"{linha['bolhas_load_use']:>8} {linha['flushes']:>6} "
+                  f"{linha['misses_instrucao']:>6} {linha['misses_dados']:>6}  "
+                  f"{_texto_instrucao(pc, memoria, fontes)}")
+
+
+    def exportar_callgrind(self, arquivo, programa='programa', rotulos=None, linhas=None):
+        """
+            Grava o perfil no formato do callgrind (KCachegrind, callgrind_annotate).
+
+            Cada rótulo da text vira uma função (as instruções antes do
+            primeiro rótulo ficam em 'text'); o custo de cada instrução vai no
+            seu endereço e, se linhas (pc -> número da linha no fonte) vier,
+            na linha do fonte, para a anotação do KCachegrind.
+        """
+
+        simbolos = _Simbolos(rotulos)
+        linhas = linhas or {}
+
+        with open(arquivo, 'w') as f:
+            f.write("# callgrind format\n")
+            f.write("version: 1\n")
+            f.write("creator: simulador MIPS (perfil.py)\n")
+            f.write(f"cmd: {programa}\n")
+            f.write("positions: instr line\n")
+            for nome, descricao in _EVENTOS_CALLGRIND:
+                f.write(f"event: {nome} : {descricao}\n")
+            f.write("events: " + " ".join(nome for nome, _ in _EVENTOS_CALLGRIND) + "\n")
+            f.write("summary: " + " ".join(str(self.total(campo)) for campo in CAMPOS) + "\n\n")
+
+            f.write(f"fl={programa}\n")
+            funcao = None
+            for linha in self.instrucoes():
+                pc = linha['pc']
+                nome = simbolos.funcao(pc)
+                if nome != funcao:
+                    funcao = nome
+                    f.write(f"fn={nome}\n")
+                custos = " ".join(str(linha[campo]) for campo in CAMPOS)
+                f.write(f"{pc:#x} {linhas.get(pc, 0)} {custos}\n")
+
+            f.write("\ntotals: " + " ".join(str(self.total(campo)) for campo in CAMPOS) + "\n")
+
+
+def fontes_montadas(programa):
+    """
+        pc -> texto e pc -> número da linha do fonte, a partir do resultado
+        de montador.montar (para imprimir_top e exportar_callgrind).
+    """
+
+    fontes = {pc: origem for pc, _, origem in programa['listagem']}
+    return fontes, dict(programa['linhas'])
+
+
+class _Simbolos:
+    """ Procura o rótulo da text mais próximo antes de um endereço """
+
+    def __init__(self, rotulos):
+        pares = sorted((endereco, nome) for nome, endereco in (rotulos or {}).items())
+        self.enderecos = [endereco for endereco, _ in pares]
+        self.nomes = [nome for _, nome in pares]
+
+    def _anterior(self, pc):
+        i = bisect_right(self.enderecos, pc) - 1
+        return i if i >= 0 else None
+
+    def funcao(self, pc):
+        i = self._anterior(pc)
+        return self.nomes[i] if i is not None else 'text'
+
+    def nome(self, pc):
+        i = self._anterior(pc)
+        if i is None:
+            return ''
+        deslocamento = pc - self.enderecos[i]
+        return self.nomes[i] + (f"+{deslocamento}" if deslocamento else '')
+
+
+def _texto_instrucao(pc, memoria, fontes):
+    """ Linha do fonte, se tiver; senão a instrução desmontada da memória """
+
+    if fontes and pc in fontes:
+        return fontes[pc]
+    if memoria is None:
+        return ''
+
+    d = decodificar_instrucao(memoria.espiar_palavra(pc))
+    if d.tipo == 'R':
+        if d.subtipo in ('sll', 'srl', 'sra'):
+            return f"{d.subtipo} ${d.rd}, ${d.rt}, {d.shamt}"
+        return f"{d.subtipo} ${d.rd}, ${d.rs}, ${d.rt}"
+    if d.subtipo in ('lw', 'sw'):
+        return f"{d.subtipo} ${d.rt}, {d.immediate_signed}(${d.rs})"
+    if d.tipo == 'I':
+        return f"{d.subtipo} ${d.rt}, ${d.rs}, {d.immediate_signed}"
+    if d.tipo == 'branch':
+        return f"{d.subtipo} ${d.rs}, ${d.rt}, {pc + 4 + (d.immediate_signed << 2):#x}"
+    if d.tipo == 'jump':
+        return f"{d.subtipo} {(d.address << 2):#x}"
+    return d.descricao
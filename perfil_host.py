@@ -0,0 +1,173 @@
+"""
+    Onde vai o tempo do próprio simulador (no host), sem profiler de fora.
+
+    Liga sob demanda: embrulha, só na instância, os estágios do Processador
+    (WB_stage ... IF_stage) e os acessos das caches e da Memoria com
+    cronômetros de perf_counter_ns. Desligado, o simulador não paga nada; o
+    embrulho sai com remover().
+
+    Cada componente acumula chamadas, tempo total e tempo próprio (o total
+    menos o que foi gasto nos componentes chamados por dentro dele, ex: o
+    MEM_stage sem a D-cache, a D-cache sem a memória principal).
+
+    Uso:
+        perfil = PerfilHost()
+        perfil.instrumentar_memoria(cache, cache_instrucoes)  # antes de criar a CPU
+        perfil.instrumentar_processador(cpu)
+        ...
+        perfil.imprimir(cpu.ciclo, cpu.instrucoes_executadas, segundos)
+        perfil.remover()
+"""
+
+import json
+from time import perf_counter_ns
+
+
+ESTAGIOS = ('WB_stage', 'MEM_stage', 'EX_stage', 'ID_stage', 'IF_stage')
+
+# Acessos medidos em cada nível
+METODOS_CACHE = ('ler_palavra', 'escrever_palavra', 'ler_bloco', 'escrever_bloco')
+METODOS_MEMORIA = ('ler_palavra', 'escrever_palavra', 'ler_bloco', 'escrever_bloco', 'ler_byte', 'escrever_byte')
+
+
+class PerfilHost:
+
+    def __init__(self):
+        self.nomes = []         # Componente (ex: 'MEM_stage', 'D-cache.ler_palavra')
+        self.chamadas = []
+        self.total_ns = []
+        self.proprio_ns = []
+
+        # Tempo dos filhos de cada chamada em andamento (para o tempo próprio)
+        self._pilha = []
+
+        # (objeto, nome do método) embrulhados, para o remover()
+        self._embrulhados = []
+
+
+    def _embrulhar(self, objeto, metodo, nome):
+        """ Troca objeto.metodo (só nesta instância) por uma versão cronometrada """
+
+        original = getattr(objeto, metodo)
+        i = len(self.nomes)
+        self.nomes.append(nome)
+        self.chamadas.append(0)
+        self.total_ns.append(0)
+        self.proprio_ns.append(0)
+
+        pilha = self._pilha
+        chamadas, total_ns, proprio_ns = self.chamadas, self.total_ns, self.proprio_ns
+
+        def cronometrado(*args):
+            pilha.append(0)
+            inicio = perf_counter_ns()
+            try:
+                return original(*args)
+            finally:
+                decorrido = perf_counter_ns() - inicio
+                filhos = pilha.pop()
+                chamadas[i] += 1
+                total_ns[i] += decorrido
+                proprio_ns[i] += decorrido - filhos
+                if pilha:
+                    pilha[-1] += decorrido
+
+        setattr(objeto, metodo, cronometrado)
+        self._embrulhados.append((objeto, metodo))
+
+
+    def instrumentar_processador(self, cpu):
+        """ Cronometra os cinco estágios do pipeline """
+
+        for estagio in ESTAGIOS:
+            self._embrulhar(cpu, estagio, estagio)
+
+
+    def instrumentar_memoria(self, cache, cache_instrucoes=None):
+        """
+            Cronometra a hierarquia inteira: L1D (e L1I), os níveis abaixo e a
+            memória principal. Tem que vir antes de criar o processador (o
+            modo funcional e o tradutor guardam os métodos da cache).
+        """
+
+        niveis = [('D-cache' if cache_instrucoes is not None else 'Cache', cache)]
+        if cache_instrucoes is not None:
+            niveis.append(('I-cache', cache_instrucoes))
+
+        numero = 2
+        nivel = cache.proximo
+        while nivel is not cache.ram:
+            niveis.append((f'L{numero}', nivel))
+            numero += 1
+            nivel = nivel.proximo
+
+        for nome, nivel in niveis:
+            for metodo in METODOS_CACHE:
+                self._embrulhar(nivel, metodo, f'{nome}.{metodo}')
+        for metodo in METODOS_MEMORIA:
+            self._embrulhar(cache.ram, metodo, f'Memoria.{metodo}')
+
+
+    def remover(self):
+        """ Devolve os métodos originais (os números medidos continuam aqui) """
+
+        for objeto, metodo in reversed(self._embrulhados):
+            del objeto.__dict__[metodo]
+        self._embrulhados = []
+
+
+    def como_dict(self, ciclos=0, instrucoes=0, segundos=0.0):
+        """ Componentes medidos (os que foram chamados) e as taxas da execução """
+
+        componentes = []
+        for i, nome in enumerate(self.nomes):
+            if self.chamadas[i]:
+                componentes.append({
+                    'componente': nome,
+                    'chamadas': self.chamadas[i],
+                    'total_ns': self.total_ns[i],
+                    'proprio_ns': self.proprio_ns[i],
+                    'ns_por_chamada': self.total_ns[i] / self.chamadas[i],
+                })
+        componentes.sort(key=lambda c: c['proprio_ns'], reverse=True)
+
+        return {
+            'segundos': segundos,
+            'ciclos': ciclos,
+            'instrucoes': instrucoes,
+            'ciclos_por_segundo': ciclos / segundos if segundos else None,
+            'instrucoes_por_segundo': instrucoes / segundos if segundos else None,
+            'componentes': componentes,
+        }
+
+
+    def exportar_json(self, arquivo, ciclos=0, instrucoes=0, segundos=0.0):
+        with open(arquivo, 'w') as f:
+            json.dump(self.como_dict(ciclos, instrucoes, segundos), f, indent=2)
+
+
+    def imprimir(self, ciclos=0, instrucoes=0, segundos=0.0, saida=None):
+        """ Quebra por componente em texto (saida: arquivo, padrão stdout) """
+
+        resultado = self.como_dict(ciclos, instrucoes, segundos)
+        total_ns = segundos * 1e9 or 1
+
+        print(f"\n Tempo do simulador no host ({segundos:.3f} s, com os cronômetros): \n", file=saida)
+        if resultado['ciclos_por_segundo']:
+            print(f"   {resultado['ciclos_por_segundo']:.0f} ciclos simulados/s | "
+                  f"{resultado['instrucoes_por_segundo']:.0f} instruções/s\n", file=saida)
+        elif resultado['instrucoes_por_segundo']:
+            print(f"   {resultado['instrucoes_por_segundo']:.0f} instruções/s\n", file=saida)
+
+        print(f"   {'componente':<28} {'chamadas':>10} {'total ms':>10} {'próprio ms':>11} {'%':>6} "
+              f"{'ns/chamada':>11}", file=saida)
+        medido = 0
+        for c in resultado['componentes']:
+            medido += c['proprio_ns']
+            print(f"   {c['componente']:<28} {c['chamadas']:>10} {c['total_ns'] / 1e6:>10.1f} "
+                  f"{c['proprio_ns'] / 1e6:>11.1f} {c['proprio_ns'] * 100 / total_ns:>5.1f}% "
+                  f"{c['ns_por_chamada']:>11.0f}", file=saida)
+
+        fora = max(total_ns - medido, 0)
+        print(f"   {'(resto: laço, contadores...)':<28} {'':>10} {'':>10} "
+              f"{fora / 1e6:>11.1f} {fora * 100 / total_ns:>5.1f}%", file=saida)
@@ -0,0 +1,223 @@
+"""
+    Previsão de desvios: BTB e preditores de direção.
+
+    O IF consulta a BTB com o PC que está buscando. Se o PC é de um desvio
+    conhecido, a BTB dá o alvo; jumps são sempre tomados e branches perguntam
+    ao preditor. O EX compara o próximo PC de verdade com o previsto e, se
+    errou, descarta a instrução buscada e corrige o PC.
+
+    Como na substituição da cache, o estado fica em vetores planos.
+
+    Interface dos preditores:
+        prever(pc, alvo)                -> True se o branch deve ser tomado
+        historia                        -> história global que prever() usa agora
+                                           (0 nos preditores sem história)
+        atualizar(pc, tomado, historia) -> chamado no EX com o resultado de
+                                           verdade e a história guardada no IF
+
+    A história só anda quando o branch resolve no EX. Com outro branch mais
+    velho resolvendo no meio, a história do EX já não é a da previsão; por
+    isso o IF guarda a sua no registrador de pipeline e o treino usa ela
+    (senão o contador treinado não é o que foi consultado).
+"""
+
+from array import array
+
+
+def _potencia_de_dois(entradas):
+    if entradas <= 0 or entradas & (entradas - 1):
+        raise ValueError("O número de entradas precisa ser potência de 2")
+    return entradas - 1
+
+
+class BTB:
+    """
+        Branch Target Buffer de mapeamento direto: PC -> (alvo, incondicional).
+        Guarda a tag inteira, então nunca confunde dois PCs.
+    """
+
+    def __init__(self, entradas=64):
+        self.mascara = _potencia_de_dois(entradas)
+        self.entradas = entradas
+        self.tags = array('q', [-1]) * entradas
+        self.alvos = array('I', bytes(4 * entradas))
+        self.incondicionais = bytearray(entradas)
+
+        self.consultas = 0
+        self.acertos = 0
+
+    def buscar(self, pc):
+        """ (alvo, incondicional) ou None se o PC não está na BTB """
+
+        self.consultas += 1
+        indice = (pc >> 2) & self.mascara
+        if self.tags[indice] != pc:
+            return None
+
+        self.acertos += 1
+        return self.alvos[indice], self.incondicionais[indice]
+
+    def atualizar(self, pc, alvo, incondicional):
+        indice = (pc >> 2) & self.mascara
+        self.tags[indice] = pc
+        self.alvos[indice] = alvo
+        self.incondicionais[indice] = 1 if incondicional else 0
+
+
+class PreditorNuncaTomado:
+    """ Estático: branch nunca é tomado (é o que o pipeline fazia sem previsão) """
+
+    historia = 0
+
+    def __init__(self, entradas=None, bits_historia=None):
+        pass
+
+    def prever(self, pc, alvo):
+        return False
+
+    def atualizar(self, pc, tomado, historia=None):
+        pass
+
+
+class PreditorSempreTomado(PreditorNuncaTomado):
+    """ Estático: branch sempre é tomado (quando a BTB sabe o alvo) """
+
+    def prever(self, pc, alvo):
+        return True
+
+
+class PreditorBTFN(PreditorNuncaTomado):
+    """ Estático: para trás é tomado (fim de loop), para frente não """
+
+    def prever(self, pc, alvo):
+        return alvo <= pc
+
+
+class Preditor1Bit:
+    """ Um bit por entrada: repete o que o branch fez da última vez """
+
+    historia = 0
+
+    def __init__(self, entradas=1024, bits_historia=None):
+        self.mascara = _potencia_de_dois(entradas)
+        self.tabela = bytearray(entradas)
+
+    def prever(self, pc, alvo):
+        return self.tabela[(pc >> 2) & self.mascara] == 1
+
+    def atualizar(self, pc, tomado, historia=None):
+        self.tabela[(pc >> 2) & self.mascara] = 1 if tomado else 0
+
+
+class Preditor2Bits:
+    """
+        Contador saturante de 2 bits por entrada (0-1 não tomado, 2-3 tomado).
+        Um desvio fora do padrão não muda a previsão na hora.
+    """
+
+    historia = 0
+
+    def __init__(self, entradas=1024, bits_historia=None):
+        self.mascara = _potencia_de_dois(entradas)
+        self.contadores = bytearray([1]) * entradas    # Começa fracamente não tomado
+
+    def _indice(self, pc, historia):
+        return (pc >> 2) & self.mascara
+
+    def _previsao(self, pc, historia):
+        return self.contadores[self._indice(pc, historia)] >= 2
+
+    def prever(self, pc, alvo):
+        return self._previsao(pc, self.historia)
+
+    def atualizar(self, pc, tomado, historia=None):
+        indice = self._indice(pc, self.historia if historia is None else historia)
+        contador = self.contadores[indice]
+        if tomado:
+            if contador < 3:
+                self.contadores[indice] = contador + 1
+        elif contador > 0:
+            self.contadores[indice] = contador - 1
+
+
+class PreditorGshare(Preditor2Bits):
+    """
+        Contadores de 2 bits indexados pelo PC XOR a história global
+        (últimos resultados de todos os branches).
+    """
+
+    def __init__(self, entradas=4096, bits_historia=12):
+        super().__init__(entradas)
+        self.mascara_historia = (1 << bits_historia) - 1
+        self.historia = 0
+
+    def _indice(self, pc, historia):
+        return ((pc >> 2) ^ historia) & self.mascara
+
+    def atualizar(self, pc, tomado, historia=None):
+        super().atualizar(pc, tomado, historia)
+        self.historia = ((self.historia << 1) | (1 if tomado else 0)) & self.mascara_historia
+
+
+class PreditorTorneio:
+    """
+        Torneio: um preditor local (2 bits por PC) e um gshare, e um seletor
+        de 2 bits por PC que aprende qual dos dois acerta mais naquele branch
+        (0-1 usa o local, 2-3 usa o gshare).
+    """
+
+    def __init__(self, entradas=1024, bits_historia=12):
+        self.local = Preditor2Bits(entradas)
+        self.gshare = PreditorGshare(entradas, bits_historia)
+        self.mascara = _potencia_de_dois(entradas)
+        self.seletor = bytearray([1]) * entradas
+
+    @property
+    def historia(self):
+        return self.gshare.historia
+
+    def prever(self, pc, alvo):
+        if self.seletor[(pc >> 2) & self.mascara] >= 2:
+            return self.gshare.prever(pc, alvo)
+        return self.local.prever(pc, alvo)
+
+    def atualizar(self, pc, tomado, historia=None):
+        if historia is None:
+            historia = self.gshare.historia
+
+        acertou_local = self.local.prever(pc, None) == tomado
+        acertou_gshare = self.gshare._previsao(pc, historia) == tomado
+
+        # O seletor só anda quando um acertou e o outro não
+        if acertou_local != acertou_gshare:
+            indice = (pc >> 2) & self.mascara
+            seletor = self.seletor[indice]
+            if acertou_gshare and seletor < 3:
+                self.seletor[indice] = seletor + 1
+            elif acertou_local and seletor > 0:
+                self.seletor[indice] = seletor - 1
+
+        self.local.atualizar(pc, tomado)
+        self.gshare.atualizar(pc, tomado, historia)
+
+
+PREDITORES = {
+    'nunca': PreditorNuncaTomado,
+    'sempre': PreditorSempreTomado,
+    'btfn': PreditorBTFN,
+    '1bit': Preditor1Bit,
+    '2bits': Preditor2Bits,
+    'gshare': PreditorGshare,
+    'torneio': PreditorTorneio,
+}
+
+
+def criar_preditor(nome, entradas=1024, bits_historia=12):
+    """
+        Cria o preditor pelo nome (ver PREDITORES)
+    """
+
+    if nome not in PREDITORES:
+        raise ValueError(f"Preditor desconhecido: {nome}")
+
+    return PREDITORES[nome](entradas, bits_historia)
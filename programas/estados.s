@@ -0,0 +1,61 @@
+# Máquina de estados cheia de desvios: detector da sequência 1101 num fluxo
+# de bits (bit 7 de x = (5x + 3) & 255, começando em x = 11), por 2000 passos.
+# Conta as visitas a cada estado em 'visitas'.
+# Esperado: $v0 = 95 (vezes que a sequência apareceu) e visitas = 763, 400, 603, 234
+
+        .data
+visitas: .space 16
+
+        .text
+main:
+        la   $s0, visitas
+        li   $s1, 2000          # passos
+        li   $s2, 255
+        li   $s7, 1
+        li   $t0, 0             # estado
+        li   $t1, 11            # x
+        li   $v0, 0
+        li   $a1, 1
+        li   $a2, 2
+passo:
+        # Próximo bit de entrada
+        sll  $t2, $t1, 2
+        add  $t1, $t2, $t1
+        addi $t1, $t1, 3
+        and  $t1, $t1, $s2
+        srl  $t3, $t1, 7
+
+        # Conta a visita ao estado
+        sll  $t4, $t0, 2
+        add  $t4, $t4, $s0
+        lw   $t5, 0($t4)
+        addi $t5, $t5, 1
+        sw   $t5, 0($t4)
+
+        beqz $t0, estado0
+        beq  $t0, $a1, estado1
+        beq  $t0, $a2, estado2
+estado3:                        # já viu 110
+        beqz $t3, volta0
+        addi $v0, $v0, 1        # 1101
+        li   $t0, 1
+        b    proximo
+estado2:                        # já viu 11
+        bnez $t3, proximo
+        li   $t0, 3
+        b    proximo
+estado1:                        # já viu 1
+        beqz $t3, volta0
+        li   $t0, 2
+        b    proximo
+estado0:
+        beqz $t3, proximo
+        li   $t0, 1
+        b    proximo
+volta0:
+        li   $t0, 0
+proximo:
+        subi $s1, $s1, 1
+        bnez $s1, passo
+
+        halt
@@ -0,0 +1,46 @@
+# Lista ligada de 128 nós (valor, próximo) espalhados pela memória: o nó i
+# fica na posição 37i mod 128. Percorre a lista 8 vezes somando os valores.
+# Esperado: $v0 = 8 * soma de 3i para i < 128 = 195072
+
+        .data
+nos:    .space 1024             # 128 nós de 8 bytes
+
+        .text
+main:
+        la   $s0, nos
+        li   $s1, 128
+        li   $s2, 127           # máscara da posição
+
+        # Monta a lista
+        li   $t0, 0             # i
+        li   $t1, 0             # posição do nó i
+monta:
+        addi $t2, $t1, 37
+        and  $t2, $t2, $s2      # posição do nó i + 1
+        sll  $t3, $t1, 3
+        add  $t3, $t3, $s0      # &nó i
+        sll  $t4, $t2, 3
+        add  $t4, $t4, $s0      # &nó i + 1
+        sll  $t5, $t0, 1
+        add  $t5, $t5, $t0      # valor = 3i
+        sw   $t5, 0($t3)
+        sw   $t4, 4($t3)
+        move $t1, $t2
+        addi $t0, $t0, 1
+        bne  $t0, $s1, monta
+        sw   $zero, 4($t3)      # o último nó termina a lista
+
+        # Percorre
+        li   $v0, 0
+        li   $t7, 8
+percorre:
+        move $t0, $s0           # o nó 0 está na posição 0
+anda:
+        lw   $t5, 0($t0)
+        add  $v0, $v0, $t5
+        lw   $t0, 4($t0)
+        bnez $t0, anda
+        subi $t7, $t7, 1
+        bnez $t7, percorre
+
+        halt
@@ -0,0 +1,85 @@
+# Multiplicação de matrizes 8x8: C = A x B, com A[i][j] = i + j e B[i][j] = i + 2j.
+# Não tem instrução de multiplicação: o produto é feito por soma e deslocamento.
+# Esperado: $v0 = soma de todos os C[i][j] = 40320
+
+        .data
+A:      .space 256
+B:      .space 256
+C:      .space 256
+
+        .text
+main:
+        la   $s0, A
+        la   $s1, B
+        la   $s2, C
+        li   $s3, 8             # N
+        li   $s7, 1             # constante 1 (não tem andi)
+
+        # Preenche A e B
+        li   $t0, 0             # i
+        move $t8, $s0
+        move $t9, $s1
+enche_i:
+        li   $t1, 0             # j
+enche_j:
+        add  $t2, $t0, $t1
+        sw   $t2, 0($t8)        # A[i][j] = i + j
+        add  $t2, $t2, $t1
+        sw   $t2, 0($t9)        # B[i][j] = i + 2j
+        addi $t8, $t8, 4
+        addi $t9, $t9, 4
+        addi $t1, $t1, 1
+        bne  $t1, $s3, enche_j
+        addi $t0, $t0, 1
+        bne  $t0, $s3, enche_i
+
+        # C[i][j] = soma em k de A[i][k] * B[k][j]
+        li   $t0, 0             # i
+        move $s4, $s2           # &C[i][j]
+mult_i:
+        li   $t1, 0             # j
+mult_j:
+        li   $s5, 0             # acumulador
+        li   $t2, 0             # k
+        sll  $t3, $t0, 5
+        add  $t3, $t3, $s0      # &A[i][0]
+        sll  $t4, $t1, 2
+        add  $t4, $t4, $s1      # &B[0][j]
+mult_k:
+        lw   $t5, 0($t3)        # A[i][k]
+        lw   $t6, 0($t4)        # B[k][j]
+        li   $t7, 0
+produto:
+        beqz $t6, fim_produto
+        and  $a0, $t6, $s7
+        beqz $a0, par
+        add  $t7, $t7, $t5
+par:
+        sll  $t5, $t5, 1
+        srl  $t6, $t6, 1
+        b    produto
+fim_produto:
+        add  $s5, $s5, $t7
+        addi $t3, $t3, 4        # próximo da linha de A
+        addi $t4, $t4, 32       # próximo da coluna de B
+        addi $t2, $t2, 1
+        bne  $t2, $s3, mult_k
+        sw   $s5, 0($s4)
+        addi $s4, $s4, 4
+        addi $t1, $t1, 1
+        bne  $t1, $s3, mult_j
+        addi $t0, $t0, 1
+        bne  $t0, $s3, mult_i
+
+        # Soma de C
+        li   $v0, 0
+        li   $t0, 0
+        li   $t9, 256
+soma:
+        add  $t1, $s2, $t0
+        lw   $t2, 0($t1)
+        add  $v0, $v0, $t2
+        addi $t0, $t0, 4
+        bne  $t0, $t9, soma
+
+        halt
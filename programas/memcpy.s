@@ -0,0 +1,50 @@
+# memcpy: copia 256 palavras, 4 por volta, e soma o destino
+# Esperado: $v0 = 98176 (soma de 3i + 1 para i < 256)
+
+        .data
+origem:  .space 1024
+destino: .space 1024
+
+        .text
+main:
+        la   $s0, origem
+        la   $s1, destino
+        li   $t9, 1024          # tamanho em bytes
+
+        # origem[i] = 3i + 1
+        li   $t0, 0
+        li   $t1, 1
+preenche:
+        add  $t2, $s0, $t0
+        sw   $t1, 0($t2)
+        addi $t1, $t1, 3
+        addi $t0, $t0, 4
+        bne  $t0, $t9, preenche
+
+        # cópia de 4 palavras por volta
+        li   $t0, 0
+copia:
+        add  $t2, $s0, $t0
+        add  $t3, $s1, $t0
+        lw   $t4, 0($t2)
+        lw   $t5, 4($t2)
+        lw   $t6, 8($t2)
+        lw   $t7, 12($t2)
+        sw   $t4, 0($t3)
+        sw   $t5, 4($t3)
+        sw   $t6, 8($t3)
+        sw   $t7, 12($t3)
+        addi $t0, $t0, 16
+        bne  $t0, $t9, copia
+
+        # soma do destino
+        li   $t0, 0
+        li   $v0, 0
+soma:
+        add  $t3, $s1, $t0
+        lw   $t4, 0($t3)
+        add  $v0, $v0, $t4
+        addi $t0, $t0, 4
+        bne  $t0, $t9, soma
+
+        halt
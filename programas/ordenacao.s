@@ -0,0 +1,47 @@
+# Insertion sort de 64 palavras geradas por x = (5x + 3) & 255, começando em x = 7.
+# Esperado: o vetor ordenado em 'vetor'
+
+        .data
+vetor:  .space 256
+
+        .text
+main:
+        la   $s0, vetor
+        li   $s1, 64            # n
+        li   $s2, 255
+
+        # Gera os valores
+        li   $t0, 0
+        li   $t1, 7             # x
+        move $t9, $s0
+gera:
+        sll  $t2, $t1, 2
+        add  $t1, $t2, $t1      # 5x
+        addi $t1, $t1, 3
+        and  $t1, $t1, $s2
+        sw   $t1, 0($t9)
+        addi $t9, $t9, 4
+        addi $t0, $t0, 1
+        bne  $t0, $s1, gera
+
+        # Insertion sort
+        li   $t0, 1             # i
+externo:
+        sll  $t2, $t0, 2
+        add  $t2, $t2, $s0      # &v[i]
+        lw   $t3, 0($t2)        # chave
+        move $t4, $t2           # onde a chave vai entrar
+interno:
+        beq  $t4, $s0, insere
+        lw   $t5, -4($t4)
+        slt  $t6, $t3, $t5      # chave < anterior?
+        beqz $t6, insere
+        sw   $t5, 0($t4)        # anterior anda uma casa
+        addi $t4, $t4, -4
+        b    interno
+insere:
+        sw   $t3, 0($t4)
+        addi $t0, $t0, 1
+        bne  $t0, $s1, externo
+
+        halt
@@ -0,0 +1,43 @@
+# Acesso com passo: soma um vetor de 1024 palavras três vezes, com passos de
+# 1, 8 e 64 palavras (cada passada visita todas as palavras uma vez).
+# Esperado: $v0 = 3 * soma de i para i < 1024 = 1571328
+
+        .data
+vetor:  .space 4096
+
+        .text
+main:
+        la   $s0, vetor
+        li   $s1, 4096          # tamanho em bytes
+
+        # vetor[i] = i
+        li   $t0, 0
+        li   $t1, 0
+enche:
+        add  $t2, $s0, $t0
+        sw   $t1, 0($t2)
+        addi $t1, $t1, 1
+        addi $t0, $t0, 4
+        bne  $t0, $s1, enche
+
+        li   $v0, 0
+        li   $s2, 4             # passo em bytes
+        li   $s4, 3             # passadas
+passada:
+        li   $t0, 0             # começo da coluna
+coluna:
+        move $t1, $t0
+linha:
+        add  $t2, $s0, $t1
+        lw   $t3, 0($t2)
+        add  $v0, $v0, $t3
+        add  $t1, $t1, $s2
+        slt  $t4, $t1, $s1
+        bnez $t4, linha
+        addi $t0, $t0, 4
+        bne  $t0, $s2, coluna
+        sll  $s2, $s2, 3        # passo 8 vezes maior
+        subi $s4, $s4, 1
+        bnez $s4, passada
+
+        halt
@@ -0,0 +1,30 @@
+# Soma de vetores: v3[i] = v1[i] + v2[i] (o programa do gerar_binario.py)
+#
+#   python montador.py programas/soma_vetores.s --agendar
+#   python main.py programas/soma_vetores.img -q
+
+        .data
+v1:     .word 0, 2, 4, 6, 8, 10
+v2:     .word 1, 3, 5, 7, 9, 11
+v3:     .space 24
+
+        .text
+main:
+        la   $s0, v1
+        la   $s1, v2
+        la   $s2, v3
+        li   $t1, 0             # i (em bytes)
+        li   $t2, 24            # fim
+
+loop:
+        add  $t6, $s0, $t1
+        lw   $t3, 0($t6)        # v1[i]
+        add  $t6, $s1, $t1
+        lw   $t4, 0($t6)        # v2[i]
+        add  $t5, $t3, $t4
+        add  $t7, $s2, $t1
+        sw   $t5, 0($t7)        # v3[i]
+        addi $t1, $t1, 4
+        bne  $t1, $t2, loop
+
+        halt
@@ -0,0 +1,232 @@
+"""
+    Rastro compacto de acessos à memória e reprodução do rastro (com NumPy).
+
+    Gravação: cada acesso vira um registro de 16 bytes (ciclo, endereço, flags)
+    num buffer pré-alocado, que é despejado no arquivo em blocos quando enche.
+
+    Formato do arquivo:
+        cabeçalho: b'RAST', versão (H), tamanho do registro (H), 8 bytes reservados
+        registros: <Q ciclo> <I endereço> <B flags> <3 bytes de enchimento>
+
+    flags: bit 0 = escrita (senão leitura), bit 1 = dado (senão instrução)
+
+    Reprodução: o rastro é carregado inteiro com NumPy, tag/índice/offset são
+    calculados para todos os acessos de uma vez e os hits/misses saem sem rodar
+    a CPU. Mapeamento direto é resolvido todo vetorizado; associativo passa os
+    acessos por uma Cache de verdade.
+
+    Uso:
+        python rastro.py rastro.bin --bloco 16 --linhas 8 --assoc 1
+"""
+
+import argparse
+import struct
+
+
+LEITURA = 0
+ESCRITA = 1
+INSTRUCAO = 0
+DADO = 2
+
+MAGIC = b'RAST'
+VERSAO = 1
+
+CABECALHO = struct.Struct('<4sHH8x')
+REGISTRO = struct.Struct('<QIB3x')
+
+
+class RastroAcessos:
+    """
+        Grava acessos num buffer de tamanho fixo e despeja no arquivo em blocos.
+
+        Use como gerenciador de contexto (ou chame fechar()) para não perder
+        o último bloco.
+    """
+
+    def __init__(self, arquivo, registros_por_bloco=65536):
+        self.arquivo = open(arquivo, 'wb')
+        self.arquivo.write(CABECALHO.pack(MAGIC, VERSAO, REGISTRO.size))
+
+        self.capacidade = registros_por_bloco
+        self.buffer = bytearray(REGISTRO.size * registros_por_bloco)
+        self.quantidade = 0   # Registros no buffer
+        self.total = 0        # Registros gravados desde o início
+
+        # Ciclo atual, para quem grava sem saber o ciclo (acessos direto na Cache).
+        # A CPU atualiza a cada ciclo.
+        self.ciclo = 0
+
+    def registrar(self, ciclo, endereco, flags):
+        """ Acrescenta um acesso ao rastro """
+
+        REGISTRO.pack_into(self.buffer, self.quantidade * REGISTRO.size,
+                           ciclo, endereco & 0xFFFFFFFF, flags)
+        self.quantidade += 1
+        if self.quantidade == self.capacidade:
+            self.descarregar()
+
+    def descarregar(self):
+        """ Grava no arquivo o que está no buffer """
+
+        if self.quantidade:
+            with memoryview(self.buffer) as visao:
+                self.arquivo.write(visao[:self.quantidade * REGISTRO.size])
+            self.total += self.quantidade
+            self.quantidade = 0
+
+    def fechar(self):
+        if not self.arquivo.closed:
+            self.descarregar()
+            self.arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+
+def _numpy():
+    """ NumPy só é necessário para a reprodução """
+
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("A reprodução de rastros precisa do NumPy (pip install numpy)")
+    return numpy
+
+
+def carregar_rastro(arquivo):
+    """
+        Carrega o rastro num array estruturado do NumPy com os campos
+        'ciclo', 'endereco' e 'flags'.
+    """
+
+    np = _numpy()
+
+    with open(arquivo, 'rb') as f:
+        magic, versao, tamanho_registro = CABECALHO.unpack(f.read(CABECALHO.size))
+
+    if magic != MAGIC or versao != VERSAO or tamanho_registro != REGISTRO.size:
+        raise Exception(f"{arquivo} não é um rastro válido")
+
+    tipo = np.dtype([('ciclo', '<u8'), ('endereco', '<u4'), ('flags', 'u1'), ('_', 'V3')])
+    return np.fromfile(arquivo, dtype=tipo, offset=CABECALHO.size)
+
+
+def decompor_enderecos(enderecos, tamanho_bloco, num_conjuntos):
+    """
+        Tag, índice e offset de todos os endereços de uma vez (com shifts e
+        máscaras, então bloco e conjuntos precisam ser potências de 2).
+    """
+
+    np = _numpy()
+
+    if tamanho_bloco & (tamanho_bloco - 1) or num_conjuntos & (num_conjuntos - 1):
+        raise ValueError("tamanho_bloco e num_conjuntos precisam ser potências de 2")
+
+    bits_offset = tamanho_bloco.bit_length() - 1
+    bits_indice = num_conjuntos.bit_length() - 1
+
+    enderecos = enderecos.astype(np.uint64)
+    offset = enderecos & (tamanho_bloco - 1)
+    indice = (enderecos >> bits_offset) & (num_conjuntos - 1)
+    tag = enderecos >> (bits_offset + bits_indice)
+
+    return tag, indice, offset
+
+
+def reproduzir_mapeamento_direto(registros, tamanho_bloco=16, num_linhas=8, alocar_na_escrita=False):
+    """
+        Hits/misses de uma cache de mapeamento direto, todo vetorizado.
+
+        Um acesso é hit se o último acesso que trouxe bloco para aquela linha
+        (leitura, ou escrita com alocação) tinha a mesma tag. Escritas sem
+        alocação não mudam o conteúdo da cache.
+
+        Retorna um vetor booleano (True = hit) na ordem do rastro.
+    """
+
+    np = _numpy()
+
+    tag, indice, _ = decompor_enderecos(registros['endereco'], tamanho_bloco, num_linhas)
+    escrita = (registros['flags'] & ESCRITA).astype(bool)
+    aloca = np.ones(len(registros), dtype=bool) if alocar_na_escrita else ~escrita
+
+    # Ordena por linha mantendo a ordem do tempo dentro de cada linha
+    ordem = np.argsort(indice, kind='stable')
+    indice_ord = indice[ordem]
+    tag_ord = tag[ordem]
+    aloca_ord = aloca[ordem]
+
+    # Para cada acesso, a posição do último acesso anterior que alocou
+    posicoes = np.arange(len(ordem))
+    ultimo = np.where(aloca_ord, posicoes, -1)
+    ultimo = np.maximum.accumulate(np.concatenate(([-1], ultimo[:-1])))
+
+    # Hit se esse acesso existe, é da mesma linha e tem a mesma tag
+    tem_anterior = ultimo >= 0
+    anterior = np.where(tem_anterior, ultimo, 0)
+    hit_ord = tem_anterior & (indice_ord[anterior] == indice_ord) & (tag_ord[anterior] == tag_ord)
+
+    hits = np.empty_like(hit_ord)
+    hits[ordem] = hit_ord
+    return hits
+
+
+def reproduzir_na_cache(registros, cache):
+    """
+        Passa os acessos do rastro por uma Cache (qualquer configuração).
+        Os endereços já vêm prontos do NumPy, só o laço é em Python.
+    """
+
+    ler = cache._ler_byte
+    escrever = cache._escrever_byte
+
+    for endereco, flags in zip(registros['endereco'].tolist(), registros['flags'].tolist()):
+        if flags & ESCRITA:
+            escrever(endereco, 0)
+        else:
+            ler(endereco)
+
+    return cache
+
+
+def main():
+    from cache import Cache
+    from memoria import Memoria
+
+    parser = argparse.ArgumentParser(description="Reproduz um rastro de acessos numa cache")
+    parser.add_argument('arquivo', help="rastro gravado (ver RastroAcessos)")
+    parser.add_argument('--bloco', type=int, default=16, help="tamanho do bloco em bytes")
+    parser.add_argument('--linhas', type=int, default=8, help="número de linhas")
+    parser.add_argument('--assoc', type=int, default=1, help="associatividade")
+    parser.add_argument('--so-dados', action='store_true', help="ignora buscas de instrução")
+    args = parser.parse_args()
+
+    np = _numpy()
+    registros = carregar_rastro(args.arquivo)
+    if args.so_dados:
+        registros = registros[(registros['flags'] & DADO).astype(bool)]
+
+    leituras = ~(registros['flags'] & ESCRITA).astype(bool)
+
+    if args.assoc == 1:
+        hits = reproduzir_mapeamento_direto(registros, args.bloco, args.linhas)
+        hits_leitura = int(np.count_nonzero(hits & leituras))
+    else:
+        # Memória só do tamanho necessário para os endereços do rastro
+        maior = int(registros['endereco'].max()) if len(registros) else 0
+        memoria = Memoria(maior + args.bloco)
+        cache = reproduzir_na_cache(registros, Cache(memoria, args.bloco, args.linhas, args.assoc))
+        hits_leitura = cache.hits
+
+    total_leituras = int(np.count_nonzero(leituras))
+    print(f"Acessos: {len(registros)} ({total_leituras} leituras)")
+    if total_leituras:
+        print(f"Hits de leitura: {hits_leitura} | Misses: {total_leituras - hits_leitura}")
+        print(f"Taxa de Hit: {hits_leitura / total_leituras * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+    Registradores de pipeline (IF/ID, ID/EX, EX/MEM, MEM/WB).
+
+    Objetos com __slots__ em vez de dicionários: os campos são lidos e
+    escritos por atributo, sem montar dicionário novo a cada ciclo. O
+    Processador tem dois de cada (o atual, que os estágios leem, e o
+    próximo, que eles escrevem) e troca as referências no fim do ciclo.
+
+    O ID/EX não copia os campos da instrução: guarda a InstrucaoDecodificada
+    (compartilhada pela cache de decodificação) e lê dela o que não é dele
+    (cpu.ID_EX.rs, cpu.ID_EX.subtipo, cpu.ID_EX.controle...).
+"""
+
+from decodificador import decodificar_instrucao
+
+
+# Instrução de um ID/EX que ainda não recebeu nenhuma (tipo 'unknown')
+_NENHUMA = decodificar_instrucao(0xFFFFFFFF)
+
+
+class _Registrador:
+    """ Base: cópia campo a campo (para segurar o conteúdo num stall) """
+
+    __slots__ = ()
+
+    def copiar_de(self, outro):
+        for campo in self.__slots__:
+            setattr(self, campo, getattr(outro, campo))
+
+
+class RegistradorIFID(_Registrador):
+
+    __slots__ = ('instruction', 'PC', 'PC_mais_4', 'PC_seguinte', 'historia', 'seq', 'valid')
+
+    def __init__(self):
+        self.instruction = 0       # Instrução de 32 bits
+        self.PC = 0                # Endereço desta instrução
+        self.PC_mais_4 = 0         # PC + 4 (para branches)
+        self.PC_seguinte = 0       # PC que o IF buscou depois desta (previsão)
+        self.historia = 0          # História global do preditor na previsão
+        self.seq = 0               # Número de ordem da busca (para os eventos)
+        self.valid = False         # Tem instrução válida?
+
+
+class RegistradorIDEX(_Registrador):
+
+    __slots__ = ('decodificada', 'dado1', 'dado2', 'PC_mais_4',
+                 'PC_origem', 'PC_seguinte', 'historia', 'seq', 'valid')
+
+    def __init__(self):
+        self.decodificada = _NENHUMA   # Campos, tipo e sinais de controle da instrução
+        self.dado1 = 0                 # Valor do registrador rs
+        self.dado2 = 0                 # Valor do registrador rt
+        self.PC_mais_4 = 0             # PC + 4 (para branches e jumps)
+        self.PC_origem = 0             # PC onde esta instrução foi buscada
+        self.PC_seguinte = 0           # Próximo PC previsto no IF (conferido no EX)
+        self.historia = 0              # História do preditor no IF (treino no EX)
+        self.seq = 0                   # Número de ordem da busca (para os eventos)
+        self.valid = False
+
+    def __getattr__(self, nome):
+        # Só chega aqui o que não é slot: opcode, rs, rt, subtipo, controle...
+        if nome.startswith('_') or nome == 'decodificada':
+            raise AttributeError(nome)
+        return getattr(self.decodificada, nome)
+
+
+class RegistradorEXMEM(_Registrador):
+
+    __slots__ = ('ALU_result', 'write_data', 'write_reg',
+                 'MemRead', 'MemWrite', 'RegWrite', 'MemToReg',
+                 'Branch', 'branch_taken', 'branch_target',
+                 'PC_origem', 'subtipo', 'seq', 'valid')
+
+    def __init__(self):
+        self.ALU_result = 0          # Resultado da ULA
+        self.write_data = 0          # Dado para stores (valor do rt, já adiantado)
+        self.write_reg = 0           # Registrador destino (rt ou rd)
+
+        # Sinais de controle
+        self.MemRead = False         # Load
+        self.MemWrite = False        # Store
+        self.RegWrite = False        # Escreve no banco de registradores?
+        self.MemToReg = False        # Dado vem da memória ou da ULA
+        self.Branch = False
+        self.branch_taken = False
+        self.branch_target = 0
+
+        # Metadados
+        self.PC_origem = 0
+        self.subtipo = 'unknown'
+        self.seq = 0
+        self.valid = False
+
+
+class RegistradorMEMWB(_Registrador):
+
+    __slots__ = ('write_data', 'write_reg', 'RegWrite', 'MemToReg',
+                 'PC_origem', 'subtipo', 'seq', 'valid')
+
+    def __init__(self):
+        self.write_data = 0          # Dado para o write back
+        self.write_reg = 0           # Registrador destino
+        self.RegWrite = False        # Controla o write back
+        self.MemToReg = False        # Veio da memória? (para debug)
+
+        # Metadados
+        self.PC_origem = 0
+        self.subtipo = 'unknown'
+        self.seq = 0
+        self.valid = False
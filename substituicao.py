@@ -0,0 +1,132 @@
+"""
+    Políticas de substituição da Cache.
+
+    Toda política guarda o seu estado em vetores planos (um valor por linha ou
+    por conjunto), para caches com centenas de milhares de linhas continuarem
+    baratas. A Cache numera as linhas como conjunto * associatividade + via.
+
+    Interface:
+        acessou(conjunto, via)  -> chamado em todo hit
+        inseriu(conjunto, via)  -> chamado quando um bloco novo entra na via
+        vitima(conjunto)        -> qual via sai (todas as vias estão válidas)
+"""
+
+import random
+from array import array
+
+
+class SubstituicaoLRU:
+    """ Least Recently Used: sai quem foi usado há mais tempo """
+
+    def __init__(self, num_conjuntos, associatividade, semente=None):
+        self.associatividade = associatividade
+        self.ultimo_uso = array('Q', bytes(8 * num_conjuntos * associatividade))
+        self.relogio = 0
+
+    def acessou(self, conjunto, via):
+        self.relogio += 1
+        self.ultimo_uso[conjunto * self.associatividade + via] = self.relogio
+
+    inseriu = acessou
+
+    def vitima(self, conjunto):
+        inicio = conjunto * self.associatividade
+        usos = self.ultimo_uso[inicio:inicio + self.associatividade]
+        return usos.index(min(usos))
+
+
+class SubstituicaoFIFO:
+    """ First In First Out: sai quem entrou primeiro (ponteiro circular por conjunto) """
+
+    def __init__(self, num_conjuntos, associatividade, semente=None):
+        self.associatividade = associatividade
+        self.proxima = array('I', bytes(4 * num_conjuntos))
+
+    def acessou(self, conjunto, via):
+        pass
+
+    def inseriu(self, conjunto, via):
+        # As vias são preenchidas em ordem, então o ponteiro só anda
+        self.proxima[conjunto] = (via + 1) % self.associatividade
+
+    def vitima(self, conjunto):
+        return self.proxima[conjunto]
+
+
+class SubstituicaoAleatoria:
+    """ Sai uma via qualquer (semente opcional para poder repetir o resultado) """
+
+    def __init__(self, num_conjuntos, associatividade, semente=None):
+        self.associatividade = associatividade
+        self.gerador = random.Random(semente)
+
+    def acessou(self, conjunto, via):
+        pass
+
+    def inseriu(self, conjunto, via):
+        pass
+
+    def vitima(self, conjunto):
+        return self.gerador.randrange(self.associatividade)
+
+
+class SubstituicaoPLRU:
+    """
+        Tree-PLRU: cada conjunto tem uma árvore binária de (associatividade - 1)
+        bits. Cada bit aponta para o lado menos usado recentemente.
+        A associatividade precisa ser potência de 2.
+    """
+
+    def __init__(self, num_conjuntos, associatividade, semente=None):
+        if associatividade & (associatividade - 1):
+            raise ValueError("Tree-PLRU precisa de associatividade potência de 2")
+
+        self.associatividade = associatividade
+        self.bits_por_conjunto = max(associatividade - 1, 1)
+        self.arvore = bytearray(num_conjuntos * self.bits_por_conjunto)
+
+    def acessou(self, conjunto, via):
+        # Desce da raiz até a folha da via, apontando cada nó para o outro lado
+        base = conjunto * self.bits_por_conjunto
+        no = 0
+        metade = self.associatividade >> 1
+        while metade:
+            direita = 1 if via & metade else 0
+            self.arvore[base + no] = 1 - direita
+            no = 2 * no + 1 + direita
+            metade >>= 1
+
+    inseriu = acessou
+
+    def vitima(self, conjunto):
+        # Segue os bits a partir da raiz
+        base = conjunto * self.bits_por_conjunto
+        no = 0
+        via = 0
+        metade = self.associatividade >> 1
+        while metade:
+            direita = self.arvore[base + no]
+            if direita:
+                via |= metade
+            no = 2 * no + 1 + direita
+            metade >>= 1
+        return via
+
+
+POLITICAS_SUBSTITUICAO = {
+    'LRU': SubstituicaoLRU,
+    'FIFO': SubstituicaoFIFO,
+    'aleatoria': SubstituicaoAleatoria,
+    'PLRU': SubstituicaoPLRU,
+}
+
+
+def criar_politica(nome, num_conjuntos, associatividade, semente=None):
+    """
+        Cria a política pelo nome (ver POLITICAS_SUBSTITUICAO)
+    """
+
+    if nome not in POLITICAS_SUBSTITUICAO:
+        raise ValueError(f"Política de substituição desconhecida: {nome}")
+
+    return POLITICAS_SUBSTITUICAO[nome](num_conjuntos, associatividade, semente)
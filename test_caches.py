@@ -0,0 +1,68 @@
+"""
+    Caches separadas (I/D) com write-back no pipeline (python -m pytest).
+"""
+
+from cpu import Processador
+from main import criar_parser, montar_maquina
+from montador import REGISTRADORES, carregar_montado, montar
+
+
+# Dados em memória baixa, dentro da seção text mas depois do código (como
+# os vetores do teste.bin em 200/300/400)
+DADOS_NA_TEXT = """
+        .text
+main:
+        li   $s0, 1024
+        li   $t0, 8
+laco:
+        sw   $t0, 0($s0)
+        sw   $t0, 4($s0)
+        addi $t0, $t0, -1
+        bne  $t0, $zero, laco
+"""
+
+# Código que se modifica: troca o 'addi $v0, $zero, 1' de alvo por
+# 'addi $v0, $zero, 7' (0x20020007) antes de chegar nele
+AUTOMODIFICAVEL = """
+        .text
+main:
+        li   $t0, 0x2002
+        sll  $t0, $t0, 16
+        addi $t0, $t0, 7
+        la   $t1, alvo
+        sw   $t0, 0($t1)
+        add  $zero, $zero, $zero
+        add  $zero, $zero, $zero
+        add  $zero, $zero, $zero
+        add  $zero, $zero, $zero
+alvo:
+        addi $v0, $zero, 1
+"""
+
+
+def _rodar(fonte, *argumentos):
+    opcoes = criar_parser().parse_args(['--cache-escrita', 'write-back', *argumentos])
+    memoria, cache, cache_instrucoes, _ = montar_maquina(opcoes)
+    carregar_montado(memoria, montar(fonte))
+
+    cpu = Processador(cache, cache_instrucoes)
+    cpu.PC = memoria.entrada
+    cpu.executar_ate(100_000)
+    assert not cpu.rodando
+    return cpu
+
+
+def test_stores_em_dados_na_text_acertam_a_dcache():
+    cpu = _rodar(DADOS_NA_TEXT)
+
+    # 16 stores no mesmo bloco: só o primeiro erra, e nada volta para a RAM
+    # antes do fim (o código não foi tocado)
+    assert cpu.cache.misses_escrita == 1
+    assert cpu.cache.hits_escrita == 15
+    assert cpu.cache.writebacks == 0
+
+
+def test_codigo_automodificavel_com_caches_separadas():
+    for argumentos in ((), ('--cache-unificada',)):
+        cpu = _rodar(AUTOMODIFICAVEL, *argumentos)
+        assert cpu.registradores[REGISTRADORES['$v0']] == 7
@@ -0,0 +1,74 @@
+"""
+    Preditores de desvio no pipeline (python -m pytest).
+"""
+
+from cpu import Processador
+from main import criar_parser, montar_maquina
+from montador import carregar_montado, montar
+from preditores import BTB, PreditorGshare, PreditorTorneio
+
+
+# Dois branches em voo juntos: o B é buscado antes de o A resolver no EX,
+# então quando o B chega no EX a história global já andou com o resultado
+# do A. O A alterna tomado/não tomado, o que só a história global acerta.
+DOIS_BRANCHES = """
+        .text
+main:
+        li   $t0, 400
+        li   $s1, 1
+laco:
+        addi $t0, $t0, -1
+        and  $t2, $t0, $s1
+        beq  $t2, $zero, pula
+        addi $t3, $t3, 1
+pula:
+        bne  $t0, $zero, laco
+"""
+
+
+class _GshareEspiao(PreditorGshare):
+    """ Gshare que anota a história de cada consulta e de cada treino """
+
+    def __init__(self):
+        super().__init__(1024, 8)
+        self.consultas = {}
+        self.treinos = []
+
+    def prever(self, pc, alvo):
+        self.consultas[pc] = self.historia
+        return super().prever(pc, alvo)
+
+    def atualizar(self, pc, tomado, historia=None):
+        self.treinos.append((pc, historia, self.consultas.get(pc), self.historia))
+        super().atualizar(pc, tomado, historia)
+
+
+def _rodar(preditor):
+    memoria, cache, cache_instrucoes, _ = montar_maquina(criar_parser().parse_args([]))
+    carregar_montado(memoria, montar(DOIS_BRANCHES))
+
+    cpu = Processador(cache, cache_instrucoes, preditor, BTB(64))
+    cpu.PC = memoria.entrada
+    cpu.executar_ate(100_000)
+    assert not cpu.rodando
+    return cpu
+
+
+def test_gshare_treina_com_a_historia_da_previsao():
+    espiao = _GshareEspiao()
+    _rodar(espiao)
+
+    consultados = [(historia, consultada) for _, historia, consultada, _ in espiao.treinos
+                   if consultada is not None]
+    assert consultados
+    assert all(historia == consultada for historia, consultada in consultados)
+
+    # O caso que importa aconteceu: a história mudou entre o IF e o EX
+    assert any(historia != atual for _, historia, _, atual in espiao.treinos)
+
+
+def test_gshare_e_torneio_aprendem_branches_colados():
+    for preditor in (PreditorGshare(1024, 8), PreditorTorneio(1024, 8)):
+        contadores = _rodar(preditor).contadores
+        assert contadores.desvios == 800
+        assert contadores.desvios_errados < 40
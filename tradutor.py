@@ -0,0 +1,267 @@
+from decodificador import decodificar_instrucao
+
+
+# Tamanho máximo de um bloco (em instruções), para não gerar funções gigantes
+MAX_INSTRUCOES_BLOCO = 64
+
+MASCARA = 0xFFFFFFFF
+
+
+class TradutorBlocos:
+    """
+        Tradução de blocos básicos para funções Python.
+
+        Um bloco básico é uma sequência de instruções sem desvio no meio: começa
+        num PC qualquer e termina no primeiro beq/bne/j/jal (inclusive) ou antes
+        do HALT. Cada bloco é compilado uma única vez (gera o código fonte e faz
+        exec) e fica guardado pelo PC de entrada.
+
+        A função gerada recebe a lista de registradores e devolve
+        (próximo PC, instruções executadas). Se um lw/sw der erro de memória,
+        devolve (None, instruções aposentadas antes dele): as anteriores já
+        escreveram registradores e memória, como no passo() do funcional.
+    """
+
+    def __init__(self, memoria_cache, invalidar=None):
+        """
+            invalidar: função chamada pelos blocos quando um store cai na seção
+            text. Por padrão é o próprio TradutorBlocos.invalidar; quem tiver
+            outras caches de instruções passa uma função que limpa tudo.
+        """
+        self.cache = memoria_cache
+        self.ao_escrever_text = invalidar if invalidar is not None else self.invalidar
+
+        # PC de entrada -> (função, quantidade de instruções do bloco)
+        self.blocos = {}
+
+        # Endereço da palavra -> PCs de entrada dos blocos que contêm essa palavra.
+        # Usado para invalidar quando alguém escreve na seção text.
+        self.blocos_por_palavra = {}
+
+        # Estatistica
+        self.blocos_traduzidos = 0
+
+        # Geradores de código: loads, stores, branches e jumps vão pelo subtipo;
+        # o resto dos tipos R e I vai pela operação da ULA (igual o EX_stage).
+        self.geradores = {
+            ('R', 'ADD'): self._gerar_add,
+            ('R', 'SUB'): self._gerar_sub,
+            ('R', 'AND'): self._gerar_and,
+            ('R', 'OR'): self._gerar_or,
+            ('R', 'SLT'): self._gerar_slt,
+            ('R', 'SLL'): self._gerar_sll,
+            ('R', 'SRL'): self._gerar_srl,
+            ('I', 'ADD'): self._gerar_addi,
+            'lw': self._gerar_lw,
+            'sw': self._gerar_sw,
+            'beq': self._gerar_beq,
+            'bne': self._gerar_bne,
+            'j': self._gerar_j,
+            'jal': self._gerar_jal,
+        }
+
+
+    def obter(self, pc):
+        """
+            Retorna (função, tamanho) do bloco que começa em pc, traduzindo se
+            precisar. Retorna None se o pc já é fim de programa.
+        """
+
+        bloco = self.blocos.get(pc)
+        if bloco is None:
+            bloco = self.traduzir(pc)
+        return bloco
+
+
+    def traduzir(self, pc_inicio):
+        """
+            Descobre o bloco básico que começa em pc_inicio e compila ele.
+        """
+
+        ram = self.cache.ram
+        fim_do_programa = ram.fim_programa  # Mesma regra do IF_stage
+
+        linhas = []
+        pc = pc_inicio
+        quantidade = 0
+        terminou = False
+        acessa_memoria = False
+
+        while quantidade < MAX_INSTRUCOES_BLOCO:
+            if pc >= fim_do_programa:
+                break
+
+            instrucao = self.cache.espiar_palavra(pc)
+            if instrucao == 0xFFFFFFFF:  # HALT fica para o despachante
+                break
+
+            d = decodificar_instrucao(instrucao)
+            quantidade += 1
+            acessa_memoria = acessa_memoria or d.subtipo in ('lw', 'sw')
+
+            gerar = self.geradores.get(d.subtipo)
+            if gerar is None:
+                gerar = self.geradores.get((d.tipo, d.alu_control), self._gerar_nop)
+
+            terminou = gerar(linhas, d, pc, quantidade)
+            pc += 4
+
+            if terminou:
+                break
+
+        if quantidade == 0:
+            return None
+
+        # Caiu no fim do bloco sem desvio: segue para a próxima instrução
+        if not terminou:
+            linhas.append(f"return {pc}, {quantidade}")
+
+        funcao = self._compilar(pc_inicio, linhas, acessa_memoria)
+        bloco = (funcao, quantidade)
+
+        self.blocos[pc_inicio] = bloco
+        for palavra in range(pc_inicio, pc_inicio + 4 * quantidade, 4):
+            self.blocos_por_palavra.setdefault(palavra, set()).add(pc_inicio)
+
+        self.blocos_traduzidos += 1
+        return bloco
+
+
+    def _compilar(self, pc_inicio, linhas, acessa_memoria):
+        """
+            Transforma as linhas geradas numa função Python. Com lw/sw no bloco,
+            o corpo vai num try: cada acesso guarda antes em f quantas
+            instruções do bloco já foram aposentadas.
+        """
+
+        ram = self.cache.ram
+
+        fonte = f"def bloco_{pc_inicio:x}(r):\n"
+        if acessa_memoria:
+            fonte += "    try:\n"
+            fonte += "".join(f"        {linha}\n" for linha in linhas)
+            fonte += "    except Exception:\n"
+            fonte += "        return None, f\n"
+        else:
+            fonte += "".join(f"    {linha}\n" for linha in linhas)
+
+        ambiente = {
+            'ler': self.cache.ler_palavra,
+            'escrever': self.cache.escrever_palavra,
+            'invalidar': self.ao_escrever_text,
+            'TEXT_INICIO': ram.text_inicio,
+            'TEXT_FIM': ram.text_fim,
+        }
+        exec(compile(fonte, f"<bloco {hex(pc_inicio)}>", "exec"), ambiente)
+        return ambiente[f"bloco_{pc_inicio:x}"]
+
+
+    def invalidar(self, endereco):
+        """
+            Descarta todos os blocos que contêm a palavra do endereço.
+        """
+
+        for pc_inicio in self.blocos_por_palavra.pop(endereco & ~0x3, ()):
+            bloco = self.blocos.pop(pc_inicio, None)
+            if bloco is None:
+                continue
+
+            # Tira as outras palavras do bloco do índice também
+            for palavra in range(pc_inicio, pc_inicio + 4 * bloco[1], 4):
+                entradas = self.blocos_por_palavra.get(palavra)
+                if entradas is not None:
+                    entradas.discard(pc_inicio)
+
+
+    # Geradores de código.
+    # Cada um acrescenta as linhas da instrução e retorna True se ela encerra o bloco.
+    # Escrita no $zero não gera código (o registrador tem que continuar zero).
+
+    def _gerar_nop(self, linhas, d, pc, n):
+        return False
+
+    def _gerar_add(self, linhas, d, pc, n):
+        if d.rd != 0:
+            linhas.append(f"r[{d.rd}] = (r[{d.rs}] + r[{d.rt}]) & {MASCARA}")
+        return False
+
+    def _gerar_sub(self, linhas, d, pc, n):
+        if d.rd != 0:
+            linhas.append(f"r[{d.rd}] = (r[{d.rs}] - r[{d.rt}]) & {MASCARA}")
+        return False
+
+    def _gerar_and(self, linhas, d, pc, n):
+        if d.rd != 0:
+            linhas.append(f"r[{d.rd}] = r[{d.rs}] & r[{d.rt}]")
+        return False
+
+    def _gerar_or(self, linhas, d, pc, n):
+        if d.rd != 0:
+            linhas.append(f"r[{d.rd}] = r[{d.rs}] | r[{d.rt}]")
+        return False
+
+    def _gerar_slt(self, linhas, d, pc, n):
+        # Inverter o bit de sinal transforma a comparação com sinal em sem sinal
+        if d.rd != 0:
+            linhas.append(f"r[{d.rd}] = 1 if (r[{d.rs}] ^ 0x80000000) < (r[{d.rt}] ^ 0x80000000) else 0")
+        return False
+
+    def _gerar_sll(self, linhas, d, pc, n):
+        if d.rd != 0:
+            linhas.append(f"r[{d.rd}] = (r[{d.rt}] << {d.shamt}) & {MASCARA}")
+        return False
+
+    def _gerar_srl(self, linhas, d, pc, n):
+        if d.rd != 0:
+            linhas.append(f"r[{d.rd}] = r[{d.rt}] >> {d.shamt}")
+        return False
+
+    def _gerar_addi(self, linhas, d, pc, n):
+        if d.rt != 0:
+            linhas.append(f"r[{d.rt}] = (r[{d.rs}] + {d.immediate_signed}) & {MASCARA}")
+        return False
+
+    def _gerar_lw(self, linhas, d, pc, n):
+        linhas.append(f"f = {n - 1}")
+        endereco = f"(r[{d.rs}] + {d.immediate_signed}) & {MASCARA}"
+        if d.rt != 0:
+            linhas.append(f"r[{d.rt}] = ler({endereco})")
+        else:
+            linhas.append(f"ler({endereco})")  # O acesso acontece mesmo assim
+        return False
+
+    def _gerar_sw(self, linhas, d, pc, n):
+        # Se escreveu na seção text, o resto deste bloco pode ter mudado:
+        # invalida e volta para o despachante na instrução seguinte.
+        linhas.append(f"f = {n - 1}")
+        linhas.append(f"e = (r[{d.rs}] + {d.immediate_signed}) & {MASCARA}")
+        linhas.append(f"escrever(e, r[{d.rt}])")
+        linhas.append("if TEXT_INICIO <= e <= TEXT_FIM:")
+        linhas.append("    invalidar(e)")
+        linhas.append(f"    return {pc + 4}, {n}")
+        return False
+
+    def _gerar_beq(self, linhas, d, pc, n):
+        alvo = pc + 4 + (d.immediate_signed << 2)
+        linhas.append(f"if r[{d.rs}] == r[{d.rt}]:")
+        linhas.append(f"    return {alvo}, {n}")
+        linhas.append(f"return {pc + 4}, {n}")
+        return True
+
+    def _gerar_bne(self, linhas, d, pc, n):
+        alvo = pc + 4 + (d.immediate_signed << 2)
+        linhas.append(f"if r[{d.rs}] != r[{d.rt}]:")
+        linhas.append(f"    return {alvo}, {n}")
+        linhas.append(f"return {pc + 4}, {n}")
+        return True
+
+    def _gerar_j(self, linhas, d, pc, n):
+        alvo = ((pc + 4) & 0xF0000000) | (d.address << 2)
+        linhas.append(f"return {alvo}, {n}")
+        return True
+
+    def _gerar_jal(self, linhas, d, pc, n):
+        alvo = ((pc + 4) & 0xF0000000) | (d.address << 2)
+        linhas.append(f"r[31] = {pc + 4}")
+        linhas.append(f"return {alvo}, {n}")
+        return True
@@ -0,0 +1,219 @@
+"""
+    Varredura de configurações de cache numa única passada.
+
+    Em vez de rodar a CPU uma vez por geometria de cache, grava o fluxo de
+    endereços de uma execução e calcula hits/misses de várias configurações
+    de uma vez usando distância de pilha (algoritmo de Mattson) para LRU.
+
+    Para um tamanho de bloco e um número de conjuntos fixos, uma cache LRU de
+    associatividade A acerta exatamente os acessos cuja distância de pilha
+    (quantos blocos diferentes do mesmo conjunto foram usados desde o último
+    acesso àquele bloco) é menor que A. Então um histograma de distâncias
+    responde por todas as associatividades ao mesmo tempo.
+
+    Modelo: LRU com alocação em leituras e escritas (todo acesso é tratado igual).
+
+    Uso:
+        python varredura.py teste.bin --csv varredura.csv
+        python varredura.py programas/memcpy.s
+"""
+
+import argparse
+import csv
+import sys
+from array import array
+
+from cache import Cache
+from cpu import Processador
+from main import carregar_arquivo
+from memoria import Memoria
+
+
+class GravadorEnderecos:
+    """
+        Fica na frente de uma Cache e anota o endereço de cada acesso por
+        palavra (ou byte) feito pela CPU. Todo o resto é repassado para a cache.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.enderecos = array('I')
+
+    def __getattr__(self, nome):
+        return getattr(self.cache, nome)
+
+    def ler_palavra(self, endereco):
+        self.enderecos.append(endereco)
+        return self.cache.ler_palavra(endereco)
+
+    def escrever_palavra(self, endereco, valor):
+        self.enderecos.append(endereco)
+        self.cache.escrever_palavra(endereco, valor)
+
+    def ler_byte(self, endereco):
+        self.enderecos.append(endereco)
+        return self.cache.ler_byte(endereco)
+
+    def escrever_byte(self, endereco, valor):
+        self.enderecos.append(endereco)
+        self.cache.escrever_byte(endereco, valor)
+
+
+def capturar_fluxo(arquivo, max_ciclos=1_000_000):
+    """
+        Roda o programa no pipeline e retorna os endereços acessados
+        (busca de instruções e loads/stores, na ordem). Aceita .bin, .img
+        ou .s (ver main.carregar_arquivo); erro de carga sobe como exceção.
+    """
+
+    memoria = Memoria()
+    try:
+        tamanho_text = carregar_arquivo(memoria, arquivo)['tamanho_text']
+    except OSError:
+        raise
+    except Exception as e:
+        # Imagem inválida ou erro de montagem
+        raise ValueError(f"{arquivo}: {e}") from e
+
+    if not tamanho_text:
+        raise ValueError(f"{arquivo}: nenhuma instrução carregada")
+
+    gravador = GravadorEnderecos(Cache(memoria))
+    cpu = Processador(gravador)
+    cpu.PC = memoria.entrada
+
+    cpu.executar_ate(max_ciclos)
+
+    return gravador.enderecos
+
+
+def _potencias_de_dois(maximo):
+    valor = 1
+    while valor <= maximo:
+        yield valor
+        valor <<= 1
+
+
+def varrer(enderecos, tamanhos_bloco=(16,), conjuntos=None, associatividades=(1, 2, 4, 8)):
+    """
+        Calcula hits/misses de todas as combinações numa passada pelo fluxo.
+
+        Retorna uma lista de dicionários (uma linha por configuração) com
+        tamanho_bloco, conjuntos, associatividade, tamanho_bytes, acessos,
+        hits, misses e taxa_miss.
+    """
+
+    if conjuntos is None:
+        conjuntos = tuple(_potencias_de_dois(1024))
+
+    profundidade = max(associatividades)
+
+    # Uma pilha LRU por conjunto para cada (tamanho_bloco, conjuntos).
+    # Só precisa guardar até a maior associatividade: mais fundo é miss em todas.
+    modelos = []
+    for tamanho_bloco in tamanhos_bloco:
+        for num_conjuntos in conjuntos:
+            pilhas = [[] for _ in range(num_conjuntos)]
+            histograma = [0] * profundidade
+            modelos.append((tamanho_bloco, num_conjuntos, pilhas, histograma))
+
+    for endereco in enderecos:
+        for tamanho_bloco, num_conjuntos, pilhas, histograma in modelos:
+            bloco = endereco // tamanho_bloco
+            pilha = pilhas[bloco % num_conjuntos]
+
+            try:
+                distancia = pilha.index(bloco)
+            except ValueError:
+                distancia = -1
+
+            if distancia >= 0:
+                histograma[distancia] += 1
+                del pilha[distancia]
+            elif len(pilha) == profundidade:
+                pilha.pop()
+
+            pilha.insert(0, bloco)  # Topo da pilha = usado mais recentemente
+
+    acessos = len(enderecos)
+    linhas = []
+    for tamanho_bloco, num_conjuntos, _, histograma in modelos:
+        for associatividade in sorted(associatividades):
+            hits = sum(histograma[:associatividade])
+            linhas.append({
+                'tamanho_bloco': tamanho_bloco,
+                'conjuntos': num_conjuntos,
+                'associatividade': associatividade,
+                'tamanho_bytes': tamanho_bloco * num_conjuntos * associatividade,
+                'acessos': acessos,
+                'hits': hits,
+                'misses': acessos - hits,
+                'taxa_miss': (acessos - hits) / acessos if acessos else 0.0,
+            })
+
+    linhas.sort(key=lambda l: (l['tamanho_bytes'], l['tamanho_bloco'], l['associatividade']))
+    return linhas
+
+
+COLUNAS = ['tamanho_bytes', 'tamanho_bloco', 'conjuntos', 'associatividade',
+           'acessos', 'hits', 'misses', 'taxa_miss']
+
+
+def escrever_csv(linhas, saida):
+    """ Grava o resultado da varredura em CSV (arquivo ou objeto com write) """
+
+    escritor = csv.DictWriter(saida, fieldnames=COLUNAS)
+    escritor.writeheader()
+    for linha in linhas:
+        escritor.writerow({coluna: linha[coluna] for coluna in COLUNAS})
+
+
+def imprimir_tabela(linhas):
+    """ Mostra a taxa de miss por tamanho de cache """
+
+    print(f"{'Tamanho':>10} {'Bloco':>6} {'Conj.':>6} {'Assoc.':>6} {'Misses':>10} {'Taxa miss':>10}")
+    for l in linhas:
+        print(f"{l['tamanho_bytes']:>10} {l['tamanho_bloco']:>6} {l['conjuntos']:>6} "
+              f"{l['associatividade']:>6} {l['misses']:>10} {l['taxa_miss'] * 100:>9.2f}%")
+
+
+def _lista_inteiros(texto):
+    return tuple(int(valor) for valor in texto.split(','))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Varredura de configurações de cache (LRU) numa passada")
+    parser.add_argument('arquivo', help="programa (.bin, .img ou .s)")
+    parser.add_argument('--blocos', type=_lista_inteiros, default=(16,),
+                        help="tamanhos de bloco separados por vírgula (padrão: 16)")
+    parser.add_argument('--conjuntos', type=_lista_inteiros, default=None,
+                        help="números de conjuntos separados por vírgula (padrão: 1 a 1024)")
+    parser.add_argument('--assoc', type=_lista_inteiros, default=(1, 2, 4, 8),
+                        help="associatividades separadas por vírgula (padrão: 1,2,4,8)")
+    parser.add_argument('--max-ciclos', type=int, default=1_000_000)
+    parser.add_argument('--csv', help="grava o resultado em CSV ('-' para a saída padrão)")
+    args = parser.parse_args()
+
+    try:
+        enderecos = capturar_fluxo(args.arquivo, args.max_ciclos)
+    except (OSError, ValueError) as e:
+        print(f"Não deu para carregar o programa: {e}", file=sys.stderr)
+        return 1
+
+    linhas = varrer(enderecos, args.blocos, args.conjuntos, args.assoc)
+
+    if args.csv == '-':
+        escrever_csv(linhas, sys.stdout)
+    elif args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            escrever_csv(linhas, f)
+        print(f"{len(linhas)} configurações gravadas em {args.csv}")
+    else:
+        print(f"Fluxo de {len(enderecos)} acessos\n")
+        imprimir_tabela(linhas)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,538 @@
+"""
+    Muitas instâncias do mesmo programa em lockstep, com NumPy.
+
+    Para fuzzing e estudos de sensibilidade à entrada: o mesmo binário roda N
+    vezes com registradores/dados iniciais diferentes. As N instâncias
+    dividem a decodificação do programa; os bancos de registradores e os PCs
+    são arrays do NumPy e cada instrução é aplicada de uma vez, vetorizada, a
+    todas as instâncias que estão no mesmo PC.
+
+    Nível de ISA, como o modo funcional (funcional.py): mesmo resultado
+    arquitetural de N ProcessadorFuncional, sem caches nem pipeline.
+
+    Agendamento: a cada passo roda o grupo de instâncias do menor PC. Quem
+    divergiu num desvio (ou ficou mais voltas num laço) fica para trás e
+    alcança as outras no ponto em que os caminhos se juntam, e os grupos se
+    reúnem sozinhos.
+
+    Memória: a imagem carregada é compartilhada e cada instância só ganha
+    cópia própria das páginas em que escreve (cópia na escrita). A seção text
+    é somente leitura: uma instância que escreve no código do programa para
+    com falha, já que a decodificação é de todas.
+
+    Uso:
+        python vetorial.py programa.s --instancias 10000 --aleatorio '$a0=0:255' --mostrar '$v0'
+"""
+
+import argparse
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from decodificador import decodificar_instrucao
+from funcional import ProcessadorFuncional
+from main import carregar_programa, nomes_registradores
+from memoria import Memoria
+from montador import REGISTRADORES
+
+
+# Páginas da cópia na escrita
+BITS_PAGINA = 12
+TAMANHO_PAGINA = 1 << BITS_PAGINA
+MASCARA_PAGINA = TAMANHO_PAGINA - 1
+
+
+class ProcessadorVetorial:
+    """
+        N instâncias do programa carregado em `memoria` (uma Memoria, ou
+        uma Cache já descarregada: usa o .ram).
+
+        registradores: array (N, 32) de uint32, uma linha por instância
+         (visão de self.banco, que guarda (32, N) para cada registrador ser
+         um vetor contíguo)
+        PC, instrucoes_executadas: arrays (N,)
+        rodando: False depois do HALT/fim de programa ou de uma falha
+        falhou: parou por erro de memória ou por escrever no código
+    """
+
+    def __init__(self, memoria, instancias):
+        if np is None:
+            raise ImportError("O processador vetorial precisa do NumPy (pip install numpy)")
+        if instancias < 1:
+            raise ValueError("precisa de pelo menos uma instância")
+
+        ram = memoria.ram
+        self.ram = ram
+        self.instancias = instancias
+
+        # Imagem compartilhada (cópia: a Memoria original não muda)
+        paginas = -(-len(ram.dados) // TAMANHO_PAGINA)
+        self.tamanho = len(ram.dados)
+        self.base = np.zeros(paginas * TAMANHO_PAGINA, dtype=np.uint8)
+        self.base[:self.tamanho] = np.frombuffer(bytes(ram.dados), dtype=np.uint8)
+        self.base32 = self.base.view('<u4')
+        self.base_paginas = self.base.reshape(paginas, TAMANHO_PAGINA)
+
+        # Cópia na escrita: tabela[instância, página] -> página própria (-1: usa a base)
+        self.tabela = np.full((instancias, paginas), -1, dtype=np.int32)
+        self.paginas = np.zeros((0, TAMANHO_PAGINA), dtype=np.uint8)
+        self.paginas32 = self.paginas.view('<u4')
+        self.paginas_usadas = 0
+
+        # Registradores e controle, por instância
+        self.banco = np.zeros((32, instancias), dtype=np.uint32)
+        self.banco[29] = ram.pilha_fim  # $sp no topo da pilha
+        self.registradores = self.banco.T
+        self.PC = np.full(instancias, ram.entrada, dtype=np.int64)
+        self.rodando = np.ones(instancias, dtype=bool)
+        self.falhou = np.zeros(instancias, dtype=bool)
+        self.instrucoes_executadas = np.zeros(instancias, dtype=np.int64)
+
+        self.passos = 0     # Grupos executados (instruções por passo = quanto o lockstep rendeu)
+
+        # PC -> (função que executa, InstrucaoDecodificada), de todas as instâncias
+        self.cache_decodificacao = {}
+        self.despacho = {
+            ('R', 'ADD'): self._add,
+            ('R', 'SUB'): self._sub,
+            ('R', 'AND'): self._and,
+            ('R', 'OR'): self._or,
+            ('R', 'SLT'): self._slt,
+            ('R', 'SLL'): self._sll,
+            ('R', 'SRL'): self._srl,
+            ('I', 'ADD'): self._addi,
+            'lw': self._lw,
+            'sw': self._sw,
+            'beq': self._beq,
+            'bne': self._bne,
+            'j': self._j,
+            'jal': self._jal,
+        }
+
+        self._todas = np.arange(instancias)
+        self._mudou = True   # Alguma instância parou: refaz a lista das ativas
+
+
+    # Memória das instâncias
+
+    def ler_palavra(self, endereco):
+        """ A palavra de `endereco` em cada instância (array (N,)) """
+
+        enderecos = np.full(self.instancias, endereco, dtype=np.int64)
+        return self._ler_palavras(self._todas, enderecos)
+
+    def escrever_palavra(self, endereco, valores):
+        """ Escreve em `endereco` um valor por instância (ou o mesmo em todas) """
+
+        enderecos = np.full(self.instancias, endereco, dtype=np.int64)
+        valores = np.broadcast_to(np.asarray(valores, dtype=np.int64) & 0xFFFFFFFF,
+                                  (self.instancias,)).astype(np.uint32)
+        self._escrever_palavras(self._todas, enderecos, valores)
+
+    def memoria_da_instancia(self, i):
+        """ Cópia (bytearray) da memória inteira da instância i """
+
+        dados = self.base.copy()
+        for pagina in np.flatnonzero(self.tabela[i] >= 0):
+            inicio = pagina * TAMANHO_PAGINA
+            dados[inicio:inicio + TAMANHO_PAGINA] = self.paginas[self.tabela[i, pagina]]
+        return bytearray(dados[:self.tamanho].tobytes())
+
+
+    def _ler_palavras(self, instancias, enderecos):
+        """ Uma palavra por instância (enderecos já conferidos contra o tamanho) """
+
+        if not (enderecos & 3).any():
+            valores = self.base32[enderecos >> 2]
+            if self.paginas_usadas:
+                proprias = self.tabela[instancias, enderecos >> BITS_PAGINA]
+                m = proprias >= 0
+                if m.any():
+                    valores[m] = self.paginas32[proprias[m], (enderecos[m] & MASCARA_PAGINA) >> 2]
+            return valores
+
+        # Desalinhada: byte a byte, pode cruzar a página
+        valores = np.zeros(len(enderecos), dtype=np.uint32)
+        for i in range(4):
+            valores |= self._ler_bytes(instancias, enderecos + i).astype(np.uint32) << (8 * i)
+        return valores
+
+    def _ler_bytes(self, instancias, enderecos):
+        valores = self.base[enderecos]
+        if self.paginas_usadas:
+            proprias = self.tabela[instancias, enderecos >> BITS_PAGINA]
+            m = proprias >= 0
+            if m.any():
+                valores[m] = self.paginas[proprias[m], enderecos[m] & MASCARA_PAGINA]
+        return valores
+
+    def _escrever_palavras(self, instancias, enderecos, valores):
+        if not (enderecos & 3).any():
+            proprias = self._paginas_proprias(instancias, enderecos >> BITS_PAGINA)
+            self.paginas32[proprias, (enderecos & MASCARA_PAGINA) >> 2] = valores
+            return
+
+        for i in range(4):
+            e = enderecos + i
+            proprias = self._paginas_proprias(instancias, e >> BITS_PAGINA)
+            self.paginas[proprias, e & MASCARA_PAGINA] = (valores >> (8 * i)) & 0xFF
+
+    def _paginas_proprias(self, instancias, paginas):
+        """ Página própria de cada (instância, página), copiando da base as que faltam """
+
+        proprias = self.tabela[instancias, paginas]
+        faltam = proprias < 0
+        if faltam.any():
+            n = int(faltam.sum())
+            novas = np.arange(self.paginas_usadas, self.paginas_usadas + n, dtype=np.int32)
+            self._reservar_paginas(self.paginas_usadas + n)
+            self.paginas[novas] = self.base_paginas[paginas[faltam]]
+            self.tabela[instancias[faltam], paginas[faltam]] = novas
+            proprias[faltam] = novas
+            self.paginas_usadas += n
+        return proprias
+
+    def _reservar_paginas(self, quantidade):
+        if quantidade > len(self.paginas):
+            novas = np.zeros((max(quantidade, 2 * len(self.paginas), 64), TAMANHO_PAGINA), dtype=np.uint8)
+            novas[:self.paginas_usadas] = self.paginas[:self.paginas_usadas]
+            self.paginas = novas
+            self.paginas32 = novas.view('<u4')
+
+
+    # Execução
+
+    def _buscar(self, pc):
+        """
+            Decodificação do PC, dividida por todas as instâncias.
+            Devolve None se for fim de programa (mesma regra do modo funcional).
+        """
+
+        ram = self.ram
+        if pc >= ram.fim_programa:
+            return None
+
+        instrucao = ram.ler_palavra(pc)
+        if instrucao == 0xFFFFFFFF:  # HALT
+            return None
+
+        decodificada = decodificar_instrucao(instrucao)
+
+        # Prioriza o subtipo (lw/sw são tipo I), igual ao modo funcional
+        executar = self.despacho.get(decodificada.subtipo)
+        if executar is None:
+            chave = (decodificada.tipo, decodificada.alu_control)
+            executar = self.despacho.get(chave, self._nop)
+
+        entrada = (executar, decodificada)
+        self.cache_decodificacao[pc] = entrada
+        return entrada
+
+
+    def executar(self, max_instrucoes=None):
+        """
+            Roda até todas pararem (ou até cada uma rodar max_instrucoes a
+            mais). Retorna quantas instruções rodaram, somando as instâncias.
+        """
+
+        inicio = int(self.instrucoes_executadas.sum())
+        limite = None if max_instrucoes is None else self.instrucoes_executadas + max_instrucoes
+        todas = slice(None)
+        self._mudou = True
+
+        while True:
+            if self._mudou:
+                self._mudou = False
+                ativas = self.rodando if limite is None else self.rodando & (self.instrucoes_executadas < limite)
+                ativos = np.flatnonzero(ativas)
+                if not len(ativos):
+                    break
+                # Todas ativas: fatia em vez de índices (vetores contíguos)
+                inteiro = len(ativos) == self.instancias
+
+            pcs = self.PC if inteiro else self.PC[ativos]
+            pc = int(pcs.min())
+            no_pc = pcs == pc
+            if no_pc.all():
+                grupo = todas if inteiro else ativos
+            else:
+                grupo = np.flatnonzero(no_pc) if inteiro else ativos[no_pc]
+
+            self.passos += 1
+            entrada = self.cache_decodificacao.get(pc)
+            if entrada is None:
+                entrada = self._buscar(pc)
+                if entrada is None:
+                    self._parar(grupo)
+                    continue
+
+            executar, d = entrada
+            executado = executar(grupo, d, pc)
+            self.instrucoes_executadas[executado] += 1
+
+            if limite is not None and not self._mudou:
+                if (self.instrucoes_executadas[executado] >= limite[executado]).any():
+                    self._mudou = True
+
+        return int(self.instrucoes_executadas.sum()) - inicio
+
+
+    def _parar(self, grupo, mascara=None, falha=False):
+        """
+            Para as instâncias do grupo (ou só as da máscara) sem executar a
+            instrução. Retorna os índices das que continuam no grupo.
+        """
+
+        indices = self._todas[grupo]
+        if mascara is None:
+            parados, restantes = indices, indices[:0]
+        else:
+            parados, restantes = indices[mascara], indices[~mascara]
+
+        self.rodando[parados] = False
+        self.falhou[parados] |= falha
+        self._mudou = True
+        return restantes
+
+
+    # Implementação das instruções, para um grupo de instâncias no mesmo PC.
+    # Cada uma recebe o grupo (fatia ou índices), a instrução decodificada e o
+    # PC, atualiza o PC do grupo e devolve quem executou.
+
+    def _nop(self, g, d, pc):
+        self.PC[g] = pc + 4
+        return g
+
+    def _add(self, g, d, pc):
+        b = self.banco
+        if d.rd:
+            b[d.rd, g] = b[d.rs, g] + b[d.rt, g]
+        self.PC[g] = pc + 4
+        return g
+
+    def _sub(self, g, d, pc):
+        b = self.banco
+        if d.rd:
+            b[d.rd, g] = b[d.rs, g] - b[d.rt, g]
+        self.PC[g] = pc + 4
+        return g
+
+    def _and(self, g, d, pc):
+        b = self.banco
+        if d.rd:
+            b[d.rd, g] = b[d.rs, g] & b[d.rt, g]
+        self.PC[g] = pc + 4
+        return g
+
+    def _or(self, g, d, pc):
+        b = self.banco
+        if d.rd:
+            b[d.rd, g] = b[d.rs, g] | b[d.rt, g]
+        self.PC[g] = pc + 4
+        return g
+
+    def _slt(self, g, d, pc):
+        b = self.banco
+        if d.rd:
+            b[d.rd, g] = b[d.rs, g].view(np.int32) < b[d.rt, g].view(np.int32)
+        self.PC[g] = pc + 4
+        return g
+
+    def _sll(self, g, d, pc):
+        b = self.banco
+        if d.rd:
+            b[d.rd, g] = b[d.rt, g] << d.shamt
+        self.PC[g] = pc + 4
+        return g
+
+    def _srl(self, g, d, pc):
+        b = self.banco
+        if d.rd:
+            b[d.rd, g] = b[d.rt, g] >> d.shamt
+        self.PC[g] = pc + 4
+        return g
+
+    def _addi(self, g, d, pc):
+        b = self.banco
+        if d.rt:
+            b[d.rt, g] = b[d.rs, g] + np.uint32(d.immediate_signed & 0xFFFFFFFF)
+        self.PC[g] = pc + 4
+        return g
+
+    def _enderecos(self, g, d):
+        return (self.banco[d.rs, g] + np.uint32(d.immediate_signed & 0xFFFFFFFF)).astype(np.int64)
+
+    def _lw(self, g, d, pc):
+        enderecos = self._enderecos(g, d)
+
+        # Fora da memória: erro de leitura, a instância para (igual ao modo funcional)
+        fora = enderecos > self.tamanho - 4
+        if fora.any():
+            g = self._parar(g, fora, falha=True)
+            enderecos = enderecos[~fora]
+
+        valores = self._ler_palavras(self._todas[g], enderecos)
+        if d.rt:
+            self.banco[d.rt, g] = valores
+        self.PC[g] = pc + 4
+        return g
+
+    def _sw(self, g, d, pc):
+        enderecos = self._enderecos(g, d)
+        valores = self.banco[d.rt, g]
+
+        # Escrita no código do programa: a decodificação é de todas, então
+        # essa instância não tem como continuar em lockstep
+        ram = self.ram
+        codigo = (enderecos + 4 > ram.text_inicio) & (enderecos < ram.fim_programa)
+        if codigo.any():
+            g = self._parar(g, codigo, falha=True)
+            enderecos = enderecos[~codigo]
+            valores = valores[~codigo]
+
+        # Fora da memória a escrita é ignorada (a Memoria não reclama), mas a instrução conta
+        dentro = enderecos <= self.tamanho - 4
+        instancias = self._todas[g]
+        if not dentro.all():
+            instancias, enderecos, valores = instancias[dentro], enderecos[dentro], valores[dentro]
+        if len(enderecos):
+            self._escrever_palavras(instancias, enderecos, valores)
+
+        self.PC[g] = pc + 4
+        return g
+
+    def _beq(self, g, d, pc):
+        b = self.banco
+        tomado = b[d.rs, g] == b[d.rt, g]
+        self.PC[g] = np.where(tomado, pc + 4 + (d.immediate_signed << 2), pc + 4)
+        return g
+
+    def _bne(self, g, d, pc):
+        b = self.banco
+        tomado = b[d.rs, g] != b[d.rt, g]
+        self.PC[g] = np.where(tomado, pc + 4 + (d.immediate_signed << 2), pc + 4)
+        return g
+
+    def _j(self, g, d, pc):
+        self.PC[g] = ((pc + 4) & 0xF0000000) | (d.address << 2)
+        return g
+
+    def _jal(self, g, d, pc):
+        self.banco[31, g] = pc + 4
+        self.PC[g] = ((pc + 4) & 0xF0000000) | (d.address << 2)
+        return g
+
+
+def _intervalo(texto):
+    """ '$a0' ou '$a0=min:max' -> (número do registrador, min, max) """
+
+    nome, _, faixa = texto.partition('=')
+    if nome not in REGISTRADORES:
+        raise argparse.ArgumentTypeError(f"registrador desconhecido: {nome}")
+    if not faixa:
+        return REGISTRADORES[nome], 0, 0xFFFFFFFF
+    try:
+        minimo, maximo = (int(parte, 0) for parte in faixa.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"faixa inválida: {faixa} (use min:max)")
+    if minimo > maximo:
+        raise argparse.ArgumentTypeError(f"faixa vazia: {faixa}")
+    return REGISTRADORES[nome], minimo, maximo
+
+
+def conferir(arquivo, lote, iniciais, quantidade, max_instrucoes):
+    """
+        Roda as `quantidade` primeiras instâncias também no modo funcional,
+        uma a uma, com os mesmos registradores iniciais. Retorna os índices
+        das que deram diferente (registradores, PC, instruções ou memória).
+        Quem escreveu no código parou aqui e seguiu no funcional, então
+        também aparece.
+    """
+
+    diferentes = []
+    for i in range(min(quantidade, lote.instancias)):
+        memoria = Memoria()
+        carregar_programa(memoria, arquivo, silencioso=True)
+        cpu = ProcessadorFuncional(memoria, registradores=[int(v) for v in iniciais[i]])
+        cpu.PC = memoria.entrada
+        cpu.executar(max_instrucoes)
+
+        if (cpu.registradores != [int(v) for v in lote.registradores[i]]
+                or cpu.PC != lote.PC[i]
+                or cpu.instrucoes_executadas != lote.instrucoes_executadas[i]
+                or cpu.rodando != lote.rodando[i]
+                or memoria.dados != lote.memoria_da_instancia(i)):
+            diferentes.append(i)
+
+    return diferentes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Muitas instâncias do mesmo programa em lockstep (NumPy)")
+    parser.add_argument('arquivo', help="programa (.s, .img ou .bin)")
+    parser.add_argument('--instancias', type=int, default=1000, help="quantas instâncias (padrão: 1000)")
+    parser.add_argument('--aleatorio', action='append', type=_intervalo, default=[], metavar="REG[=MIN:MAX]",
+                        help="valor inicial aleatório (uniforme) num registrador, ex: '$a0=0:255'")
+    parser.add_argument('--semente', type=int, default=0, help="semente dos valores aleatórios (padrão: 0)")
+    parser.add_argument('--max-instrucoes', type=int, default=1_000_000,
+                        help="limite de instruções por instância (padrão: 1000000)")
+    parser.add_argument('--mostrar', action='append', default=[], metavar="REG",
+                        help="histograma dos valores finais de um registrador")
+    parser.add_argument('--conferir', type=int, default=0, metavar="K",
+                        help="confere as K primeiras instâncias contra o modo funcional")
+    args = parser.parse_args(argv)
+
+    for nome in args.mostrar:
+        if nome not in REGISTRADORES:
+            parser.error(f"registrador desconhecido: {nome}")
+
+    memoria = Memoria()
+    if not carregar_programa(memoria, args.arquivo, silencioso=True):
+        return 1
+
+    lote = ProcessadorVetorial(memoria, args.instancias)
+    gerador = np.random.default_rng(args.semente)
+    for registrador, minimo, maximo in args.aleatorio:
+        lote.registradores[:, registrador] = gerador.integers(minimo, maximo, size=args.instancias,
+                                                              endpoint=True) & 0xFFFFFFFF
+    lote.registradores[:, 0] = 0
+    iniciais = lote.registradores.copy()
+
+    inicio = time.perf_counter()
+    instrucoes = lote.executar(args.max_instrucoes)
+    segundos = time.perf_counter() - inicio
+
+    terminaram = int((~lote.rodando & ~lote.falhou).sum())
+    falharam = int(lote.falhou.sum())
+    no_limite = int(lote.rodando.sum())
+
+    print(f"Instâncias: {lote.instancias} | terminaram: {terminaram} | falharam: {falharam} "
+          f"| no limite de instruções: {no_limite}")
+    print(f"Instruções: {instrucoes} em {lote.passos} passos "
+          f"({instrucoes / lote.passos if lote.passos else 0:.1f} instâncias por passo)")
+    print(f"Tempo: {segundos:.3f} s ({instrucoes / segundos if segundos else 0:.0f} instruções/s)")
+    print(f"Páginas copiadas: {lote.paginas_usadas} ({lote.paginas_usadas * TAMANHO_PAGINA // 1024} KB)")
+
+    for nome in args.mostrar:
+        valores, contagens = np.unique(lote.registradores[:, REGISTRADORES[nome]], return_counts=True)
+        ordem = np.argsort(contagens)[::-1][:10]
+        print(f"\n{nomes_registradores[REGISTRADORES[nome]]}: {len(valores)} valores diferentes")
+        for i in ordem:
+            print(f"   {int(valores[i]):>12} ({int(valores[i]):#010x}): {contagens[i]}")
+
+    if args.conferir:
+        diferentes = conferir(args.arquivo, lote, iniciais, args.conferir, args.max_instrucoes)
+        if diferentes:
+            print(f"\nDiferente do modo funcional: instâncias {diferentes[:20]}")
+            return 1
+        print(f"\nConferidas {min(args.conferir, lote.instancias)} instâncias contra o modo funcional: iguais")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())